@@ -0,0 +1,235 @@
+import argparse
+import base64
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+# Load generator for the dashboard. Each scenario drives one route with a
+# number of keep-alive clients for a fixed time and reports requests per
+# second and latency percentiles. With --spawn it starts mock_airflow.py and
+# server.py itself, so a run needs no Airflow at all. --save/--baseline keep
+# a JSON report and fail the run when a scenario regresses beyond
+# --tolerance.
+
+SCENARIOS = ("index", "status", "runs", "tasks", "logs")
+BENCH_LIST = "bench"  # DAG list uploaded to the server for the index scenario
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def wait_for_port(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("localhost", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout}s")
+
+class Client:
+    # One keep-alive connection; reconnects when the server closes it
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.conn.request(method, path, body=body, headers=headers or {})
+                response = self.conn.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self.close()
+                return response.status, data
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+def get_json(client, path):
+    status, data = client.request("GET", path)
+    if status != 200:
+        raise RuntimeError(f"GET {path} answered {status}")
+    return json.loads(data)
+
+def discover(client, dag_ids, sample):
+    # Real run and task ids to ask for, found through the server itself
+    targets = []
+    for dag_id in random.sample(dag_ids, min(sample, len(dag_ids))):
+        runs = get_json(client, f"/api/runs?dag_id={urllib.parse.quote(dag_id)}")
+        if not runs:
+            continue
+        run_id = runs[0]["dag_run_id"]
+        tasks = get_json(client, f"/api/tasks?dag_id={urllib.parse.quote(dag_id)}&dag_run_id={urllib.parse.quote(run_id)}")
+        task = random.choice(tasks) if tasks else None
+        targets.append((dag_id, run_id, task))
+    if not targets:
+        raise RuntimeError("No DAG with runs found; is the server pointed at Airflow (or the mock)?")
+    return targets
+
+def scenario_paths(name, dag_ids, targets):
+    # Endless supply of request paths for one scenario
+    q = urllib.parse.quote
+    while True:
+        if name == "index":
+            yield f"/?list={q(BENCH_LIST)}&offset={random.randrange(0, max(1, len(dag_ids)), 100)}"
+        elif name == "status":
+            yield f"/api/status?dag_id={q(random.choice(dag_ids))}"
+        elif name == "runs":
+            yield f"/api/runs?dag_id={q(random.choice(dag_ids))}"
+        elif name == "tasks":
+            dag_id, run_id, _ = random.choice(targets)
+            yield f"/api/tasks?dag_id={q(dag_id)}&dag_run_id={q(run_id)}"
+        elif name == "logs":
+            dag_id, run_id, task = random.choice([t for t in targets if t[2]])
+            yield (f"/api/logs?dag_id={q(dag_id)}&dag_run_id={q(run_id)}&task_id={q(task['task_id'])}"
+                   f"&try_number={task['try_number']}")
+
+def run_scenario(name, host, port, concurrency, duration, dag_ids, targets):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker():
+        client = Client(host, port)
+        paths = scenario_paths(name, dag_ids, targets)
+        mine, failed = [], 0
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                status, _ = client.request("GET", next(paths))
+                if status >= 400:
+                    failed += 1
+            except Exception:
+                failed += 1
+                client.close()
+            mine.append(time.perf_counter() - started)
+        client.close()
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(0.50), 2),
+        "p90_ms": round(percentile(0.90), 2),
+        "p99_ms": round(percentile(0.99), 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0
+    }
+
+def compare(results, baseline, tolerance):
+    # Regressions: throughput down or p99 up by more than `tolerance`
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if result["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['rps']} rps vs {before['rps']} in the baseline")
+        if result["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {result['p99_ms']} ms vs {before['p99_ms']} ms in the baseline")
+    return regressions
+
+def spawn(args):
+    mock = subprocess.Popen([sys.executable, os.path.join(HERE, "mock_airflow.py"), "--port", "8080",
+                             "--dags", str(args.dags), "--latency", str(args.upstream_latency),
+                             "--jitter", str(args.upstream_latency / 2), "--error-rate", str(args.upstream_error_rate)],
+                            stdout=subprocess.DEVNULL)
+    server = subprocess.Popen([sys.executable, os.path.join(HERE, "server.py")], cwd=HERE,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(8080)
+    wait_for_port(args.port)
+    return [server, mock]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Airflow dashboard")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent keep-alive clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds before each scenario")
+    parser.add_argument("--dags", type=int, default=2000, help="DAG ids to spread requests over (mock_dag_NNNN)")
+    parser.add_argument("--airflow-user", default="airflow", help="Airflow credentials for uploading the bench list")
+    parser.add_argument("--airflow-pass", default="airflow")
+    parser.add_argument("--seed", type=int, default=1, help="random seed, so runs ask for the same things")
+    parser.add_argument("--spawn", action="store_true", help="start mock_airflow.py and server.py for the run")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="mock Airflow latency with --spawn")
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0, help="mock Airflow 503 rate with --spawn")
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression against the baseline")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    processes = spawn(args) if args.spawn else []
+    try:
+        dag_ids = [f"mock_dag_{i:04d}" for i in range(args.dags)]
+        client = Client(args.host, args.port)
+        status, _ = client.request("POST", f"/api/lists?name={BENCH_LIST}", body="\n".join(["dag_id"] + dag_ids).encode(),
+                                   headers={"Content-Type": "text/csv", "Authorization": "Basic " + base64.b64encode(
+                                       f"{args.airflow_user}:{args.airflow_pass}".encode()).decode()})
+        if status != 200:
+            raise RuntimeError(f"Uploading the {BENCH_LIST} DAG list answered {status}")
+        targets = discover(client, dag_ids, sample=20)
+        client.close()
+
+        results = {}
+        print(f"{'scenario':<10}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name in scenarios:
+            if args.warmup:
+                run_scenario(name, args.host, args.port, args.concurrency, args.warmup, dag_ids, targets)
+            r = results[name] = run_scenario(name, args.host, args.port, args.concurrency, args.duration, dag_ids, targets)
+            print(f"{name:<10}{r['requests']:>10}{r['errors']:>8}{r['rps']:>10}{r['p50_ms']:>10}{r['p90_ms']:>10}"
+                  f"{r['p99_ms']:>10}{r['max_ms']:>10}")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
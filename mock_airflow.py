@@ -0,0 +1,282 @@
+import argparse
+import base64
+import http.server
+import json
+import random
+import re
+import socketserver
+import time
+import urllib.parse
+import zlib
+from datetime import datetime, timedelta, timezone
+
+# Stand-in for the Airflow v1 REST API, for benchmarks and offline work.
+# Data is generated on the fly from the DAG/run/task indices, so any size
+# costs no memory; any dag_id is accepted. A few DAGs keep a running latest
+# run whose state moves on over time, to exercise the poller and streams.
+
+MAX_PAGE_LIMIT = 100  # Airflow's default maximum_page_limit
+# Run 0 of every DAG is today's; ids stay stable for the day
+TODAY = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+RUNNING_EVERY = 10  # every Nth DAG has a run in progress
+TASK_STATES = ("success", "success", "success", "failed", "skipped", "upstream_failed")
+
+config = argparse.Namespace(dags=2000, runs=25, tasks=50, log_lines=2000, latency=0.0, jitter=0.0,
+                            error_rate=0.0, log_chunk=10000, token_lifetime=3600, username="airflow", password="airflow")
+
+def dag_ids():
+    return [f"mock_dag_{i:04d}" for i in range(config.dags)]
+
+def seed(*parts):
+    return zlib.crc32("|".join(map(str, parts)).encode())
+
+def execution_date(run_index):
+    # run 0 is the newest
+    return TODAY - timedelta(days=run_index)
+
+def dag_run(dag_id, run_index):
+    date = execution_date(run_index)
+    state = "success" if seed(dag_id, run_index) % 4 else "failed"
+    updated = date + timedelta(minutes=30)
+    if run_index == 0 and seed(dag_id) % RUNNING_EVERY == 0:
+        # Flips between running and a final state every minute
+        phase = int(time.time() // 60) % 2
+        state = ("running", "success")[phase]
+        updated = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    return {
+        "dag_id": dag_id,
+        "dag_run_id": f"scheduled__{date.isoformat()}",
+        "state": state,
+        "execution_date": date.isoformat(),
+        "logical_date": date.isoformat(),
+        "start_date": date.isoformat(),
+        "end_date": None if state == "running" else (date + timedelta(minutes=30)).isoformat(),
+        "updated_at": updated.isoformat(),
+        "run_type": "scheduled",
+        "external_trigger": False,
+        "conf": {},
+        "note": None
+    }
+
+def run_index(dag_run_id):
+    # None for run ids this mock never handed out
+    try:
+        date = datetime.fromisoformat(dag_run_id.split("__", 1)[-1])
+    except ValueError:
+        return None
+    return (TODAY - date).days
+
+def task_instance(dag_id, dag_run_id, task_index, run=None):
+    index = run_index(dag_run_id)
+    run = run or (dag_run(dag_id, index) if index is not None else None)
+    running = run is not None and run["state"] == "running"
+    if running and task_index >= config.tasks // 2:
+        state = "queued" if task_index > config.tasks * 3 // 4 else "running"
+    else:
+        state = TASK_STATES[seed(dag_id, dag_run_id, task_index) % len(TASK_STATES)]
+    return {
+        "task_id": f"task_{task_index:04d}",
+        "dag_id": dag_id,
+        "dag_run_id": dag_run_id,
+        "execution_date": run["execution_date"] if run else None,
+        "updated_at": run["updated_at"] if run else None,
+        "map_index": -1,
+        "state": state,
+        "try_number": 1 + seed(dag_id, task_index) % 2,
+        "max_tries": 2,
+        "start_date": dag_run_id.split("__", 1)[-1],
+        "end_date": None,
+        "duration": 12.5,
+        "hostname": "worker-1.example.internal",
+        "unixname": "airflow",
+        "pool": "default_pool",
+        "pool_slots": 1,
+        "queue": "default",
+        "priority_weight": 1,
+        "operator": "BashOperator",
+        "executor_config": "{}",
+        "sla_miss": None,
+        "rendered_fields": {"bash_command": "echo " + "x" * 120},
+        "note": None
+    }
+
+def log_text(dag_id, dag_run_id, task_id, try_number, map_index=-1):
+    label = f"{task_id}[{map_index}]" if map_index >= 0 else task_id
+    text = "".join(f"[{TODAY.isoformat()}] {{taskinstance.py:{i}}} INFO - {label} try {try_number} line {i}\n"
+                   for i in range(config.log_lines))
+    if seed(dag_id, dag_run_id, task_id, try_number) % 7 == 0:
+        # Something for log searches to find
+        text += f"[{TODAY.isoformat()}] {{taskinstance.py:1703}} ERROR - Task failed with exception: Connection refused\n"
+    return text
+
+def page(items, query, limit_key="limit", offset_key="offset"):
+    limit = min(int(query.get(limit_key, MAX_PAGE_LIMIT)), MAX_PAGE_LIMIT)
+    offset = int(query.get(offset_key, 0))
+    return items[offset:offset + limit]
+
+def run_indices(since=None):
+    # Runs executed at or after `since`: always the newest ones
+    if since is None:
+        return range(config.runs)
+    newest = max(0, min(config.runs, (TODAY - datetime.fromisoformat(since)).days + 1))
+    return range(newest)
+
+def task_instances_page(runs, query, limit_key="limit", offset_key="offset"):
+    # One page of the task instances of `runs`, without building the others
+    limit = min(int(query.get(limit_key, MAX_PAGE_LIMIT)), MAX_PAGE_LIMIT)
+    offset = int(query.get(offset_key, 0))
+    total = len(runs) * config.tasks
+    tasks = [task_instance(run["dag_id"], run["dag_run_id"], i % config.tasks, run)
+             for i in range(offset, min(total, offset + limit)) for run in [runs[i // config.tasks]]]
+    return {"task_instances": tasks, "total_entries": total}
+
+def updated_runs(since):
+    runs = [dag_run(dag_id, i) for dag_id in dag_ids() for i in range(config.runs)]
+    if since:
+        since = datetime.fromisoformat(since)
+        runs = [r for r in runs if datetime.fromisoformat(r["updated_at"]) >= since]
+    return runs
+
+def issue_token():
+    # JWT-shaped like Airflow 3's /auth/token answer; the signature isn't checked
+    claims = {"sub": "airflow", "exp": int(time.time() + config.token_lifetime)}
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
+    return f"eyJhbGciOiJub25lIn0.{payload}.x"
+
+def token_expired(authorization):
+    # Basic credentials must match --username/--password; bearer tokens are good until their exp
+    if authorization.startswith("Basic "):
+        try:
+            return base64.b64decode(authorization[6:]).decode() != f"{config.username}:{config.password}"
+        except ValueError:
+            return True
+    if not authorization.startswith("Bearer "):
+        return False
+    try:
+        payload = authorization[7:].split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return claims["exp"] < time.time()
+    except (IndexError, KeyError, ValueError):
+        return True
+
+class MockAirflowHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # like gunicorn; otherwise every answer waits on a delayed ACK
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_payload(self, payload, content_type="application/json", status=200):
+        body = json.dumps(payload).encode() if content_type == "application/json" else payload
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def injected_failure(self):
+        if config.latency or config.jitter:
+            time.sleep(max(0, random.uniform(config.latency - config.jitter, config.latency + config.jitter)))
+        if random.random() < config.error_rate:
+            self.send_payload({"title": "Injected failure", "status": 503}, status=503)
+            return True
+        return False
+
+    def refused(self):
+        if token_expired(self.headers.get("Authorization", "")):
+            self.send_payload({"title": "Unauthorized", "status": 401}, status=401)
+            return True
+        return False
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if self.injected_failure():
+            return
+        if self.path.endswith("/auth/token"):
+            if (body.get("username"), body.get("password")) != (config.username, config.password):
+                return self.send_payload({"title": "Invalid credentials", "status": 401}, status=401)
+            return self.send_payload({"access_token": issue_token()}, status=201)
+        if self.refused():
+            return
+        runs = [dag_run(dag_id, i) for dag_id in body.get("dag_ids") or dag_ids()
+                for i in run_indices(body.get("execution_date_gte"))]
+        if self.path.endswith("/dags/~/dagRuns/list"):
+            if body.get("order_by", "").lstrip("-") == "execution_date":
+                runs.sort(key=lambda r: r["execution_date"], reverse=body["order_by"].startswith("-"))
+            self.send_payload({"dag_runs": page(runs, body, "page_limit", "page_offset"), "total_entries": len(runs)})
+        elif self.path.endswith("/dags/~/dagRuns/~/taskInstances/list"):
+            self.send_payload(task_instances_page(runs, body, "page_limit", "page_offset"))
+        else:
+            self.send_payload({"title": "Not Found", "status": 404}, status=404)
+
+    def do_GET(self):
+        if self.injected_failure() or self.refused():
+            return
+        parsed = urllib.parse.urlsplit(self.path)
+        path = urllib.parse.unquote(parsed.path)
+        query = {k: v[0] for k, v in urllib.parse.parse_qs(parsed.query).items()}
+
+        m = re.match(r".*/dags/([^/]+)/dagRuns/([^/]+)/taskInstances/([^/]+)/logs/(\d+)$", path)
+        if m:
+            text = log_text(*m.groups(), map_index=int(query.get("map_index", -1)))
+            if "text/plain" in self.headers.get("Accept", ""):
+                return self.send_payload(text.encode(), "text/plain")
+            if query.get("full_content", "true") == "false":
+                index = int(query.get("token") or 0)
+                chunk = text[index * config.log_chunk:(index + 1) * config.log_chunk]
+                more = (index + 1) * config.log_chunk < len(text)
+                return self.send_payload({"content": chunk, "continuation_token": str(index + 1) if more else None})
+            return self.send_payload({"content": text, "continuation_token": None})
+
+        m = re.match(r".*/dags/([^/]+)/dagRuns/([^/]+)/taskInstances/task_(\d+)(?:/(\d+))?$", path)
+        if m:
+            task = task_instance(m.group(1), m.group(2), int(m.group(3)))
+            if m.group(4):  # one instance of a mapped task
+                task["map_index"] = int(m.group(4))
+            return self.send_payload(task)
+
+        m = re.match(r".*/dags/([^/]+)/dagRuns/([^/]+)/taskInstances$", path)
+        if m:
+            tasks = [task_instance(m.group(1), m.group(2), i) for i in range(config.tasks)]
+            return self.send_payload({"task_instances": page(tasks, query), "total_entries": len(tasks)})
+
+        if path.endswith("/dags"):
+            dags = [{"dag_id": dag_id, "is_paused": False} for dag_id in dag_ids()]
+            return self.send_payload({"dags": page(dags, query), "total_entries": len(dags)})
+
+        m = re.match(r".*/dags/([^/]+)/dagRuns$", path)
+        if m and m.group(1) == "~":
+            runs = updated_runs(query.get("updated_at_gte"))
+            return self.send_payload({"dag_runs": page(runs, query), "total_entries": len(runs)})
+        if m:
+            runs = [dag_run(m.group(1), i) for i in run_indices(query.get("execution_date_gte"))]
+            if query.get("execution_date_lte"):
+                runs = [r for r in runs if r["execution_date"] <= datetime.fromisoformat(query["execution_date_lte"]).isoformat()]
+            return self.send_payload({"dag_runs": page(runs, query), "total_entries": len(runs)})
+
+        self.send_payload({"title": "Not Found", "status": 404}, status=404)
+
+class MockAirflowServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Airflow v1 REST API")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--dags", type=int, default=config.dags, help="DAGs returned by the ~ endpoints")
+    parser.add_argument("--runs", type=int, default=config.runs, help="runs per DAG")
+    parser.add_argument("--tasks", type=int, default=config.tasks, help="task instances per run")
+    parser.add_argument("--log-lines", type=int, default=config.log_lines, help="lines per task log")
+    parser.add_argument("--log-chunk", type=int, default=config.log_chunk, help="characters per paged log chunk")
+    parser.add_argument("--latency", type=float, default=config.latency, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=config.jitter, help="+/- seconds of random extra latency")
+    parser.add_argument("--token-lifetime", type=int, default=config.token_lifetime, help="seconds /auth/token tokens stay valid")
+    parser.add_argument("--username", default=config.username, help="the only Basic/token credentials accepted")
+    parser.add_argument("--password", default=config.password)
+    parser.add_argument("--error-rate", type=float, default=config.error_rate, help="fraction of requests answered 503")
+    args = parser.parse_args()
+    vars(config).update({k: v for k, v in vars(args).items() if k != "port"})
+
+    with MockAirflowServer(("", args.port), MockAirflowHandler) as httpd:
+        print(f"Mock Airflow at port {args.port}: {config.dags} DAGs x {config.runs} runs x {config.tasks} tasks")
+        httpd.serve_forever()
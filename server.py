@@ -1,19 +1,169 @@
+import http.client
 import http.server
 import socketserver
 from string import Template
 import urllib.request
 import urllib.error
 import urllib.parse
+import zlib
 import csv
 import json
 import base64
-from datetime import datetime
+import bisect
+import email.utils
+import gzip
+import hashlib
+import html
+import itertools
+import os
+import re
+import selectors
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError  # an alias of the built-in one only from 3.11
+from datetime import datetime, timedelta, timezone
+
+try:
+    import brotli  # optional: offered as Content-Encoding: br when installed
+except ImportError:
+    brotli = None
 
 # Airflow Configuration
 AIRFLOW_API_URL = "http://localhost:8080/api/v1"
 AIRFLOW_USER = "airflow"
 AIRFLOW_PASS = "airflow"
-AIRFLOW_AUTH_URL = "http://localhost:8080/api/v1/security/oauth/token" 
+AIRFLOW_AUTH = "basic"  # "basic", or "token": trade AIRFLOW_USER/AIRFLOW_PASS for a bearer token at AIRFLOW_AUTH_URL
+AIRFLOW_AUTH_URL = "http://localhost:8080/auth/token"  # Airflow 3's JWT endpoint
+AUTH_REFRESH_MARGIN = 60  # seconds before expiry a bearer token is renewed in the background
+AUTH_RETRY_INTERVAL = 5  # seconds between attempts while the token endpoint fails
+AUTH_DEFAULT_LIFETIME = 300  # seconds, for tokens that carry no expiry
+AUTH_CALLER_TTL = 300  # seconds a caller's Airflow credentials stay accepted for uploads
+
+# Server Configuration
+PORT = 8000
+WORKER_THREADS = 32  # max requests handled at the same time
+KEEPALIVE_TIMEOUT = 15  # seconds an idle keep-alive connection is kept open
+KEEPALIVE_MAX_REQUESTS = 100  # requests served per connection before closing it
+REQUEST_TIMEOUT = 30  # seconds a single socket read or write may block
+STATUS_FANOUT = 16  # max concurrent Airflow lookups when rendering the index
+PAGE_DEADLINE = 8  # seconds; DAGs not resolved by then render as "pending"
+BULK_CHUNK = 50  # dag_ids per batch dagRuns/list request
+BULK_PAGE_LIMIT = 100  # Airflow's default maximum_page_limit
+BULK_MAX_PAGES = 3  # pages read per chunk before falling back to per-DAG lookups
+TASK_PAGE_LIMIT = 100  # task instances per request; Airflow may cap it lower
+TASK_PAGE_FANOUT = 8  # max concurrent task instance page requests
+TASK_FIELDS = ("task_id", "map_index", "state", "try_number")  # all the dashboard keeps of a task instance
+RUNS_DEFAULT_LIMIT = 5  # /api/runs without ?limit=
+
+# Worker Processes: above 1, a supervisor binds PORT and runs that many server
+# processes accepting on it, sharing one cache through SHARED_STORE_PATH.
+# SIGHUP to the supervisor restarts them one at a time (new code included).
+WORKER_PROCESSES = 1
+WORKER_RESTART_GRACE = 30  # seconds a stopping worker gets to finish its requests
+SHARED_STORE_PATH = ".shared_store.sqlite3"
+SHARED_WAIT_INTERVAL = 0.02  # seconds between looks for a result another worker is fetching
+SHARED_SYNC_INTERVAL = 0.5  # seconds between a worker's reads of the poller's runs and events
+SHARED_EVENTS_KEPT = 300  # seconds
+SHARED_PRUNE_INTERVAL = 60  # seconds between the supervisor's cleanups of the store
+
+# DAG Lists: every *.csv in these directories is a named list (?list=<file name without .csv>)
+DAG_LIST_DIRS = (".", ".dag_lists")  # uploads go to the last one
+DAG_LIST_DEFAULT = "dags"
+DAG_LIST_CHECK_INTERVAL = 2  # seconds between mtime checks of the list files
+DAG_LIST_UPLOAD_MAX = 1024 * 1024  # bytes
+DAG_LIST_MAX_UPLOADED = 50  # uploaded lists kept at once; replacing one is always allowed
+DAG_LIST_MAX_DAGS = 10000  # dag_ids per uploaded list
+
+# DAG Listing (/api/dags and the index page)
+DAGS_PAGE_LIMIT = 100  # rows per page unless ?limit= says otherwise
+DAGS_MAX_LIMIT = 1000
+DAG_INDEX_TTL = 5  # seconds a filtered/sorted listing is reused across pages
+DAG_INDEX_LISTS = 32  # distinct DAG lists indexed at once
+
+# Cache Configuration (seconds)
+CACHE_MAX_ENTRIES = 5000
+CACHE_TTL_ACTIVE = 5  # anything still running or queued
+CACHE_TTL_IDLE = 30  # run lists where every run has finished
+CACHE_TTL_TERMINAL = 600  # task instances of a finished run
+CACHE_STALE = 60  # serve an expired entry this much longer while it refreshes
+
+# Metrics (/metrics, Prometheus text format)
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # seconds
+METRICS_ROUTES = ("/api/status", "/api/stream", "/api/cache", "/api/dags", "/api/lists",
+                  "/api/runs", "/api/tasks", "/api/logs", "/api/logs/search", "/metrics", "/debug/profile")  # any other GET is the index, "/"
+
+# Diagnostics: Server-Timing on every response, optional slow-request log, /debug/profile
+SLOW_REQUEST_THRESHOLD = None  # seconds; requests slower than this are appended to SLOW_REQUEST_LOG
+SLOW_REQUEST_LOG = "slow_requests.log"
+TIMING_MAX_UPSTREAM = 50  # upstream calls listed per slow request
+PROFILE_MAX_SECONDS = 30  # longest /debug/profile sampling run
+
+# Response Encoding
+COMPRESS_MIN_BYTES = 1024  # smaller bodies are sent uncompressed
+ENCODED_RESPONSES = 2000  # serialized (and compressed) API bodies kept per URL
+
+# Upstream Connection Pool
+POOL_SIZE = 16  # max open connections to the Airflow webserver for API calls
+LOG_POOL_SIZE = 8  # separate connections for streaming logs, which hold one for the whole read
+POOL_IDLE_TIMEOUT = 30  # seconds; idle connections older than this are closed
+UPSTREAM_TIMEOUT = 5
+INFLIGHT_TIMEOUT = 3 * UPSTREAM_TIMEOUT  # longest a caller waits on someone else's identical request
+
+# Upstream Protection: circuit breaker plus an adaptive (AIMD) concurrency limit
+BREAKER_FAILURES = 5  # consecutive failed calls that open the circuit
+BREAKER_COOLDOWN = 10  # seconds the circuit stays open before one probe call is let through
+LIMIT_MIN = 1
+LIMIT_MAX = POOL_SIZE
+LIMIT_LATENCY_TARGET = 1.0  # seconds; slower answers count as congestion
+LIMIT_BACKOFF = 0.7  # multiplier applied to the limit on congestion or errors
+LIMIT_WAIT = UPSTREAM_TIMEOUT  # longest a call waits for a slot under the limit
+
+# Log Streaming (/api/logs)
+LOG_CHUNK = 64 * 1024  # bytes read from Airflow and written to the browser at a time
+LOG_RANGE_MAX = 4 * 1024 * 1024  # largest byte range served in one response
+LOG_CACHE_DIR = ".log_cache"  # logs of finished tries, served with sendfile
+LOG_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Log Search (/api/logs/search)
+LOG_SEARCH_RUNS = 5  # recent runs searched without ?limit=
+LOG_SEARCH_FANOUT = 8  # logs searched at the same time
+LOG_SEARCH_MAX_MATCHES = 1000  # matching lines per search; the search stops there
+LOG_SEARCH_LOG_MATCHES = 50  # matching lines reported per log
+LOG_SEARCH_LINE_CHARS = 500  # longer matching lines are cut
+LOG_INDEX_MAX_ENTRIES = 5000  # finished logs whose trigram bitmap and recent results are kept
+LOG_INDEX_BITS = 1 << 15  # trigram bitmap size per log (4 KB)
+
+# Background Poller (optional): answer /, /api/status and /api/runs from memory
+POLLER_ENABLED = False
+POLL_INTERVAL = 15  # seconds between syncs
+POLL_RUNS_KEPT = 5  # recent runs kept per DAG
+POLL_FULL_SYNC_EVERY = 40  # polls; a full resync picks up new DAGs in the DAG lists
+POLL_OVERLAP = 60  # seconds each incremental sync reaches back
+POLL_FANOUT = 8  # concurrent Airflow requests while polling; apart from STATUS_FANOUT
+
+# Run History (optional): a local SQLite copy of the run and task instance
+# history of the DAGs in the DAG lists, kept current by incremental syncs.
+# /api/runs and /api/tasks answer deep queries (?limit= beyond the recent
+# runs, ?offset=, ?since=/?until= on execution_date) from it.
+HISTORY_ENABLED = False
+HISTORY_DB_PATH = "run_history.sqlite3"
+HISTORY_SYNC_INTERVAL = 30  # seconds between syncs
+HISTORY_BACKFILL_DAYS = 30  # how far back a DAG's first sync reaches
+HISTORY_FANOUT = 4  # concurrent page requests while syncing
+HISTORY_MAX_LIMIT = 1000  # rows per /api/runs or /api/tasks answer; without the store Airflow caps it at its page limit
+
+# Event Stream (/api/stream); starts the poller on first subscriber
+STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+STREAM_MAX_PENDING = 256 * 1024  # unsent bytes before a slow client is dropped
+STREAM_MAX_DAGS = DAGS_MAX_LIMIT  # dag_ids one stream may track: a full page of the listing
 
 # 1. HTML 템플릿
 html_layout = """
@@ -22,6 +172,8 @@ html_layout = """
     <title>Airflow Monitor</title>
     <style>
         body { font-family: sans-serif; padding: 20px; }
+        .controls { margin-bottom: 20px; padding: 10px; background: #f0f0f0; border-radius: 5px; }
+        .controls label { margin-right: 10px; }
         table { border-collapse: collapse; width: 100%; margin-top: 20px; }
         th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
         th { background-color: #f2f2f2; }
@@ -55,7 +207,9 @@ html_layout = """
                 const response = await fetch(`/api/runs?dag_id=$${encodeURIComponent(dagId)}`);
                 const runs = await response.json();
                 
-                let html = '<table class="run-table" style="width:90%; margin:auto;"><thead><tr><th>Run ID</th><th>State</th><th>Execution Date</th></tr></thead><tbody>';
+                const searchId = rowId + '-search';
+                let html = `<div style="width:90%; margin:auto;"><input id="$${searchId}" placeholder="Text to find in these runs' logs" onkeydown="if (event.key === 'Enter') searchLogs('$${dagId}', '$${searchId}')"> <button onclick="searchLogs('$${dagId}', '$${searchId}')">Search logs</button></div>`;
+                html += '<table class="run-table" style="width:90%; margin:auto;"><thead><tr><th>Run ID</th><th>State</th><th>Execution Date</th></tr></thead><tbody>';
                 if (runs.length === 0) {
                      html += '<tr><td colspan="3">No runs found</td></tr>';
                 } else {
@@ -115,10 +269,10 @@ html_layout = """
                             rowClass = "row-failed";
                         }
                         html += `<tr class="$${rowClass}">
-                            <td>$${task.task_id}</td>
+                            <td>$${task.task_id}$${task.map_index >= 0 ? '[' + task.map_index + ']' : ''}</td>
                             <td>$${task.state}</td>
                             <td>$${task.try_number}</td>
-                            <td><button onclick="event.stopPropagation(); fetchLog('$${dagId}', '$${dagRunId}', '$${task.task_id}', $${task.try_number})">View Log</button></td>
+                            <td><button onclick="event.stopPropagation(); fetchLog('$${dagId}', '$${dagRunId}', '$${task.task_id}', $${task.try_number}, $${task.map_index ?? -1})">View Log</button></td>
                         </tr>`;
                     });
                 }
@@ -130,27 +284,100 @@ html_layout = """
             }
         }
 
-        async function fetchLog(dagId, dagRunId, taskId, tryNumber) {
+        // Logs load tail-first; "Load earlier" pages backwards by byte range
+        const LOG_PAGE_BYTES = 64 * 1024;
+        let logState = null;
+
+        async function fetchLog(dagId, dagRunId, taskId, tryNumber, mapIndex) {
             const modal = document.getElementById('logModal');
             const logContent = document.getElementById('logContent');
             
             modal.style.display = "block";
             logContent.textContent = "Loading logs...";
+            document.getElementById('logMore').style.display = "none";
             
+            logState = {
+                url: `/api/logs?dag_id=$${encodeURIComponent(dagId)}&dag_run_id=$${encodeURIComponent(dagRunId)}&task_id=$${encodeURIComponent(taskId)}&try_number=$${encodeURIComponent(tryNumber)}&map_index=$${encodeURIComponent(mapIndex ?? -1)}`,
+                bytes: new Uint8Array(0),
+                start: 0
+            };
+            await loadLogRange(`bytes=-$${LOG_PAGE_BYTES}`);
+        }
+
+        async function loadEarlierLog() {
+            if (!logState || logState.start === 0) return;
+            const from = Math.max(0, logState.start - LOG_PAGE_BYTES);
+            await loadLogRange(`bytes=$${from}-$${logState.start - 1}`);
+        }
+
+        async function loadLogRange(range) {
+            const state = logState;
+            const logContent = document.getElementById('logContent');
             try {
-                const response = await fetch(`/api/logs?dag_id=$${encodeURIComponent(dagId)}&dag_run_id=$${encodeURIComponent(dagRunId)}&task_id=$${encodeURIComponent(taskId)}&try_number=$${encodeURIComponent(tryNumber)}`);
-                const data = await response.json();
-                let cleanContent = data.content;
-                if (typeof cleanContent === 'string') {
-                    cleanContent = cleanContent.replace(/\\\\n/g, '\\n');
-                }
+                const response = await fetch(state.url, { headers: { 'Range': range } });
+                if (!response.ok && response.status !== 416) throw new Error(`HTTP $${response.status}`);
+                const chunk = new Uint8Array(await response.arrayBuffer());
+                if (state !== logState) return; // another log was opened meanwhile
+
+                // "bytes 100-199/500" or "bytes 100-199/*"; plain 200 means the whole log
+                const match = /bytes (\\d+)-/.exec(response.headers.get('Content-Range') || '');
+                const start = match ? parseInt(match[1]) : 0;
+                const merged = new Uint8Array(chunk.length + state.bytes.length);
+                merged.set(chunk);
+                merged.set(state.bytes, chunk.length);
+                state.bytes = merged;
+                state.start = start;
+
+                let cleanContent = new TextDecoder().decode(state.bytes);
+                // Replace literal \\n with actual newline
+                cleanContent = cleanContent.replace(/\\\\n/g, '\\n');
                 logContent.textContent = cleanContent;
+                document.getElementById('logMore').style.display = start > 0 ? "inline" : "none";
             } catch (error) {
                 console.error(error);
                 logContent.textContent = 'Error loading logs: ' + error;
             }
         }
 
+        // Matches arrive as NDJSON lines while the server is still searching
+        async function searchLogs(dagId, inputId) {
+            const pattern = document.getElementById(inputId).value.trim();
+            if (!pattern) return;
+            const logContent = document.getElementById('logContent');
+            document.getElementById('logModal').style.display = "block";
+            document.getElementById('logMore').style.display = "none";
+            const state = logState = { search: pattern, start: 0 };
+            logContent.textContent = `Searching the logs of $${dagId} for "$${pattern}"...\\n\\n`;
+            try {
+                const response = await fetch(`/api/logs/search?dag_id=$${encodeURIComponent(dagId)}&pattern=$${encodeURIComponent(pattern)}`);
+                if (!response.ok) throw new Error(`HTTP $${response.status}`);
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let pending = '';
+                while (true) {
+                    const { done, value } = await reader.read();
+                    if (state !== logState) { reader.cancel(); return; } // another log or search was opened
+                    if (done) break;
+                    pending += decoder.decode(value, { stream: true });
+                    const lines = pending.split('\\n');
+                    pending = lines.pop();
+                    for (const line of lines.filter(Boolean)) {
+                        const item = JSON.parse(line);
+                        if (item.line !== undefined) {
+                            logContent.textContent += `$${item.dag_run_id}  $${item.task_id}$${item.map_index >= 0 ? '[' + item.map_index + ']' : ''}  try $${item.try_number}  line $${item.line_number}:\\n    $${item.line}\\n`;
+                        } else {
+                            logContent.textContent += `\\n$${item.matches} matching lines in $${item.logs} logs of $${item.runs} runs`
+                                + (item.truncated ? ' (stopped at the limit)' : '')
+                                + (item.errors ? `; $${item.errors} logs could not be read` : '');
+                        }
+                    }
+                }
+            } catch (error) {
+                console.error(error);
+                logContent.textContent += '\\nError searching logs: ' + error;
+            }
+        }
+
         function closeModal() {
             document.getElementById('logModal').style.display = "none";
         }
@@ -165,6 +392,7 @@ html_layout = """
 </head>
 <body>
     <h1>Airflow On-prem Status</h1>
+    ${controls}
     <table border="1">
         <tr><th>DAG ID</th><th>State</th><th>Execution Date</th></tr>
         ${table_rows}
@@ -175,6 +403,7 @@ html_layout = """
         <div class="modal-content">
             <span class="close" onclick="closeModal()">&times;</span>
             <h2>Task Log</h2>
+            <button id="logMore" onclick="loadEarlierLog()" style="display:none">Load earlier</button>
             <pre id="logContent"></pre>
         </div>
     </div>
@@ -182,104 +411,2750 @@ html_layout = """
 </html>
 """
 
-def get_airflow_token(username, password):
+# Split once at startup; the index streams its controls and rows in between
+page_head, page_middle, page_tail = Template(html_layout).substitute(controls="\0", table_rows="\0").encode('utf-8').split(b"\0")
+
+class BasicAuth:
+    # Airflow's basic_auth backend: the header never changes, so it is built once
+    def __init__(self, username, password):
+        self.header = "Basic " + base64.b64encode(f"{username}:{password}".encode()).decode()
+
+    def start(self):
+        pass
+
+    def authorization(self):
+        return self.header
+
+    def rejected(self, header):
+        return None  # no other credentials to offer; the 401 stands
+
+    def verify(self, header):
+        return airflow_accepts(header)
+
+    def stats(self):
+        return {"scheme": "basic"}
+
+class TokenAuth:
+    # Bearer tokens from a token endpoint, e.g. Airflow 3's /auth/token. All
+    # requests share one token, which a background thread renews `margin`
+    # seconds before it expires, so no request waits for a token round
+    # trip. Requests only wait when there is no valid token at all (before
+    # the first one, or after renewing kept failing past expiry), and then
+    # all of them wait on the same single fetch.
+    def __init__(self, url, username, password, margin=AUTH_REFRESH_MARGIN, retry=AUTH_RETRY_INTERVAL):
+        self.url = url
+        self.username = username
+        self.password = password
+        self.margin = margin
+        self.retry = retry
+        self.header = None
+        self.expires_at = 0  # monotonic
+        self.renew_at = 0
+        self.retry_at = 0  # no new attempt before this after a failed one
+        self.refreshes = 0
+        self.failures = 0
+        self.lock = threading.Lock()  # held while fetching, so concurrent refreshes collapse into one
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="airflow-auth", daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            self.refresh(self.header)
+            now = time.monotonic()
+            time.sleep(self.renew_at - now if self.renew_at > now else self.retry)
+
+    def authorization(self):
+        header = self.header
+        if header is not None and time.monotonic() < self.expires_at:
+            return header
+        self.start()
+        return self.refresh(header) or ""  # no token to be had; Airflow will answer 401
+
+    def rejected(self, header):
+        # Airflow refused `header` (revoked, or clocks disagree): a new token
+        # to retry with, or None when there is none
+        fresh = self.refresh(header)
+        return fresh if fresh != header else None
+
+    def refresh(self, stale):
+        # Replaces `stale`; returns the current header, which is still
+        # `stale` (or None) if the token endpoint failed
+        with self.lock:
+            now = time.monotonic()
+            if self.header != stale and now < self.expires_at:
+                return self.header  # someone else replaced it while we waited
+            if now < self.retry_at:
+                return self.header  # the last attempt just failed; don't hammer the endpoint
+            try:
+                token, lifetime = self.fetch()
+            except Exception as e:
+                self.failures += 1
+                self.retry_at = now + self.retry
+                metrics.inc("monitor_airflow_auth_refreshes_total", ("error",))
+                print(f"Error fetching an Airflow token: {e}")
+                return self.header
+            self.refreshes += 1
+            self.header = f"Bearer {token}"
+            self.expires_at = now + lifetime
+            self.renew_at = now + lifetime - min(self.margin, lifetime / 2)
+            metrics.inc("monitor_airflow_auth_refreshes_total", ("ok",))
+            return self.header
+
+    def verify(self, header):
+        # Basic credentials are checked by trading them for a token, like ours
+        if not header.startswith("Basic "):
+            return airflow_accepts(header)
+        try:
+            username, _, password = base64.b64decode(header[6:], validate=True).decode().partition(":")
+        except ValueError:
+            return False
+        if not username or not password:
+            return False  # never filled in from our own credentials
+        try:
+            request_token(self.url, username, password)
+        except urllib.error.HTTPError as e:
+            if e.code in (400, 401, 403):
+                return False
+            raise
+        return True
+
+    def fetch(self):
+        # (token, seconds it stays valid) for our own credentials
+        return request_token(self.url, self.username, self.password)
+
+    def stats(self):
+        with self.lock:
+            return {"scheme": "bearer", "valid_for": round(max(0, self.expires_at - time.monotonic())),
+                    "refreshes": self.refreshes, "failures": self.failures}
+
+def request_token(url, username, password):
+    # Trades exactly these credentials for (token, seconds it stays valid)
+    body = json.dumps({"username": username, "password": password}).encode()
+    request = urllib.request.Request(url, data=body, method="POST",
+                                     headers={"Content-Type": "application/json", "Accept": "application/json"})
+    with urllib.request.urlopen(request, timeout=UPSTREAM_TIMEOUT) as response:
+        answer = json.loads(response.read())
+    token = answer["access_token"]
+    return token, float(answer.get("expires_in") or jwt_lifetime(token) or AUTH_DEFAULT_LIFETIME)
+
+def jwt_lifetime(token):
+    # Seconds until a JWT's exp claim; None for opaque tokens
     try:
-        credentials = f"{username}:{password}"
-        encoded_credentials = base64.b64encode(credentials.encode()).decode()
-        return encoded_credentials
-    except Exception as e:
-        print(f"Error fetching token: {e}")
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"]) - time.time()
+    except (IndexError, KeyError, TypeError, ValueError):
         return None
 
-def get_latest_dag_status(dag_id, token):
+def airflow_accepts(header):
+    # True if Airflow answers a request made with the caller's own header
     try:
-        url = f"{AIRFLOW_API_URL}/dags/{dag_id}/dagRuns?limit=1&order_by=-execution_date"
-        headers = { "Authorization": f"Basic {token}", "Content-Type": "application/json" }
-        req = urllib.request.Request(url, headers=headers)
-        
-        with urllib.request.urlopen(req, timeout=5) as response:
-            if response.status == 200:
-                data = json.loads(response.read().decode())
-                dag_runs = data.get("dag_runs", [])
-                if dag_runs:
-                    latest_run = dag_runs[0]
-                    return {
+        airflow_request("GET", f"{AIRFLOW_API_URL}/dags?limit=1", header, retry=False)
+    except urllib.error.HTTPError as e:
+        if e.code in (401, 403):
+            return False
+        raise
+    return True
+
+verified_callers = {}  # sha256 of an Authorization header -> monotonic time it stops counting
+verified_callers_lock = threading.Lock()
+
+def verify_caller(header):
+    # Whether a request may change shared state (upload a DAG list): the
+    # caller must hold credentials Airflow accepts. Raises if Airflow can't
+    # tell right now.
+    if not header:
+        return False
+    key = hashlib.sha256(header.encode()).hexdigest()
+    now = time.monotonic()
+    with verified_callers_lock:
+        if verified_callers.get(key, 0) > now:
+            return True
+    if not airflow_auth.verify(header):
+        return False
+    with verified_callers_lock:
+        for stale in [k for k, until in verified_callers.items() if until <= now]:
+            del verified_callers[stale]
+        verified_callers[key] = now + AUTH_CALLER_TTL
+    return True
+
+airflow_auth = (TokenAuth(AIRFLOW_AUTH_URL, AIRFLOW_USER, AIRFLOW_PASS) if AIRFLOW_AUTH == "token"
+                else BasicAuth(AIRFLOW_USER, AIRFLOW_PASS))
+
+TERMINAL_STATES = {"success", "failed", "upstream_failed", "skipped", "removed"}
+
+class Record:
+    # Compact form of an Airflow object: only `fields` are kept, projected
+    # from the API payload at ingest, with the `interned` ones (few distinct
+    # values, repeated across thousands of records) shared. to_json() is the
+    # object as the dashboard's API answers with it, `exposed` fields only,
+    # encoded on first use and kept, so answers are spliced together from
+    # strings instead of rebuilt from dicts. Records are never mutated.
+    __slots__ = ("json_text",)
+    fields = ()
+    exposed = ()
+    interned = ()
+
+    def __init__(self, *values):
+        for field, value in zip(self.fields, values):
+            if field in self.interned and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, field, value)
+        self.json_text = None
+
+    @classmethod
+    def from_api(cls, data):
+        return cls(*(data.get(field) for field in cls.fields))
+
+    def to_json(self):
+        if self.json_text is None:
+            self.json_text = json.dumps({field: getattr(self, field) for field in self.exposed})
+        return self.json_text
+
+    def to_dict(self):
+        # Every field, for the shared store; from_api reads it back
+        return {field: getattr(self, field) for field in self.fields}
+
+    def __eq__(self, other):
+        return type(other) is type(self) and all(getattr(self, f) == getattr(other, f) for f in self.fields)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(repr(getattr(self, f)) for f in self.fields)})"
+
+class DagRun(Record):
+    fields = ("dag_id", "dag_run_id", "state", "execution_date")
+    __slots__ = fields
+    exposed = ("dag_run_id", "state", "execution_date")
+    interned = ("dag_id", "state")
+
+class TaskInstance(Record):
+    fields = TASK_FIELDS
+    __slots__ = fields
+    exposed = TASK_FIELDS
+    interned = ("task_id", "state")  # the same task ids come back for every run
+
+def project_payload(data):
+    # Airflow payloads the dashboard keeps, with runs and task instances as records
+    if isinstance(data, dict):
+        if isinstance(data.get("dag_runs"), list):
+            data = dict(data, dag_runs=[DagRun.from_api(run) for run in data["dag_runs"]])
+        elif isinstance(data.get("task_instances"), list):
+            data = dict(data, task_instances=[TaskInstance.from_api(task) for task in data["task_instances"]])
+        elif "task_id" in data and "try_number" in data:
+            data = TaskInstance.from_api(data)
+    return data
+
+def dump_json(data):
+    # json.dumps for answers: a list of records is joined from their encoded
+    # forms, records anywhere else are written out in full
+    if isinstance(data, list) and data and isinstance(data[0], Record):
+        return "[" + ", ".join(record.to_json() for record in data) + "]"
+    return json.dumps(data, default=Record.to_dict)
+
+# Data versions: (counter, wall-clock time of the change). BOOT_ID keeps
+# ETags from a previous process from matching after a restart.
+BOOT_ID = os.urandom(4).hex()
+version_counter = itertools.count(1)
+
+def new_version():
+    return (next(version_counter), time.time())
+
+class Metrics:
+    # Counters, gauges and histograms keyed by label values, rendered in the
+    # Prometheus text format. Recording is a dict lookup and an add under one
+    # lock, cheap enough for every request. Collectors are read at scrape
+    # time for values that live elsewhere (cache stats, breaker state).
+    def __init__(self):
+        self.families = OrderedDict()  # name -> (type, help, label names, buckets)
+        self.values = {}  # name -> {label values: number, or [bucket counts..., sum]}
+        self.collectors = OrderedDict()  # name -> (type, help, label names, fn)
+        self.lock = threading.Lock()
+
+    def counter(self, name, help, labels=()):
+        self.families[name] = ("counter", help, labels, None)
+        self.values[name] = {}
+
+    def gauge(self, name, help, labels=()):
+        self.families[name] = ("gauge", help, labels, None)
+        self.values[name] = {}
+
+    def histogram(self, name, help, labels=(), buckets=METRICS_LATENCY_BUCKETS):
+        self.families[name] = ("histogram", help, labels, buckets)
+        self.values[name] = {}
+
+    def collect(self, name, type, help, fn, labels=()):
+        # fn() returns a number, or {label values: number} when labels are given
+        self.collectors[name] = (type, help, labels, fn)
+
+    def inc(self, name, labels=(), amount=1):
+        with self.lock:
+            series = self.values[name]
+            series[labels] = series.get(labels, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        buckets = self.families[name][3]
+        with self.lock:
+            series = self.values[name]
+            counts = series.get(labels)
+            if counts is None:
+                counts = series[labels] = [0] * (len(buckets) + 2)  # buckets, +Inf, sum
+            counts[bisect.bisect_left(buckets, value)] += 1
+            counts[-1] += value
+
+    def render(self):
+        lines = []
+        with self.lock:
+            snapshot = {name: {labels: list(v) if isinstance(v, list) else v for labels, v in series.items()}
+                        for name, series in self.values.items()}
+        for name, (type, help, label_names, buckets) in self.families.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {type}")
+            for labels, value in sorted(snapshot[name].items()):
+                if type != "histogram":
+                    lines.append(f"{name}{format_labels(label_names, labels)} {value}")
+                    continue
+                cumulative = 0
+                for le, count in zip(buckets + ("+Inf",), value[:-1]):
+                    cumulative += count
+                    le_labels = format_labels(label_names + ("le",), labels + (str(le),))
+                    lines.append(f"{name}_bucket{le_labels} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(label_names, labels)} {value[-1]}")
+                lines.append(f"{name}_count{format_labels(label_names, labels)} {cumulative}")
+        for name, (type, help, label_names, fn) in self.collectors.items():
+            try:
+                value = fn()
+            except Exception as e:
+                print(f"Error collecting metric {name}: {e}")
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {type}")
+            series = value if label_names else {(): value}
+            for labels, v in sorted(series.items()):
+                lines.append(f"{name}{format_labels(label_names, labels)} {v}")
+        return "\n".join(lines) + "\n"
+
+class RequestTiming:
+    # Seconds spent per phase (upstream, decode, render, compress, write)
+    # while handling one request, including work it hands to pool threads,
+    # plus the upstream calls made. Pool work overlaps, so phases can add up
+    # to more than the total.
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.upstream = []  # (url, seconds, status)
+        self.upstream_calls = 0
+        self.lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        with self.lock:
+            self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    def add_upstream(self, url, seconds, status):
+        with self.lock:
+            self.phases["upstream"] = self.phases.get("upstream", 0) + seconds
+            self.upstream_calls += 1
+            if len(self.upstream) < TIMING_MAX_UPSTREAM:
+                self.upstream.append((url, seconds, status))
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def header(self):
+        with self.lock:
+            parts = [f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items()]
+            if self.upstream_calls:
+                calls = self.upstream_calls
+                parts[list(self.phases).index("upstream")] += f';desc="{calls} call{"s" if calls != 1 else ""}"'
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+current_timing = threading.local()
+
+@contextmanager
+def timed(phase):
+    timing = getattr(current_timing, "value", None)
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(phase, time.perf_counter() - started)
+
+def carry_timing(fn):
+    # Wraps fn so that, run on a pool thread, its time still counts toward
+    # the request that submitted it
+    timing = getattr(current_timing, "value", None)
+    if timing is None:
+        return fn
+    def run(*args, **kwargs):
+        current_timing.value = timing
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            current_timing.value = None
+    return run
+
+slow_log_lock = threading.Lock()
+
+def log_slow_request(handler, timing, total):
+    entry = {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "method": handler.command,
+        "path": handler.path,
+        "status": handler.status_code,
+        "total_ms": round(total * 1000, 1),
+        "phases_ms": {phase: round(seconds * 1000, 1) for phase, seconds in timing.phases.items()},
+        "upstream_calls": timing.upstream_calls,
+        "upstream": [{"url": url, "ms": round(seconds * 1000, 1), "status": status}
+                     for url, seconds, status in timing.upstream]
+    }
+    try:
+        with slow_log_lock, open(SLOW_REQUEST_LOG, "a", encoding="utf-8") as log_file:
+            log_file.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        print(f"Error writing slow request log: {e}")
+
+profile_lock = threading.Lock()
+
+def sample_stacks(seconds, interval):
+    # Sampling profiler: every `interval` seconds, take the stack of every
+    # other thread. Returns {collapsed stack: samples}, with pool threads
+    # grouped by pool name (handler_3 -> handler).
+    me = threading.get_ident()
+    samples = {}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            key = ";".join([names.get(ident, "unknown").rstrip("0123456789_")] + stack[::-1])
+            samples[key] = samples.get(key, 0) + 1
+        time.sleep(interval)
+    return samples
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+metrics = Metrics()
+metrics.counter("monitor_http_requests_total", "Requests handled, by route, method and status code",
+                ("route", "method", "code"))
+metrics.histogram("monitor_http_request_duration_seconds", "Time from request line to last byte written, by route",
+                  ("route",))
+metrics.counter("monitor_http_response_bytes_total", "Response bytes written, headers included, by route", ("route",))
+metrics.gauge("monitor_http_requests_in_flight", "Requests being handled right now")
+metrics.histogram("monitor_upstream_request_duration_seconds",
+                  "Airflow call latency up to the response headers, by endpoint", ("endpoint",))
+metrics.counter("monitor_upstream_requests_total", "Airflow calls by endpoint and status code (error: no answer)",
+                ("endpoint", "code"))
+metrics.counter("monitor_upstream_errors_total", "Airflow calls that failed: no answer, 5xx or 429", ("endpoint",))
+metrics.counter("monitor_upstream_rejected_total",
+                "Airflow calls never made: pool_exhausted, concurrency_limit or circuit_open",
+                ("reason",))
+metrics.counter("monitor_airflow_auth_refreshes_total", "Bearer token fetches by result: ok or error", ("result",))
+
+class SQLiteStore:
+    # A SQLite file used from many threads and processes: each thread gets
+    # its own connection, and WAL lets readers run alongside one writer
+    def __init__(self, path):
+        self.path = path
+        self.enabled = False
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(self.path, timeout=UPSTREAM_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # a copy of Airflow's data; losing the tail on power loss is fine
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        # IMMEDIATE takes the write lock up front, so read-then-write can't
+        # lose a race with another worker
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+class SharedStore(SQLiteStore):
+    # SQLite file the worker processes share: the response cache, leases (who
+    # fetches a key, which worker polls), the poller's run snapshots and
+    # events, and which DAGs each worker's stream clients follow. Disabled
+    # (and never touched) in a single process.
+    def __init__(self, path=SHARED_STORE_PATH):
+        super().__init__(path)
+
+    def open(self):
+        with self.transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                         "expires_at REAL NOT NULL, version INTEGER NOT NULL, changed_at REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, holder INTEGER NOT NULL, "
+                         "until REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS runs (dag_id TEXT PRIMARY KEY, runs TEXT NOT NULL, "
+                         "version INTEGER NOT NULL, changed_at REAL NOT NULL, seq INTEGER NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_seq ON runs (seq)")
+            conn.execute("CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                         "event TEXT NOT NULL, data TEXT NOT NULL, created REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS streams (worker INTEGER PRIMARY KEY, clients INTEGER NOT NULL, "
+                         "dag_ids TEXT NOT NULL, seen REAL NOT NULL)")
+        self.enabled = True
+
+    def get(self, key):
+        # (value, expires_at wall-clock time, version) or None
+        row = self.connection().execute(
+            "SELECT value, expires_at, version, changed_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return project_payload(json.loads(row[0])), row[1], (row[2], row[3])
+
+    def put(self, key, value, ttl):
+        # Returns the entry's version, unchanged if the value is identical to the stored one
+        text = json.dumps(value, default=Record.to_dict)
+        with self.transaction() as conn:
+            row = conn.execute("SELECT value, version, changed_at FROM cache WHERE key = ?", (key,)).fetchone()
+            version = (row[1], row[2]) if row and row[0] == text else new_version()
+            conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                         (key, text, time.time() + ttl, *version))
+        return version
+
+    def lease(self, name, seconds):
+        # True if this process holds (or now takes, or renews) the lease
+        now = time.time()
+        holder = os.getpid()
+        with self.transaction() as conn:
+            row = conn.execute("SELECT holder, until FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != holder and row[1] > now:
+                return False
+            conn.execute("INSERT OR REPLACE INTO leases VALUES (?, ?, ?)", (name, holder, now + seconds))
+            return True
+
+    def release(self, name):
+        self.connection().execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, os.getpid()))
+
+    def put_runs(self, items):
+        # items: (dag_id, runs, version); readers follow the seq column
+        with self.transaction() as conn:
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM runs").fetchone()[0]
+            conn.executemany("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?)",
+                             [(dag_id, dump_json([run.to_dict() for run in runs]), *version, seq + i)
+                              for i, (dag_id, runs, version) in enumerate(items, 1)])
+
+    def runs_since(self, seq):
+        # [(seq, dag_id, runs, version)] written after `seq`
+        rows = self.connection().execute(
+            "SELECT seq, dag_id, runs, version, changed_at FROM runs WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+        return [(row[0], row[1], json.loads(row[2]), (row[3], row[4])) for row in rows]
+
+    def add_event(self, event, data):
+        self.connection().execute("INSERT INTO events (event, data, created) VALUES (?, ?, ?)",
+                                  (event, json.dumps(data), time.time()))
+
+    def events_since(self, event_id):
+        # [(id, event, data)] added after `event_id`
+        rows = self.connection().execute(
+            "SELECT id, event, data FROM events WHERE id > ? ORDER BY id", (event_id,)).fetchall()
+        return [(row[0], row[1], json.loads(row[2])) for row in rows]
+
+    def last_event_id(self):
+        return self.connection().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def report_streams(self, clients, dag_ids):
+        self.connection().execute("INSERT OR REPLACE INTO streams VALUES (?, ?, ?, ?)",
+                                  (os.getpid(), clients, json.dumps(sorted(dag_ids)), time.time()))
+
+    def stream_interest(self):
+        # (stream clients, dag_ids they follow) over all live workers
+        since = time.time() - 10 * SHARED_SYNC_INTERVAL
+        rows = self.connection().execute("SELECT clients, dag_ids FROM streams WHERE seen > ?", (since,)).fetchall()
+        return sum(row[0] for row in rows), set().union(*(json.loads(row[1]) for row in rows))
+
+    def reset(self):
+        # A new supervisor: cached responses stay valid, the rest belonged to the old workers
+        with self.transaction() as conn:
+            for table in ("leases", "runs", "events", "streams"):
+                conn.execute(f"DELETE FROM {table}")
+
+    def prune(self, max_entries=CACHE_MAX_ENTRIES * WORKER_PROCESSES, stale=CACHE_STALE):
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM cache WHERE expires_at < ?", (now - stale,))
+            conn.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at DESC "
+                         "LIMIT -1 OFFSET ?)", (max_entries,))
+            conn.execute("DELETE FROM leases WHERE until < ?", (now,))
+            conn.execute("DELETE FROM events WHERE created < ?", (now - SHARED_EVENTS_KEPT,))
+            conn.execute("DELETE FROM streams WHERE seen < ?", (now - 10 * SHARED_SYNC_INTERVAL,))
+
+    def stats(self):
+        if not self.enabled:
+            return None
+        conn = self.connection()
+        return {
+            "path": self.path,
+            "worker": os.getpid(),
+            "entries": conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0],
+            "leases": conn.execute("SELECT COUNT(*) FROM leases WHERE until > ?", (time.time(),)).fetchone()[0]
+        }
+
+shared_store = SharedStore()
+
+class ResponseCache:
+    # Size-bounded LRU of parsed Airflow responses. Each entry carries its own
+    # TTL; once expired it is still served for up to `stale` seconds while a
+    # background refresh fetches the new value. An entry's version only
+    # changes when a refresh brings back different data. With worker
+    # processes, shared_store is a second level under every worker's LRU.
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, stale=CACHE_STALE):
+        self.max_entries = max_entries
+        self.stale = stale
+        self.entries = OrderedDict()  # key -> (value, expires_at, version)
+        self.refreshing = set()
+        self.lock = threading.Lock()
+        self.refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+        self.hits = 0
+        self.stale_hits = 0
+        self.last_known_hits = 0  # expired entries served while the circuit was open
+        self.shared_hits = 0  # entries another worker fetched
+        self.misses = 0
+
+    def peek(self, key, record=True):
+        # Fresh value or None; never fetches
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and time.monotonic() < entry[1]:
+                self.entries.move_to_end(key)
+                if record:
+                    self.hits += 1
+                return entry[0]
+        value = self.adopt(key, fresh=True) if shared_store.enabled else None
+        if record:
+            with self.lock:
+                if value is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        return value
+
+    def contains(self, key):
+        # Fresh or still servable while stale
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and time.monotonic() < entry[1] + self.stale:
+                return True
+        return shared_store.enabled and self.adopt(key) is not None
+
+    def adopt(self, key, fresh=False):
+        # Copies another worker's entry from the shared store into this cache
+        # and returns its value; None if there is none (or only a stale one)
+        row = shared_store.get(key)
+        if row is None:
+            return None
+        value, expires_at, version = row
+        ttl = expires_at - time.time()
+        if ttl <= (0 if fresh else -self.stale):
+            return None
+        self.store(key, value, ttl, version)
+        with self.lock:
+            self.shared_hits += 1
+        return value
+
+    def version(self, key):
+        # (version, changed_at) of a fresh entry, else None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and time.monotonic() < entry[1]:
+                return entry[2]
+            return None
+
+    def put(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        # The shared entry's version wins, so ETags agree across workers
+        self.store(key, value, ttl, shared_store.put(key, value, ttl) if shared_store.enabled else None)
+
+    def store(self, key, value, ttl, version=None):
+        with self.lock:
+            old = self.entries.get(key)
+            if version is None:
+                if old and old[0] == value:
+                    value, version = old[0], old[2]
+                else:
+                    version = new_version()
+            self.entries[key] = (value, time.monotonic() + ttl, version)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_or_fetch(self, key, fetch, ttl_for):
+        if shared_store.enabled and key not in self.entries:
+            self.adopt(key)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                value, expires_at, _ = entry
+                now = time.monotonic()
+                if now < expires_at:
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                    return value
+                if now < expires_at + self.stale:
+                    self.stale_hits += 1
+                    self.entries.move_to_end(key)
+                    if key not in self.refreshing:
+                        self.refreshing.add(key)
+                        self.refresh_pool.submit(self.refresh, key, fetch, ttl_for)
+                    return value
+            self.misses += 1
+
+        try:
+            return self.load(key, fetch, ttl_for)
+        except CircuitOpenError:
+            # Airflow is being left alone; whatever we last saw beats nothing
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is None:
+                    raise
+                self.last_known_hits += 1
+                return entry[0]
+
+    def load(self, key, fetch, ttl_for):
+        # Fetches and stores a value. With worker processes one of them
+        # fetches a key at a time; the others wait for its result to show up
+        # in the shared store (or for the lease to run out).
+        leased = False
+        if shared_store.enabled:
+            lease = f"fetch {key}"
+            deadline = time.monotonic() + INFLIGHT_TIMEOUT
+            while not (leased := shared_store.lease(lease, INFLIGHT_TIMEOUT)) and time.monotonic() < deadline:
+                time.sleep(SHARED_WAIT_INTERVAL)
+                value = self.adopt(key, fresh=True)
+                if value is not None:
+                    return value
+            # The previous holder may have finished just before we got the lease
+            value = self.adopt(key, fresh=True) if leased else None
+            if value is not None:
+                shared_store.release(lease)
+                return value
+        try:
+            value = fetch()
+            self.put(key, value, ttl_for(value))
+            return value
+        finally:
+            if leased:
+                shared_store.release(lease)
+
+    def refresh(self, key, fetch, ttl_for):
+        try:
+            # Another worker may have refreshed it already
+            if not shared_store.enabled or self.adopt(key, fresh=True) is None:
+                self.load(key, fetch, ttl_for)
+        except CircuitOpenError:
+            pass  # keep serving the stale value until Airflow is back
+        except Exception as e:
+            print(f"Error refreshing cache entry {key}: {e}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "last_known_hits": self.last_known_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "refreshing": len(self.refreshing)
+            }
+
+api_cache = ResponseCache()
+
+def runs_ttl(data):
+    # A finished run never changes, but a new run can start at any time
+    runs = data.get("dag_runs", [])
+    if all(r.state in TERMINAL_STATES for r in runs):
+        return CACHE_TTL_IDLE
+    return CACHE_TTL_ACTIVE
+
+def tasks_ttl(data):
+    tasks = data.get("task_instances", [])
+    if tasks and all(t.state in TERMINAL_STATES for t in tasks):
+        return CACHE_TTL_TERMINAL
+    return CACHE_TTL_ACTIVE
+
+def dag_runs_url(dag_id, limit, offset=0, since=None, until=None):
+    url = f"{AIRFLOW_API_URL}/dags/{dag_id}/dagRuns?limit={limit}&order_by=-execution_date"
+    if offset:
+        url += f"&offset={offset}"
+    if since:
+        url += f"&execution_date_gte={urllib.parse.quote(since)}"
+    if until:
+        url += f"&execution_date_lte={urllib.parse.quote(until)}"
+    return url
+
+def task_instances_url(dag_id, dag_run_id):
+    # URL parsing to handle special chars in dag_run_id if necessary, but urllib.parse.quote helps
+    safe_dag_run_id = urllib.parse.quote(dag_run_id)
+    return f"{AIRFLOW_API_URL}/dags/{dag_id}/dagRuns/{safe_dag_run_id}/taskInstances"
+
+def task_instance_url(dag_id, dag_run_id, task_id, map_index=-1):
+    url = f"{task_instances_url(dag_id, dag_run_id)}/{task_id}"
+    return f"{url}/{map_index}" if map_index >= 0 else url
+
+def task_log_url(dag_id, dag_run_id, task_id, try_number, map_index=-1):
+    safe_dag_run_id = urllib.parse.quote(dag_run_id)
+    # Note: endpoint for logs might be different versions. Assuming /dags/{dag_id}/dagRuns/{dag_run_id}/taskInstances/{task_id}/logs/{task_try_number}
+    url = f"{AIRFLOW_API_URL}/dags/{dag_id}/dagRuns/{safe_dag_run_id}/taskInstances/{task_id}/logs/{try_number}"
+    return f"{url}?map_index={map_index}" if map_index >= 0 else url
+
+def parse_map_index(value):
+    # Airflow numbers a mapped task's instances from 0; -1 is an unmapped task
+    return -1 if value in (None, "") else int(value)
+
+class AirflowConnectionPool:
+    # Thread-safe pool of persistent HTTP/1.1 connections to one host. At most
+    # `size` connections are open at once; callers beyond that wait for a free
+    # one. Connections the server closed while idle are transparently reopened.
+    def __init__(self, base_url, size=POOL_SIZE, idle_timeout=POOL_IDLE_TIMEOUT, timeout=UPSTREAM_TIMEOUT):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.idle = []  # (connection, last_used), most recently used last
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        # Claims one of the `size` connections; open(reserved=True) then uses it
+        if not self.slots.acquire(timeout=self.timeout):
+            raise TimeoutError("Timed out waiting for a free Airflow connection")
+
+    def unreserve(self):
+        self.slots.release()
+
+    def acquire(self):
+        self.reserve()
+        return self.checkout()
+
+    def checkout(self):
+        # Newest idle connection first; ones idle past idle_timeout are
+        # closed from the bottom of the stack, where they would otherwise
+        # sit unchecked for as long as the newer ones keep getting reused
+        now = time.monotonic()
+        with self.lock:
+            expired = 0
+            while expired < len(self.idle) and now - self.idle[expired][1] >= self.idle_timeout:
+                self.idle[expired][0].close()
+                expired += 1
+            del self.idle[:expired]
+            if self.idle:
+                return self.idle.pop()[0], True
+        return self.connection_class(self.host, self.port, timeout=self.timeout), False
+
+    def release(self, conn, reusable):
+        if reusable:
+            with self.lock:
+                self.idle.append((conn, time.monotonic()))
+        else:
+            conn.close()
+        self.slots.release()
+
+    @contextmanager
+    def open(self, method, url, body=None, headers=None, reserved=False):
+        # Yields the response unread; the connection goes back to the pool
+        # only if the body was fully consumed
+        parsed = urllib.parse.urlsplit(url)
+        target = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+        conn, reused = self.checkout() if reserved else self.acquire()
+        while True:
+            try:
+                conn.request(method, target, body=body, headers=headers or {})
+                response = conn.getresponse()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if reused:
+                    # stale keep-alive connection; retry on another one, keeping the slot
+                    conn.close()
+                    conn, reused = self.checkout()
+                    continue
+                self.release(conn, False)
+                raise
+            except Exception:
+                self.release(conn, False)
+                raise
+        try:
+            yield response
+        finally:
+            self.release(conn, response.isclosed() and not response.will_close)
+
+    def request(self, method, url, body=None, headers=None, reserved=False):
+        with self.open(method, url, body=body, headers=headers, reserved=reserved) as response:
+            return response.status, response.headers, response.read()
+
+    def close(self):
+        with self.lock:
+            for conn, _ in self.idle:
+                conn.close()
+            self.idle.clear()
+
+airflow_pool = AirflowConnectionPool(AIRFLOW_API_URL)
+airflow_log_pool = AirflowConnectionPool(AIRFLOW_API_URL, size=LOG_POOL_SIZE)  # so long log reads can't starve API calls
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    # Closed: calls go through. After `failures` failed calls in a row it
+    # opens and calls fail immediately. After `cooldown` seconds a single
+    # probe call is let through (half-open); its outcome closes the circuit
+    # or opens it for another cooldown.
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0
+        self.probing = False
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok):
+        with self.lock:
+            self.probing = False
+            if ok:
+                self.consecutive_failures = 0
+                if self.state != "closed":
+                    print("Airflow is answering again; circuit closed")
+                self.state = "closed"
+                return
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failures:
+                if self.state == "closed":
+                    print(f"Circuit to Airflow opened after {self.consecutive_failures} failed calls")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def is_closed(self):
+        return self.state == "closed"
+
+    def stats(self):
+        with self.lock:
+            return {"state": self.state, "consecutive_failures": self.consecutive_failures, "rejected": self.rejected}
+
+class AdaptiveLimit:
+    # AIMD limit on concurrent upstream calls: every good call raises it by
+    # 1/limit (about +1 per round trip), a slow or failed call multiplies it
+    # by `backoff`, at most once per `latency_target` so a burst of failures
+    # doesn't collapse it to the minimum at once.
+    def __init__(self, minimum=LIMIT_MIN, maximum=LIMIT_MAX, latency_target=LIMIT_LATENCY_TARGET,
+                 backoff=LIMIT_BACKOFF, wait=LIMIT_WAIT):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.wait = wait
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self.last_decrease = 0
+        self.shed = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.in_flight < int(self.limit), timeout=self.wait):
+                self.shed += 1
+                raise TimeoutError(f"Airflow concurrency limit ({int(self.limit)}) reached")
+            self.in_flight += 1
+
+    def release(self, latency=None, ok=True):
+        # Without a latency the call never went out and the limit stays as is
+        with self.cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if latency is None:
+                pass
+            elif ok and latency <= self.latency_target:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif now - self.last_decrease >= self.latency_target:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+                self.last_decrease = now
+            self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            return {"limit": round(self.limit, 2), "in_flight": self.in_flight, "shed": self.shed}
+
+airflow_breaker = CircuitBreaker()
+airflow_limit = AdaptiveLimit()
+
+def serving_stale():
+    # While the circuit isn't closed, answers come from last known data
+    return not airflow_breaker.is_closed()
+
+def mark_stale(status):
+    return dict(status, stale=True) if serving_stale() else status
+
+def begin_upstream():
+    # Every call to Airflow passes through here; returns the start time for end_upstream
+    try:
+        airflow_limit.acquire()
+    except TimeoutError:
+        metrics.inc("monitor_upstream_rejected_total", ("concurrency_limit",))
+        raise
+    if not airflow_breaker.allow():
+        airflow_limit.release()
+        metrics.inc("monitor_upstream_rejected_total", ("circuit_open",))
+        raise CircuitOpenError("Airflow circuit is open; not calling upstream")
+    return time.monotonic()
+
+def reserve_upstream(pool):
+    # A connection is claimed before the limit and the breaker see the call:
+    # waiting for one is a local shortage, not something to hold against Airflow
+    try:
+        pool.reserve()
+    except TimeoutError:
+        metrics.inc("monitor_upstream_rejected_total", ("pool_exhausted",))
+        raise
+    try:
+        return begin_upstream()
+    except BaseException:
+        pool.unreserve()
+        raise
+
+def end_upstream(url, started, status):
+    # status is None when no answer came back at all
+    latency = time.monotonic() - started
+    ok = status is not None and upstream_healthy(status)
+    airflow_limit.release(latency, ok)
+    airflow_breaker.record(ok)
+    timing = getattr(current_timing, "value", None)
+    if timing is not None:
+        timing.add_upstream(url, latency, status)
+    endpoint = upstream_endpoint(url)
+    metrics.observe("monitor_upstream_request_duration_seconds", latency, (endpoint,))
+    metrics.inc("monitor_upstream_requests_total", (endpoint, str(status) if status is not None else "error"))
+    if not ok:
+        metrics.inc("monitor_upstream_errors_total", (endpoint,))
+
+def upstream_healthy(status):
+    # 4xx answers are about the request, not Airflow's health
+    return status < 500 and status != 429
+
+UPSTREAM_ID_SEGMENTS = {"dags": "{dag_id}", "dagRuns": "{dag_run_id}", "taskInstances": "{task_id}",
+                        "{task_id}": "{map_index}", "logs": "{try_number}"}
+
+def upstream_endpoint(url):
+    # /api/v1/dags/a/dagRuns/b/taskInstances -> /api/v1/dags/{dag_id}/dagRuns/{dag_run_id}/taskInstances
+    segments = urllib.parse.urlsplit(url).path.split("/")
+    for i in range(1, len(segments)):
+        placeholder = UPSTREAM_ID_SEGMENTS.get(segments[i - 1])
+        if placeholder and segments[i] != "~" and segments[i] not in UPSTREAM_ID_SEGMENTS:
+            segments[i] = placeholder
+    return "/".join(segments)
+
+def airflow_request(method, url, token, body=None, retry=True):
+    # `token` is the Authorization header value from airflow_auth
+    headers = { "Authorization": token, "Content-Type": "application/json" }
+    started = reserve_upstream(airflow_pool)
+    status = None
+    try:
+        status, response_headers, data = airflow_pool.request(method, url, body=body, headers=headers, reserved=True)
+    finally:
+        end_upstream(url, started, status)
+    if status == 401 and retry:
+        fresh = airflow_auth.rejected(token)
+        if fresh:
+            return airflow_request(method, url, fresh, body=body, retry=False)
+    if status >= 400:
+        raise urllib.error.HTTPError(url, status, http.client.responses.get(status, ""), response_headers, None)
+    return data
+
+@contextmanager
+def airflow_stream(url, token, accept="text/plain", retry=True):
+    # Only the wait for the response headers counts toward the limit and the
+    # breaker; a log can take as long as it likes to stream, on a connection
+    # from its own pool
+    headers = { "Authorization": token, "Accept": accept }
+    fresh = None
+    started = reserve_upstream(airflow_log_pool)
+    try:
+        with airflow_log_pool.open("GET", url, headers=headers, reserved=True) as response:
+            end_upstream(url, started, response.status)
+            started = None
+            if response.status == 401 and retry:
+                response.read()  # keeps the connection reusable
+                fresh = airflow_auth.rejected(token)
+            if not fresh:
+                if response.status >= 400:
+                    raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+                yield response
+    finally:
+        if started is not None:
+            end_upstream(url, started, None)
+    if fresh:
+        # Retried outside the first request, so it doesn't hold two pool connections
+        with airflow_stream(url, fresh, accept, retry=False) as response:
+            yield response
+
+class SingleFlight:
+    # Collapses identical concurrent upstream calls: the first caller for a
+    # key runs it, everyone arriving while it is in flight waits on the same
+    # future and gets its result or its exception. Nothing is kept once the
+    # call finishes; caching is ResponseCache's job.
+    def __init__(self, timeout=INFLIGHT_TIMEOUT):
+        self.timeout = timeout
+        self.calls = {}  # key -> Future
+        self.lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            if call is None:
+                call = self.calls[key] = Future()
+                self.leaders += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+
+        if not leader:
+            return call.result(timeout=self.timeout)  # raises TimeoutError or the leader's exception
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+    def stats(self):
+        with self.lock:
+            return {"in_flight": len(self.calls), "upstream_calls": self.leaders, "coalesced": self.shared}
+
+inflight = SingleFlight()
+
+def fetch_json(url, token):
+    # The token is part of the key so callers never share another user's answer
+    return inflight.do(("GET", url, token), lambda: decode_json(url, airflow_request("GET", url, token)))
+
+def post_json(url, body, token):
+    return decode_json(url, airflow_request("POST", url, token, body=json.dumps(body).encode()))
+
+def decode_json(url, data):
+    raw_data = data.decode()
+    try:
+        with timed("decode"):
+            return json.loads(raw_data)
+    except json.JSONDecodeError:
+        print(f"Error: Expected JSON but got something else from {url}")
+        print(f"First 500 chars: {raw_data[:500]}")
+        raise
+
+def cached_fetch_json(url, token, ttl_for):
+    return api_cache.get_or_fetch(url, lambda: project_payload(fetch_json(url, token)), ttl_for)
+
+def status_from_run(dag_id, run):
+    return {
+        "dag_id": dag_id,
+        "dag_run_id": run.dag_run_id,
+        "state": run.state,
+        "execution_date": run.execution_date
+    }
+
+class EventStream:
+    # Server-Sent Events fan-out. Subscribed sockets are detached from their
+    # worker thread and written to non-blocking from whichever thread
+    # publishes, so an idle stream costs a socket and a dict entry.
+    def __init__(self):
+        self.clients = {}  # socket -> [dag_ids, unsent bytes]
+        self.lock = threading.Lock()
+        self.heartbeat = threading.Thread(target=self.run_heartbeat, name="sse-heartbeat", daemon=True)
+
+    def subscribe(self, sock, dag_ids):
+        sock.setblocking(False)
+        with self.lock:
+            self.clients[sock] = [dag_ids, b""]
+            if not self.heartbeat.is_alive():
+                self.heartbeat.start()
+
+    def dag_ids(self):
+        with self.lock:
+            return set().union(*(c[0] for c in self.clients.values()))
+
+    def publish(self, event, data):
+        message = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+        with self.lock:
+            for sock, client in list(self.clients.items()):
+                if data.get("dag_id") in client[0]:
+                    self.send(sock, client, message)
+
+    def send(self, sock, client, message):
+        # Called with self.lock held
+        pending = client[1] + message
+        try:
+            sent = sock.send(pending)
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self.drop(sock)
+            return
+        client[1] = pending[sent:]
+        if len(client[1]) > STREAM_MAX_PENDING:
+            self.drop(sock)  # reader is too slow; it will reconnect and resync
+
+    def drop(self, sock):
+        self.clients.pop(sock, None)
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def run_heartbeat(self):
+        # Comment lines keep proxies from timing out and reveal dead clients
+        while True:
+            time.sleep(STREAM_HEARTBEAT)
+            with self.lock:
+                for sock, client in list(self.clients.items()):
+                    self.send(sock, client, b": ping\n\n")
+
+event_stream = EventStream()
+
+SAFE_ID = re.compile(r"[A-Za-z0-9_.-]+")  # Airflow's dag_id characters
+
+def parse_dag_csv(lines):
+    # A dag_id column under a header, or one dag_id per line without one
+    rows = csv.reader(lines)
+    column = 0
+    dag_ids = []
+    for i, row in enumerate(rows):
+        cells = [cell.strip() for cell in row]
+        if i == 0 and "dag_id" in cells:
+            column = cells.index("dag_id")
+            continue
+        if len(cells) > column and cells[column] and not cells[column].startswith("#"):
+            dag_ids.append(cells[column])
+    return tuple(dict.fromkeys(dag_ids))
+
+class DagListRegistry:
+    # Named DAG lists parsed once into memory. The list files are re-checked
+    # at most every `check_interval` seconds and a file is only re-parsed
+    # when its mtime changes, so requests never touch the disk themselves.
+    def __init__(self, directories=DAG_LIST_DIRS, check_interval=DAG_LIST_CHECK_INTERVAL):
+        self.directories = directories
+        self.upload_directory = directories[-1]
+        self.check_interval = check_interval
+        self.lists = {}  # name -> (path, mtime_ns, dag_ids)
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def valid_name(self, name):
+        return bool(name) and len(name) <= 100 and not name.startswith(".") and not any(c in name for c in "/\\\0")
+
+    def uploadable_name(self, name):
+        # Names people type in end up in the page; keep them to dag_id characters
+        return self.valid_name(name) and SAFE_ID.fullmatch(name) is not None
+
+    def refresh(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.checked_at is not None and now - self.checked_at < self.check_interval:
+                return
+            self.checked_at = now
+            found = {}
+            for directory in self.directories:
+                try:
+                    file_names = os.listdir(directory)
+                except FileNotFoundError:
+                    continue
+                for file_name in file_names:
+                    name = file_name[:-len(".csv")]
+                    if file_name.endswith(".csv") and self.valid_name(name) and name not in found:
+                        found[name] = os.path.join(directory, file_name)
+            lists = {}
+            for name, path in found.items():
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                    cached = self.lists.get(name)
+                    if cached and cached[0] == path and cached[1] == mtime:
+                        lists[name] = cached
+                        continue
+                    with open(path, mode='r', encoding='utf-8-sig', newline='') as csvfile:
+                        lists[name] = (path, mtime, parse_dag_csv(csvfile))
+                except (OSError, UnicodeDecodeError, csv.Error) as e:
+                    print(f"Error reading DAG list {path}: {e}")
+                    if name in self.lists:
+                        lists[name] = self.lists[name]  # keep the last good parse
+            self.lists = lists
+
+    def get(self, name=DAG_LIST_DEFAULT):
+        # dag_ids of a list, or None if there is no such list
+        self.refresh()
+        entry = self.lists.get(name)
+        return entry[2] if entry else None
+
+    def names(self):
+        self.refresh()
+        return {name: len(entry[2]) for name, entry in sorted(self.lists.items())}
+
+    def all_dag_ids(self):
+        self.refresh()
+        return set().union(*(entry[2] for entry in self.lists.values()))
+
+    def upload(self, name, text):
+        # Saves an uploaded list as a CSV file; raises ValueError if the name or
+        # a dag_id is invalid, the list or the number of lists is over its
+        # limit, or the name belongs to one of the lists shipped with the server
+        dag_ids = parse_dag_csv(text.splitlines())
+        if not self.uploadable_name(name or ""):
+            raise ValueError("Invalid list name; use letters, digits, '_', '.' and '-'")
+        if not dag_ids:
+            raise ValueError("No dag_ids in the uploaded list")
+        if len(dag_ids) > DAG_LIST_MAX_DAGS:
+            raise ValueError(f"More than {DAG_LIST_MAX_DAGS} dag_ids in the uploaded list")
+        invalid = next((dag_id for dag_id in dag_ids if not SAFE_ID.fullmatch(dag_id)), None)
+        if invalid is not None:
+            raise ValueError(f"Invalid dag_id: {invalid[:100]!r}")
+        self.refresh()
+        with self.lock:
+            existing = self.lists.get(name)
+            if existing and os.path.dirname(existing[0]) != self.upload_directory:
+                raise ValueError(f"List {name} is not an uploaded list and can't be replaced")
+            uploaded = sum(os.path.dirname(entry[0]) == self.upload_directory for entry in self.lists.values())
+            if not existing and uploaded >= DAG_LIST_MAX_UPLOADED:
+                raise ValueError(f"There are already {DAG_LIST_MAX_UPLOADED} uploaded lists")
+            os.makedirs(self.upload_directory, exist_ok=True)
+            path = os.path.join(self.upload_directory, f"{name}.csv")
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, mode='w', encoding='utf-8', newline='') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(["dag_id"])
+                writer.writerows([dag_id] for dag_id in dag_ids)
+            os.replace(tmp_path, path)
+            self.lists[name] = (path, os.stat(path).st_mtime_ns, dag_ids)
+        return dag_ids
+
+dag_lists = DagListRegistry()
+
+# The poller's own threads: while it syncs, index renders answered from its
+# snapshot never queue behind its upstream calls in status_pool
+poll_pool = ThreadPoolExecutor(max_workers=POLL_FANOUT, thread_name_prefix="poll")
+
+class DagRunPoller(threading.Thread):
+    # Keeps the most recent runs of every DAG in the DAG lists in memory. After one
+    # full sync it only asks Airflow for runs updated since the previous poll,
+    # so upstream load follows the rate of change, not the number of viewers.
+    # State changes are published to event_stream. With worker processes only
+    # the worker holding the "poller" lease polls; it writes runs and events
+    # to shared_store and relay_shared_state copies them into every worker.
+    def __init__(self, interval=POLL_INTERVAL):
+        super().__init__(name="dag-poller", daemon=True)
+        self.interval = interval
+        self.runs = {}  # dag_id -> recent DagRuns, newest first
+        self.versions = {}  # dag_id -> version of its runs, for ETags
+        self.extra_dag_ids = set()  # tracked on behalf of stream subscribers
+        self.new_dag_ids = set()  # tracked since the last poll, not fetched yet
+        self.task_states = {}  # (dag_id, dag_run_id) -> {(task_id, map_index): (state, try_number)}
+        self.lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.watermark = None  # updated_at_gte for the next incremental sync
+        self.ready = False
+        self.leading = False  # this worker polls for all of them
+        self.polls = 0
+
+    def ensure_started(self):
+        with self.start_lock:
+            if not self.is_alive():
+                self.start()
+
+    def track(self, dag_ids):
+        with self.lock:
+            new = set(dag_ids) - self.extra_dag_ids - self.runs.keys()
+            self.extra_dag_ids.update(new)
+            self.new_dag_ids.update(new)  # fetched on their own on the next poll
+
+    def run(self):
+        while True:
+            if shared_store.enabled and not self.lead():
+                time.sleep(self.interval)
+                continue
+            token = airflow_auth.authorization()
+            try:
+                clients, dag_ids = self.streamed()
+                self.track(dag_ids)
+                if self.watermark is None or self.polls % POLL_FULL_SYNC_EVERY == 0:
+                    self.full_sync(token)
+                else:
+                    self.sync_new(token)
+                    self.incremental_sync(token)
+                self.ready = True
+                if clients:
+                    self.sync_tasks(token)
+            except Exception as e:
+                print(f"Error polling dag runs: {e}")
+                self.watermark = None  # resync everything next time
+            self.polls += 1
+            time.sleep(self.interval)
+
+    def lead(self):
+        # Take or renew the poller lease; a worker that dies loses it after
+        # a few intervals and another one takes over with a full sync
+        try:
+            leading = shared_store.lease("poller", 3 * self.interval)
+        except sqlite3.Error as e:
+            print(f"Error taking the poller lease: {e}")
+            leading = False
+        if not leading:
+            self.watermark = None
+        self.leading = leading
+        return leading
+
+    def streamed(self):
+        # (stream clients, dag_ids they follow), over all workers if there are several
+        if shared_store.enabled:
+            return shared_store.stream_interest()
+        return len(event_stream.clients), event_stream.dag_ids()
+
+    def publish(self, event, data):
+        if shared_store.enabled:
+            shared_store.add_event(event, data)
+        else:
+            event_stream.publish(event, data)
+
+    def share(self, dag_ids):
+        # Hand the changed runs to the other workers
+        if not shared_store.enabled or not dag_ids:
+            return
+        with self.lock:
+            items = [(dag_id, self.runs[dag_id], self.versions[dag_id]) for dag_id in dag_ids if dag_id in self.runs]
+        shared_store.put_runs(items)
+
+    def mirror(self, rows):
+        # The polling worker's runs, on every other worker
+        with self.lock:
+            for _, dag_id, runs, version in rows:
+                self.runs[dag_id] = [DagRun.from_api(run) for run in runs]
+                self.versions[dag_id] = version
+        self.ready = True
+
+    def sync_started(self):
+        # Overlap polls a little so clock skew with Airflow can't lose an update
+        started = datetime.now(timezone.utc) - timedelta(seconds=POLL_OVERLAP)
+        return started.isoformat()
+
+    def full_sync(self, token):
+        started = self.sync_started()
+        with self.lock:
+            self.extra_dag_ids &= self.streamed()[1]  # forget DAGs nobody streams anymore
+            dag_ids = dag_lists.all_dag_ids() | self.extra_dag_ids
+            self.new_dag_ids.clear()
+        runs = self.fetch_recent(dag_ids, token)
+        with self.lock:
+            previous, self.runs = self.runs, runs
+            self.versions = {dag_id: self.versions[dag_id] if previous.get(dag_id) == dag_runs else new_version()
+                             for dag_id, dag_runs in runs.items()}
+        for dag_id, dag_runs in runs.items():
+            if dag_id in previous:
+                self.publish_status(dag_id, previous[dag_id], dag_runs)
+        self.share([dag_id for dag_id, dag_runs in runs.items() if previous.get(dag_id) != dag_runs])
+        self.watermark = started
+
+    def fetch_recent(self, dag_ids, token):
+        # dag_id -> recent runs; a DAG that fails keeps the runs it had, if any
+        futures = {dag_id: poll_pool.submit(fetch_json, dag_runs_url(dag_id, POLL_RUNS_KEPT), token)
+                   for dag_id in dag_ids}
+        runs = {}
+        for dag_id, future in futures.items():
+            try:
+                runs[dag_id] = project_payload(future.result()).get("dag_runs", [])
+            except Exception as e:
+                print(f"Error fetching recent runs for {dag_id}: {e}")
+                if dag_id in self.runs:
+                    runs[dag_id] = self.runs[dag_id]
+        return runs
+
+    def sync_new(self, token):
+        # Newly tracked DAGs get a targeted fetch; the incremental watermark
+        # keeps covering everything else
+        with self.lock:
+            dag_ids, self.new_dag_ids = self.new_dag_ids, set()
+        if not dag_ids:
+            return
+        runs = self.fetch_recent(dag_ids, token)
+        with self.lock:
+            self.new_dag_ids |= dag_ids - runs.keys()  # retried on the next poll
+            for dag_id, dag_runs in runs.items():
+                self.runs[dag_id] = dag_runs
+                self.versions[dag_id] = new_version()
+        self.share(list(runs))
+
+    def incremental_sync(self, token):
+        started = self.sync_started()
+        since = urllib.parse.quote(self.watermark)
+        offset = 0
+        changed = set()
+        while True:
+            url = f"{AIRFLOW_API_URL}/dags/~/dagRuns?updated_at_gte={since}&limit={BULK_PAGE_LIMIT}&offset={offset}"
+            dag_runs = fetch_json(url, token).get("dag_runs", [])
+            for run in dag_runs:
+                run = DagRun.from_api(run)
+                if self.merge(run):
+                    changed.add(run.dag_id)
+            if len(dag_runs) < BULK_PAGE_LIMIT:
+                break
+            offset += BULK_PAGE_LIMIT
+        self.share(changed)
+        self.watermark = started
+
+    def merge(self, run):
+        # True if the DAG's recent runs changed
+        dag_id = run.dag_id
+        with self.lock:
+            if dag_id not in self.runs:
+                return False  # not a tracked DAG
+            previous = self.runs[dag_id]
+            runs = [r for r in previous if r.dag_run_id != run.dag_run_id]
+            runs.append(run)
+            runs.sort(key=lambda r: r.execution_date or "", reverse=True)
+            runs = self.runs[dag_id] = runs[:POLL_RUNS_KEPT]
+            if runs != previous:
+                self.versions[dag_id] = new_version()
+        self.publish_status(dag_id, previous, runs)
+        return runs != previous
+
+    def publish_status(self, dag_id, previous, runs):
+        old = status_from_run(dag_id, previous[0]) if previous else None
+        new = status_from_run(dag_id, runs[0]) if runs else None
+        if new and new != old:
+            self.publish("status", new)
+
+    def sync_tasks(self, token):
+        # Task states of each DAG's latest run while it is active, plus one
+        # final look once it finishes
+        with self.lock:
+            latest = {dag_id: runs[0] for dag_id, runs in self.runs.items() if runs}
+        watched = {}
+        for dag_id, run in latest.items():
+            key = (dag_id, run.dag_run_id)
+            if run.state not in TERMINAL_STATES or key in self.task_states:
+                watched[key] = poll_pool.submit(fetch_task_instances, *key, token)
+
+        task_states = {}
+        for (dag_id, dag_run_id), future in watched.items():
+            try:
+                data = future.result()
+            except Exception as e:
+                print(f"Error fetching tasks for {dag_id}: {e}")
+                continue
+            api_cache.put(task_instances_url(dag_id, dag_run_id), data, tasks_ttl(data))
+            previous = self.task_states.get((dag_id, dag_run_id))
+            states = {(t.task_id, t.map_index): (t.state, t.try_number) for t in data.get("task_instances", [])}
+            for (task_id, map_index), (state, try_number) in states.items():
+                # The first look at a run is only a baseline to diff against
+                if previous is not None and previous.get((task_id, map_index)) != (state, try_number):
+                    self.publish("task", {
                         "dag_id": dag_id,
-                        "dag_run_id": latest_run.get("dag_run_id"),
-                        "state": latest_run.get("state"),
-                        "execution_date": latest_run.get("execution_date")
-                    }
+                        "dag_run_id": dag_run_id,
+                        "task_id": task_id,
+                        "map_index": map_index,
+                        "state": state,
+                        "try_number": try_number
+                    })
+            if latest[dag_id].state not in TERMINAL_STATES:
+                task_states[(dag_id, dag_run_id)] = states
+        self.task_states = task_states
+
+    def latest(self, dag_id):
+        # None means "not known here", so callers fall back to Airflow
+        if not self.ready:
+            return None
+        with self.lock:
+            runs = self.runs.get(dag_id)
+        if runs is None:
+            return None
+        if runs:
+            return status_from_run(dag_id, runs[0])
+        return {"dag_id": dag_id, "state": "N/A", "execution_date": "N/A", "dag_run_id": None}
+
+    def version(self, dag_id):
+        if not self.ready:
+            return None
+        with self.lock:
+            return self.versions.get(dag_id)
+
+    def recent_runs(self, dag_id, limit):
+        if not self.ready or limit > POLL_RUNS_KEPT:
+            return None
+        with self.lock:
+            runs = self.runs.get(dag_id)
+        return runs[:limit] if runs is not None else None
+
+dag_poller = DagRunPoller()
+
+def relay_shared_state():
+    # Runs in every worker process: hands the poller's events to this
+    # worker's stream clients, mirrors its runs unless this worker is the one
+    # polling, and reports what this worker's clients stream so it's polled.
+    event_id = shared_store.last_event_id()
+    seq = 0
+    while True:
+        try:
+            events = shared_store.events_since(event_id)
+            for event_id, event, data in events:
+                event_stream.publish(event, data)
+            rows = shared_store.runs_since(seq)
+            if rows:
+                seq = rows[-1][0]
+                if not dag_poller.leading:
+                    dag_poller.mirror(rows)
+            shared_store.report_streams(len(event_stream.clients), event_stream.dag_ids())
+        except Exception as e:
+            print(f"Error reading the shared store: {e}")
+        time.sleep(SHARED_SYNC_INTERVAL)
+
+def get_latest_dag_status(dag_id, token):
+    status = dag_poller.latest(dag_id)
+    if status is not None:
+        return status
+    try:
+        data = cached_fetch_json(dag_runs_url(dag_id, 1), token, runs_ttl)
+        dag_runs = data.get("dag_runs", [])
+        if dag_runs:
+            return status_from_run(dag_id, dag_runs[0])
     except Exception as e:
         print(f"Error fetching dag status for {dag_id}: {e}")
     
     return {"dag_id": dag_id, "state": "N/A", "execution_date": "N/A", "dag_run_id": None}
 
-def get_recent_dag_runs(dag_id, token, limit=5):
+def get_latest_dag_statuses_bulk(dag_ids, token):
+    # Batch endpoint: one request covers many DAGs, newest runs first
+    url = f"{AIRFLOW_API_URL}/dags/~/dagRuns/list"
+    latest = {}
+    exhausted = set()  # DAGs known to have no runs at all
+
+    # Anything still fresh in the per-DAG cache doesn't need to go upstream
+    uncached = []
+    for dag_id in dag_ids:
+        status = dag_poller.latest(dag_id)
+        if status is not None:
+            latest[dag_id] = status
+            continue
+        data = api_cache.peek(dag_runs_url(dag_id, 1))
+        if data is None:
+            uncached.append(dag_id)
+        elif data.get("dag_runs"):
+            latest[dag_id] = status_from_run(dag_id, data["dag_runs"][0])
+        else:
+            exhausted.add(dag_id)
+
+    for start in range(0, len(uncached), BULK_CHUNK):
+        chunk = uncached[start:start + BULK_CHUNK]
+        pending = set(chunk)
+        for page in range(BULK_MAX_PAGES):
+            body = {
+                "dag_ids": chunk,
+                "order_by": "-execution_date",
+                "page_offset": page * BULK_PAGE_LIMIT,
+                "page_limit": BULK_PAGE_LIMIT
+            }
+            try:
+                payload = json.dumps(body).encode()
+                data = inflight.do(("POST", url, token, payload),
+                                   lambda: decode_json(url, airflow_request("POST", url, token, body=payload)))
+            except Exception as e:
+                print(f"Error fetching bulk dag status: {e}")
+                break
+
+            dag_runs = data.get("dag_runs", [])
+            for run in dag_runs:
+                dag_id = run.get("dag_id")
+                if dag_id in pending:
+                    run = DagRun.from_api(run)
+                    pending.discard(dag_id)
+                    latest[dag_id] = status_from_run(dag_id, run)
+                    # Same shape as a limit=1 dagRuns response, so single lookups hit it too
+                    single = {"dag_runs": [run], "total_entries": 1}
+                    api_cache.put(dag_runs_url(dag_id, 1), single, runs_ttl(single))
+            if len(dag_runs) < BULK_PAGE_LIMIT:
+                for dag_id in pending:
+                    api_cache.put(dag_runs_url(dag_id, 1), {"dag_runs": [], "total_entries": 0}, CACHE_TTL_IDLE)
+                exhausted.update(pending)
+                break
+            if not pending:
+                break
+
+    # DAGs whose latest run wasn't in the pages we read (or whose batch failed)
+    # fall back to one lookup each
+    missing = [dag_id for dag_id in dag_ids if dag_id not in latest and dag_id not in exhausted]
+    for status in get_latest_dag_statuses(missing, token):
+        latest[status["dag_id"]] = status
+
+    return [latest.get(dag_id, {"dag_id": dag_id, "state": "N/A", "execution_date": "N/A", "dag_run_id": None})
+            for dag_id in dag_ids]
+
+# Shared by all index renders so the total load on Airflow stays bounded
+status_pool = ThreadPoolExecutor(max_workers=STATUS_FANOUT, thread_name_prefix="status")
+
+def iter_latest_dag_statuses(dag_ids, token, deadline=PAGE_DEADLINE):
+    # Yields statuses in dag_ids order, batched so that everything already
+    # resolved goes out together; after the deadline the rest are "pending"
+    futures = [status_pool.submit(carry_timing(get_latest_dag_status), dag_id, token) for dag_id in dag_ids]
+    give_up_at = time.monotonic() + deadline
+    batch = []
     try:
-        url = f"{AIRFLOW_API_URL}/dags/{dag_id}/dagRuns?limit={limit}&order_by=-execution_date"
-        headers = { "Authorization": f"Basic {token}", "Content-Type": "application/json" }
-        req = urllib.request.Request(url, headers=headers)
-        
-        with urllib.request.urlopen(req, timeout=5) as response:
-            if response.status == 200:
-                data = json.loads(response.read().decode())
-                return data.get("dag_runs", [])
+        for dag_id, future in zip(dag_ids, futures):
+            if batch and not future.done():
+                yield batch
+                batch = []
+            try:
+                batch.append(future.result(timeout=max(0, give_up_at - time.monotonic())))
+            except FutureTimeoutError:
+                future.cancel()
+                batch.append({"dag_id": dag_id, "state": "pending", "execution_date": "N/A", "dag_run_id": None})
+        if batch:
+            yield batch
+    finally:
+        for future in futures:
+            future.cancel()  # the reader went away; don't keep Airflow busy for it
+
+def get_latest_dag_statuses(dag_ids, token, deadline=PAGE_DEADLINE):
+    return [status for batch in iter_latest_dag_statuses(dag_ids, token, deadline) for status in batch]
+
+DAG_SORT_KEYS = {
+    "dag_id": lambda s: s["dag_id"],
+    "state": lambda s: (s["state"], s["dag_id"]),
+    "execution_date": lambda s: (s["execution_date"] if s["execution_date"] != "N/A" else "", s["dag_id"])
+}
+
+class DagIndex:
+    # Latest status of every DAG in a list, with each sort order computed
+    # once, so paging through a list filtered by state or sorted by status
+    # costs one lookup pass per TTL instead of one per page. Pages in list or
+    # name order with no state filter never need one; only their window of
+    # DAGs is looked up.
+    def __init__(self, ttl=DAG_INDEX_TTL, max_lists=DAG_INDEX_LISTS):
+        self.ttl = ttl
+        self.max_lists = max_lists
+        self.lists = OrderedDict()  # tuple(dag_ids) -> (expires_at, {dag_id: status}, {sort: [dag_id]}, version)
+        self.lock = threading.Lock()
+
+    def snapshot(self, dag_ids, token):
+        key = tuple(dag_ids)
+        with self.lock:
+            entry = self.lists.get(key)
+            if entry and time.monotonic() < entry[0]:
+                self.lists.move_to_end(key)
+                return entry
+        # Everyone paging through the same list at once shares one build
+        return inflight.do(("index", key, token), lambda: self.build(key, token))
+
+    def build(self, key, token):
+        statuses = {status["dag_id"]: status for status in get_latest_dag_statuses_bulk(list(key), token)}
+        with self.lock:
+            previous = self.lists.get(key)
+        # A rebuild that finds the same statuses keeps the version, so ETags survive the TTL
+        version = previous[3] if previous and previous[1] == statuses else new_version()
+        entry = (time.monotonic() + self.ttl, statuses, {}, version)
+        with self.lock:
+            self.lists[key] = entry
+            self.lists.move_to_end(key)
+            while len(self.lists) > self.max_lists:
+                self.lists.popitem(last=False)
+        return entry
+
+    def version(self, dag_ids):
+        # Version of the list's current snapshot, None if it has none
+        with self.lock:
+            entry = self.lists.get(tuple(dag_ids))
+        return entry[3] if entry else None
+
+    def uses_snapshot(self, state=None, sort=None, **params):
+        return bool(state) or sort not in (None, "dag_id")
+
+    def page(self, dag_ids, token, state=None, prefix=None, sort=None, descending=False,
+             offset=0, limit=DAGS_PAGE_LIMIT):
+        # (total matching, dag_ids of the requested window)
+        if self.uses_snapshot(state, sort):
+            _, statuses, orders, _ = self.snapshot(dag_ids, token)
+            if sort not in orders:
+                orders[sort] = sorted(statuses.values(), key=DAG_SORT_KEYS[sort]) if sort else list(statuses.values())
+            ordered = [s["dag_id"] for s in orders[sort] if not state or s["state"] == state]
+        elif sort:
+            ordered = sorted(dag_ids)
+        else:
+            ordered = list(dag_ids)
+        if prefix:
+            ordered = [dag_id for dag_id in ordered if dag_id.startswith(prefix)]
+        if descending:
+            ordered.reverse()
+        return len(ordered), ordered[offset:offset + limit]
+
+dag_index = DagIndex()
+
+def parse_dag_list_params(params):
+    # Listing options from a query string or JSON body; raises ValueError
+    for name in ("state", "prefix", "sort", "order"):
+        if not isinstance(params.get(name) or "", str):
+            raise ValueError(f"{name} must be a string")
+    for name in ("offset", "limit"):
+        if not isinstance(params.get(name) or 0, (int, str)) or isinstance(params.get(name), bool):
+            raise ValueError(f"{name} must be an integer")
+    offset = int(params.get("offset") or 0)
+    limit = int(params.get("limit") or DAGS_PAGE_LIMIT)
+    sort = params.get("sort") or None
+    order = params.get("order") or "asc"
+    if offset < 0 or not 0 < limit <= DAGS_MAX_LIMIT:
+        raise ValueError(f"offset must be >= 0 and limit between 1 and {DAGS_MAX_LIMIT}")
+    if sort is not None and sort not in DAG_SORT_KEYS:
+        raise ValueError(f"sort must be one of {', '.join(DAG_SORT_KEYS)}")
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be asc or desc")
+    return {
+        "state": params.get("state") or None,
+        "prefix": params.get("prefix") or None,
+        "sort": sort,
+        "descending": order == "desc",
+        "offset": offset,
+        "limit": limit
+    }
+
+def list_dags(dag_ids, token, params):
+    total, window = dag_index.page(dag_ids, token, **params)
+    statuses = [mark_stale(status) for status in get_latest_dag_statuses_bulk(window, token)]
+    return {
+        "total": total,
+        "offset": params["offset"],
+        "limit": params["limit"],
+        "stale": serving_stale(),
+        "dags": statuses
+    }
+
+def dags_version(dag_ids, token, params):
+    # Version of a list_dags answer: the list itself, the index snapshot its
+    # order came from (if it needs one), the statuses in the window and the
+    # paging/sort/filter params. None while any of them isn't known yet.
+    _, window = dag_index.page(dag_ids, token, **params)
+    versions = [status_version(dag_id) for dag_id in window]
+    if dag_index.uses_snapshot(**params):
+        versions.append(dag_index.version(dag_ids))
+    if None in versions:
+        return None
+    digest = hashlib.sha1("\n".join(dag_ids).encode())
+    digest.update(json.dumps([params, [version[0] for version in versions]], sort_keys=True).encode())
+    return digest.hexdigest()[:16], max((version[1] for version in versions), default=None)
+
+def from_history(dag_id, limit, offset, since, until):
+    # Recent runs come from the poller or Airflow, which are fresher; deeper
+    # queries from the run history store when it has the DAG
+    deep = limit > POLL_RUNS_KEPT or offset or since or until
+    return bool(deep) and run_history.covers(dag_id)
+
+def load_dag_runs(dag_id, token, limit=RUNS_DEFAULT_LIMIT, offset=0, since=None, until=None):
+    # Like get_dag_runs, but raises when Airflow can't be asked
+    if from_history(dag_id, limit, offset, since, until):
+        return run_history.dag_runs(dag_id, limit, offset, since, until)
+    if not (offset or since or until):
+        runs = dag_poller.recent_runs(dag_id, limit)
+        if runs is not None:
+            return runs
+    data = cached_fetch_json(dag_runs_url(dag_id, limit, offset, since, until), token, runs_ttl)
+    return data.get("dag_runs", [])
+
+def get_dag_runs(dag_id, token, limit=RUNS_DEFAULT_LIMIT, offset=0, since=None, until=None):
+    try:
+        return load_dag_runs(dag_id, token, limit, offset, since, until)
     except Exception as e:
         print(f"Error fetching recent runs for {dag_id}: {e}")
     return []
 
+task_page_pool = ThreadPoolExecutor(max_workers=TASK_PAGE_FANOUT, thread_name_prefix="task-pages")
+
+def iter_task_instance_pages(dag_id, dag_run_id, token):
+    # Yields a run's task instances page by page, in order and as
+    # TaskInstance records. The first page gives the total; the rest are requested
+    # together.
+    url = task_instances_url(dag_id, dag_run_id)
+    first = fetch_json(f"{url}?limit={TASK_PAGE_LIMIT}&offset=0", token)
+    tasks = first.get("task_instances", [])
+    yield [TaskInstance.from_api(t) for t in tasks]
+
+    page_size = len(tasks)  # what Airflow actually returns per page
+    total = first.get("total_entries") or 0
+    if not page_size or total <= page_size:
+        return
+    futures = [task_page_pool.submit(carry_timing(fetch_json), f"{url}?limit={page_size}&offset={offset}", token)
+               for offset in range(page_size, total, page_size)]
+    try:
+        for future in futures:
+            yield [TaskInstance.from_api(t) for t in future.result().get("task_instances", [])]
+    finally:
+        for future in futures:
+            future.cancel()
+
+def load_task_instances(dag_id, dag_run_id, token):
+    tasks = [task for page in iter_task_instance_pages(dag_id, dag_run_id, token) for task in page]
+    return {"task_instances": tasks, "total_entries": len(tasks)}
+
+def fetch_task_instances(dag_id, dag_run_id, token):
+    key = task_instances_url(dag_id, dag_run_id)
+    return inflight.do(("tasks", key, token), lambda: load_task_instances(dag_id, dag_run_id, token))
+
+def load_dag_tasks(dag_id, dag_run_id, token):
+    # Like get_dag_tasks, but raises when Airflow can't be asked
+    data = api_cache.get_or_fetch(task_instances_url(dag_id, dag_run_id),
+                                  lambda: fetch_task_instances(dag_id, dag_run_id, token), tasks_ttl)
+    return data.get("task_instances", [])
+
 def get_dag_tasks(dag_id, dag_run_id, token):
     try:
-        # URL parsing to handle special chars in dag_run_id if necessary, but urllib.parse.quote helps
-        safe_dag_run_id = urllib.parse.quote(dag_run_id)
-        url = f"{AIRFLOW_API_URL}/dags/{dag_id}/dagRuns/{safe_dag_run_id}/taskInstances"
-        headers = { "Authorization": f"Basic {token}", "Content-Type": "application/json" }
-        req = urllib.request.Request(url, headers=headers)
-        
-        with urllib.request.urlopen(req, timeout=5) as response:
-            if response.status == 200:
-                data = json.loads(response.read().decode())
-                return data.get("task_instances", [])
+        return load_dag_tasks(dag_id, dag_run_id, token)
     except Exception as e:
         print(f"Error fetching tasks for {dag_id}: {e}")
     return []
 
-def get_task_log(dag_id, dag_run_id, task_id, try_number, token):
+def normalize_date(value):
+    # ISO 8601 in UTC, the form history dates are stored and compared in;
+    # a date without a zone is taken as UTC
+    date = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.astimezone(timezone.utc).isoformat()
+
+def parse_history_params(params, default_limit):
+    # ?limit=&offset=&since=&until= -> (limit, offset, since, until); raises ValueError
+    limit = int(params.get("limit", [default_limit])[0])
+    offset = int(params.get("offset", [0])[0])
+    if not 1 <= limit <= HISTORY_MAX_LIMIT or offset < 0:
+        raise ValueError(f"limit must be 1 to {HISTORY_MAX_LIMIT} and offset not negative")
+    since, until = (normalize_date(params[name][0]) if params.get(name) else None for name in ("since", "until"))
+    return limit, offset, since, until
+
+history_pool = ThreadPoolExecutor(max_workers=HISTORY_FANOUT, thread_name_prefix="history")
+
+def iter_list_pages(fetch_page, key):
+    # Yields the `key` lists of a paged Airflow list endpoint; fetch_page(offset,
+    # limit) gets one page. Like iter_task_instance_pages, the first page gives
+    # the total and the rest are requested HISTORY_FANOUT at a time.
+    first = fetch_page(0, BULK_PAGE_LIMIT)
+    items = first.get(key, [])
+    yield items
+    page_size = len(items)
+    total = first.get("total_entries") or 0
+    if not page_size:
+        return
+    window = page_size * HISTORY_FANOUT
+    for start in range(page_size, total, window):
+        futures = [history_pool.submit(fetch_page, offset, page_size)
+                   for offset in range(start, min(total, start + window), page_size)]
+        for future in futures:
+            yield future.result().get(key, [])
+
+class RunHistory(SQLiteStore):
+    # Optional local copy of DAG run and task instance history, indexed by
+    # (dag_id, execution_date). A DAG's first sync backfills
+    # HISTORY_BACKFILL_DAYS of it; after that each sync only asks Airflow for
+    # the runs updated since the previous one, and for the task instances of
+    # those runs and of runs still active. DAGs that leave the DAG lists are
+    # dropped. With worker processes the one holding the "history" lease
+    # syncs and all of them read.
+    def __init__(self, path=HISTORY_DB_PATH, interval=HISTORY_SYNC_INTERVAL):
+        super().__init__(path)
+        self.interval = interval
+
+    def open(self):
+        with self.transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS runs (dag_id TEXT NOT NULL, dag_run_id TEXT NOT NULL, "
+                         "execution_date TEXT NOT NULL, state TEXT, start_date TEXT, end_date TEXT, "
+                         "PRIMARY KEY (dag_id, dag_run_id))")
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_by_date ON runs (dag_id, execution_date)")
+            conn.execute("CREATE TABLE IF NOT EXISTS tasks (dag_id TEXT NOT NULL, dag_run_id TEXT NOT NULL, "
+                         "task_id TEXT NOT NULL, map_index INTEGER NOT NULL, execution_date TEXT NOT NULL, "
+                         "state TEXT, try_number INTEGER, PRIMARY KEY (dag_id, dag_run_id, task_id, map_index))")
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_by_date ON tasks (dag_id, execution_date)")
+            # DAGs with history here, and the version of their rows, for ETags
+            conn.execute("CREATE TABLE IF NOT EXISTS dags (dag_id TEXT PRIMARY KEY, version INTEGER NOT NULL, "
+                         "changed_at REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS sync (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.enabled = True
+        threading.Thread(target=self.run, name="run-history", daemon=True).start()
+
+    def run(self):
+        while True:
+            try:
+                if not shared_store.enabled or shared_store.lease("history", 3 * self.interval):
+                    self.sync(airflow_auth.authorization())
+            except Exception as e:
+                print(f"Error syncing run history: {e}")
+            time.sleep(self.interval)
+
+    def sync(self, token):
+        started = (datetime.now(timezone.utc) - timedelta(seconds=POLL_OVERLAP)).isoformat()
+        conn = self.connection()
+        tracked = {row[0] for row in conn.execute("SELECT dag_id FROM dags")}
+        wanted = dag_lists.all_dag_ids()
+        row = conn.execute("SELECT value FROM sync WHERE name = 'watermark'").fetchone()
+
+        changed = set()
+        if row and tracked & wanted:
+            url = f"{AIRFLOW_API_URL}/dags/~/dagRuns?updated_at_gte={urllib.parse.quote(row[0])}"
+            updated = set()
+            for page in iter_list_pages(lambda offset, limit: fetch_json(f"{url}&limit={limit}&offset={offset}", token),
+                                        "dag_runs"):
+                updated |= self.store_runs(page, tracked)
+            changed |= {dag_id for dag_id, _ in updated}
+            # Task instances change while their run is active, or when it is cleared (which updates the run)
+            active = conn.execute("SELECT dag_id, dag_run_id FROM runs WHERE state NOT IN (%s)"
+                                  % ",".join("?" * len(TERMINAL_STATES)), tuple(TERMINAL_STATES)).fetchall()
+            runs = sorted(updated | {run for run in map(tuple, active) if run[0] in tracked})
+            futures = [history_pool.submit(fetch_task_instances, dag_id, dag_run_id, token) for dag_id, dag_run_id in runs]
+            for (dag_id, dag_run_id), future in zip(runs, futures):
+                tasks = [dict(task.to_dict(), dag_id=dag_id, dag_run_id=dag_run_id) for task in future.result()["task_instances"]]
+                changed |= self.store_tasks(tasks, tracked)
+
+        new = sorted(wanted - tracked)
+        backfill_since = (datetime.now(timezone.utc) - timedelta(days=HISTORY_BACKFILL_DAYS)).isoformat()
+        for start in range(0, len(new), BULK_CHUNK):
+            chunk = new[start:start + BULK_CHUNK]
+            body = {"dag_ids": chunk, "execution_date_gte": backfill_since}
+            for url, key, store in ((f"{AIRFLOW_API_URL}/dags/~/dagRuns/list", "dag_runs", self.store_runs),
+                                    (f"{AIRFLOW_API_URL}/dags/~/dagRuns/~/taskInstances/list", "task_instances", self.store_tasks)):
+                fetch_page = lambda offset, limit: post_json(url, dict(body, page_offset=offset, page_limit=limit), token)
+                for page in iter_list_pages(fetch_page, key):
+                    store(page, set(chunk))
+            changed.update(chunk)
+
+        with self.transaction() as conn:
+            removed = [(dag_id,) for dag_id in tracked - wanted]
+            for table in ("runs", "tasks", "dags"):
+                conn.executemany(f"DELETE FROM {table} WHERE dag_id = ?", removed)
+            conn.executemany("INSERT OR REPLACE INTO dags VALUES (?, ?, ?)",
+                             [(dag_id, *new_version()) for dag_id in changed & wanted])
+            conn.execute("INSERT OR REPLACE INTO sync VALUES ('watermark', ?)", (started,))
+
+    def store_runs(self, runs, dag_ids):
+        # Upserts the runs of `dag_ids`; returns (dag_id, dag_run_id) of those that changed
+        changed = set()
+        with self.transaction() as conn:
+            for run in runs:
+                dag_id = run.get("dag_id")
+                if dag_id not in dag_ids or not run.get("execution_date"):
+                    continue
+                cursor = conn.execute(
+                    "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (dag_id, dag_run_id) DO UPDATE SET "
+                    "state = excluded.state, start_date = excluded.start_date, end_date = excluded.end_date "
+                    "WHERE (state, start_date, end_date) IS NOT (excluded.state, excluded.start_date, excluded.end_date)",
+                    (dag_id, run.get("dag_run_id"), normalize_date(run["execution_date"]),
+                     run.get("state"), run.get("start_date"), run.get("end_date")))
+                if cursor.rowcount:
+                    changed.add((dag_id, run.get("dag_run_id")))
+        return changed
+
+    def store_tasks(self, tasks, dag_ids):
+        # Returns the DAGs whose task instances changed
+        changed = set()
+        with self.transaction() as conn:
+            for task in tasks:
+                dag_id = task.get("dag_id")
+                if dag_id not in dag_ids:
+                    continue
+                execution_date = task.get("execution_date")
+                if execution_date is None:  # projected, or an older Airflow: take the run's
+                    row = conn.execute("SELECT execution_date FROM runs WHERE dag_id = ? AND dag_run_id = ?",
+                                       (dag_id, task.get("dag_run_id"))).fetchone()
+                    if row is None:
+                        continue
+                    execution_date = row[0]
+                cursor = conn.execute(
+                    "INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (dag_id, dag_run_id, task_id, map_index) "
+                    "DO UPDATE SET state = excluded.state, try_number = excluded.try_number "
+                    "WHERE (state, try_number) IS NOT (excluded.state, excluded.try_number)",
+                    (dag_id, task.get("dag_run_id"), task.get("task_id"),
+                     -1 if task.get("map_index") is None else task["map_index"],
+                     normalize_date(execution_date), task.get("state"), task.get("try_number")))
+                if cursor.rowcount:
+                    changed.add(dag_id)
+        return changed
+
+    def covers(self, dag_id):
+        return self.enabled and self.version(dag_id) is not None
+
+    def version(self, dag_id):
+        row = self.connection().execute("SELECT version, changed_at FROM dags WHERE dag_id = ?", (dag_id,)).fetchone()
+        return tuple(row) if row else None
+
+    def dag_runs(self, dag_id, limit, offset=0, since=None, until=None):
+        # Newest first, as DagRuns
+        rows = self.connection().execute(
+            "SELECT dag_run_id, state, execution_date FROM runs WHERE dag_id = ? "
+            "AND (? IS NULL OR execution_date >= ?) AND (? IS NULL OR execution_date <= ?) "
+            "ORDER BY execution_date DESC LIMIT ? OFFSET ?",
+            (dag_id, since, since, until, until, limit, offset)).fetchall()
+        return [DagRun(dag_id, *row) for row in rows]
+
+    def finished_run_tasks(self, dag_id, dag_run_id):
+        # Task instances of a finished run, or None if the run isn't finished here
+        conn = self.connection()
+        row = conn.execute("SELECT state FROM runs WHERE dag_id = ? AND dag_run_id = ?", (dag_id, dag_run_id)).fetchone()
+        if row is None or row[0] not in TERMINAL_STATES:
+            return None
+        rows = conn.execute("SELECT task_id, map_index, state, try_number FROM tasks "
+                            "WHERE dag_id = ? AND dag_run_id = ? ORDER BY task_id, map_index",
+                            (dag_id, dag_run_id)).fetchall()
+        return [TaskInstance(*row) for row in rows] or None
+
+    def task_history(self, dag_id, task_id, limit, offset=0, since=None, until=None):
+        # Task instances across runs, newest run first; all tasks if task_id is None
+        rows = self.connection().execute(
+            "SELECT dag_run_id, execution_date, task_id, map_index, state, try_number FROM tasks "
+            "WHERE dag_id = ? AND (? IS NULL OR task_id = ?) "
+            "AND (? IS NULL OR execution_date >= ?) AND (? IS NULL OR execution_date <= ?) "
+            "ORDER BY execution_date DESC, task_id, map_index LIMIT ? OFFSET ?",
+            (dag_id, task_id, task_id, since, since, until, until, limit, offset)).fetchall()
+        return [dict(zip(("dag_run_id", "execution_date") + TASK_FIELDS, row)) for row in rows]
+
+    def stats(self):
+        if not self.enabled:
+            return None
+        conn = self.connection()
+        watermark = conn.execute("SELECT value FROM sync WHERE name = 'watermark'").fetchone()
+        return {
+            "dags": conn.execute("SELECT COUNT(*) FROM dags").fetchone()[0],
+            "runs": conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0],
+            "task_instances": conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0],
+            "synced_since": watermark[0] if watermark else None
+        }
+
+run_history = RunHistory()
+
+class LogCache:
+    # Size-bounded LRU of finished task logs on disk, keyed by
+    # (dag_id, dag_run_id, task_id, try_number[, map_index]). A finished try's log never
+    # changes, so entries never expire; they are only evicted for space.
+    def __init__(self, directory=LOG_CACHE_DIR, max_bytes=LOG_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.files = OrderedDict()  # path -> size, least recently used first
+        self.total = 0
+        self.lock = threading.Lock()
+        self.fill_locks = {}  # path -> lock held while that log is downloaded
+        self.loaded = False
+
+    def load(self):
+        # Picks up the logs already on disk, on first use rather than at
+        # import; called with self.lock held. The directory is made by fill().
+        if self.loaded:
+            return
+        self.loaded = True
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        entries = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            st = os.stat(path)
+            if not name.endswith(".tmp"):
+                entries.append((st.st_mtime, path, st.st_size))
+            elif time.time() - st.st_mtime > 2 * UPSTREAM_TIMEOUT:
+                os.remove(path)  # left over from an interrupted download, not another worker's
+        for _, path, size in sorted(entries):
+            self.files[path] = size
+            self.total += size
+
+    def path_for(self, key):
+        digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.log")
+
+    def open(self, key):
+        path = self.path_for(key)
+        with self.lock:
+            self.load()
+            if path in self.files:
+                self.files.move_to_end(path)
+            elif not self.adopt(path):
+                return None
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            return None  # evicted in the meantime
+
+    def adopt(self, path):
+        # A log another worker process downloaded; called with self.lock held
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            return False
+        self.files[path] = size
+        self.total += size
+        return True
+
+    def fill_lock(self, key):
+        with self.lock:
+            return self.fill_locks.setdefault(self.path_for(key), threading.Lock())
+
+    def fill(self, key, response):
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        size = 0
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            with open(tmp_path, "wb") as f:
+                while chunk := response.read(LOG_CHUNK):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self.lock:
+            self.load()
+            self.fill_locks.pop(path, None)
+            self.total += size - self.files.pop(path, 0)
+            self.files[path] = size
+            # Readers that already opened an evicted file keep their handle
+            while self.total > self.max_bytes and self.files:
+                old_path, old_size = self.files.popitem(last=False)
+                self.total -= old_size
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass
+
+log_cache = LogCache()
+
+def task_ttl(task):
+    if task.state in TERMINAL_STATES:
+        return CACHE_TTL_TERMINAL
+    return CACHE_TTL_ACTIVE
+
+def is_try_finished(dag_id, dag_run_id, task_id, try_number, token, map_index=-1):
+    # A try is finished once a later try exists or the task reached a
+    # terminal state. Prefer a task list we already hold over asking Airflow.
     try:
-        safe_dag_run_id = urllib.parse.quote(dag_run_id)
-        # Note: endpoint for logs might be different versions. Assuming /dags/{dag_id}/dagRuns/{dag_run_id}/taskInstances/{task_id}/logs/{task_try_number}
-        url = f"{AIRFLOW_API_URL}/dags/{dag_id}/dagRuns/{safe_dag_run_id}/taskInstances/{task_id}/logs/{try_number}"
-        headers = { "Authorization": f"Basic {token}", "Content-Type": "application/json" }
-        req = urllib.request.Request(url, headers=headers)
-        
-        with urllib.request.urlopen(req, timeout=5) as response:
-            if response.status == 200:
-                data = json.loads(response.read().decode())
-                # Log response format depends on config, sometimes it's text/plain, sometimes json
-                return data.get("content", str(data))
-    except Exception as e:
-        print(f"Error fetching log: {e}")
-        return str(e)
+        try_number = int(try_number)
+    except (TypeError, ValueError):
+        return False
+    tasks = api_cache.peek(task_instances_url(dag_id, dag_run_id), record=False)
+    task = next((t for t in (tasks or {}).get("task_instances", [])
+                 if t.task_id == task_id and parse_map_index(t.map_index) == map_index), None)
+    if task is None:
+        try:
+            task = cached_fetch_json(task_instance_url(dag_id, dag_run_id, task_id, map_index), token, task_ttl)
+        except Exception as e:
+            print(f"Error fetching task {task_id} for {dag_id}: {e}")
+            return False
+    current_try = task.try_number or 0
+    return try_number < current_try or (try_number == current_try and task.state in TERMINAL_STATES)
+
+def open_cached_log(dag_id, dag_run_id, task_id, try_number, token, map_index=-1):
+    # File object for a finished try's log, downloading it into the disk
+    # cache first if needed; None if the try may still be writing its log
+    key = [dag_id, dag_run_id, task_id, str(try_number)]
+    if map_index >= 0:
+        key.append(str(map_index))  # unmapped tasks keep the keys they always had
+    log_file = log_cache.open(key)
+    if log_file or not is_try_finished(dag_id, dag_run_id, task_id, try_number, token, map_index):
+        return log_file
+    # Many people open the same failing log at once; only one downloads it
+    with log_cache.fill_lock(key):
+        log_file = log_cache.open(key)
+        if log_file is None:
+            with airflow_stream(task_log_url(dag_id, dag_run_id, task_id, try_number, map_index), token) as response:
+                log_cache.fill(key, response)
+            log_file = log_cache.open(key)
+    return log_file
+
+LOG_WORD = re.compile(rb"\w{3,}")
+
+class LogPattern:
+    # What /api/logs/search looks for: a literal matched per line, ignoring
+    # ASCII case. Only literals, so no caller can make a line cost more than
+    # one substring search. The trigrams of its words let LogIndex rule out
+    # logs without reading them.
+    def __init__(self, pattern):
+        self.key = pattern
+        self.needle = pattern.encode().lower()
+        self.grams = trigram_bits(LOG_WORD.findall(self.needle))
+
+    def matches(self, line):
+        return self.needle in line.lower()
+
+    def may_match(self, bitmap):
+        return all(bitmap[bit >> 3] >> (bit & 7) & 1 for bit in self.grams)
+
+def trigram_bits(words):
+    # Only trigrams inside words: a word of a literal lies inside some word
+    # of any line it matches, and logs have far fewer distinct words than bytes
+    return {hash(word[i:i + 3]) & (LOG_INDEX_BITS - 1) for word in words for i in range(len(word) - 2)}
+
+def scan_log(lines, pattern, index=False):
+    # (matches, trigram bitmap or None) for an iterable of raw log lines;
+    # matches are (line number, text), at most LOG_SEARCH_LOG_MATCHES. The
+    # bitmap needs every line, so indexing reads the log to the end; its
+    # bits are set line by line, so memory stays the same for any log.
+    matches = []
+    bitmap = bytearray(LOG_INDEX_BITS // 8) if index else None
+    for number, line in enumerate(lines, 1):
+        if index:
+            for bit in trigram_bits(LOG_WORD.findall(line.lower())):
+                bitmap[bit >> 3] |= 1 << (bit & 7)
+        if len(matches) < LOG_SEARCH_LOG_MATCHES:
+            if pattern.matches(line):
+                matches.append((number, line.rstrip(b"\r\n").decode("utf-8", "replace")[:LOG_SEARCH_LINE_CHARS]))
+        elif not index:
+            break
+    return matches, bytes(bitmap) if index else None
+
+class LogIndex:
+    # In-memory index over the finished logs in log_cache. The first search
+    # that reads a log records a bitmap of the (lowercased) trigrams in it;
+    # after that, a literal with a trigram the log lacks is ruled out without
+    # opening the file. A finished log never changes, so the matches found in
+    # it are kept per pattern too, and repeating a search reads nothing.
+    def __init__(self, max_entries=LOG_INDEX_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.bitmaps = OrderedDict()  # log path -> trigram bitmap
+        self.results = OrderedDict()  # (log path, pattern key) -> matches
+        self.lock = threading.Lock()
+        self.ruled_out = 0
+        self.result_hits = 0
+        self.scans = 0
+
+    def search(self, log_file, pattern):
+        path = log_file.name
+        key = (path, pattern.key)
+        with self.lock:
+            matches = self.results.get(key)
+            if matches is not None:
+                self.results.move_to_end(key)
+                self.result_hits += 1
+                return matches
+            bitmap = self.bitmaps.get(path)
+            if bitmap is not None:
+                self.bitmaps.move_to_end(path)
+                if not pattern.may_match(bitmap):
+                    self.ruled_out += 1
+                    return []
+            self.scans += 1
+        with timed("search"):
+            matches, new_bitmap = scan_log(log_file, pattern, index=bitmap is None)
+        with self.lock:
+            if new_bitmap is not None:
+                self.bitmaps[path] = new_bitmap
+                while len(self.bitmaps) > self.max_entries:
+                    self.bitmaps.popitem(last=False)
+            self.results[key] = matches
+            while len(self.results) > self.max_entries:
+                self.results.popitem(last=False)
+        return matches
+
+    def stats(self):
+        with self.lock:
+            return {"indexed_logs": len(self.bitmaps), "results": len(self.results), "scans": self.scans,
+                    "ruled_out": self.ruled_out, "result_hits": self.result_hits}
+
+log_index = LogIndex()
+log_search_pool = ThreadPoolExecutor(max_workers=LOG_SEARCH_FANOUT, thread_name_prefix="log-search")
+
+def search_log(dag_id, dag_run_id, task_id, map_index, try_number, pattern, token):
+    # Matches in one try's log: finished tries through the disk cache and
+    # log_index, a try still running straight from Airflow
+    log_file = open_cached_log(dag_id, dag_run_id, task_id, try_number, token, map_index)
+    if log_file:
+        with log_file:
+            return log_index.search(log_file, pattern)
+    with airflow_stream(task_log_url(dag_id, dag_run_id, task_id, try_number, map_index), token) as response:
+        with timed("search"):
+            return scan_log(response, pattern)[0]
+
+def status_version(dag_id):
+    return dag_poller.version(dag_id) or api_cache.version(dag_runs_url(dag_id, 1))
+
+def runs_version(dag_id, limit=RUNS_DEFAULT_LIMIT, offset=0, since=None, until=None):
+    if from_history(dag_id, limit, offset, since, until):
+        return run_history.version(dag_id)
+    if limit <= POLL_RUNS_KEPT and not (offset or since or until) and dag_poller.version(dag_id):
+        return dag_poller.version(dag_id)
+    return api_cache.version(dag_runs_url(dag_id, limit, offset, since, until))
+
+def tasks_version(dag_id, dag_run_id):
+    return api_cache.version(task_instances_url(dag_id, dag_run_id))
+
+def make_etag(version):
+    return f'"{BOOT_ID}-{version[0]}"'
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body)
+    return gzip.compress(body, compresslevel=6)
+
+def precompress(body):
+    # For bodies that never change: pay for maximum compression once
+    compressed = {"gzip": gzip.compress(body, compresslevel=9)}
+    if brotli:
+        compressed["br"] = brotli.compress(body)
+    return compressed
+
+class EncodedResponses:
+    # Last serialized body per URL together with the data version it was
+    # built from, plus its compressed forms as they get requested
+    def __init__(self, max_entries=ENCODED_RESPONSES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # path -> (version, body, {encoding: bytes})
+        self.lock = threading.Lock()
+
+    def get(self, path, version):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry[0] == version:
+                self.entries.move_to_end(path)
+                return entry
+            return None
+
+    def put(self, path, version, body):
+        compressed = {}
+        with self.lock:
+            self.entries[path] = (version, body, compressed)
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return compressed
+
+encoded_responses = EncodedResponses()
+
+def render_dag_row(i, status_info):
+    dag_id = status_info['dag_id']
+    row_id = f"row-{i}"
+    
+    row_class = "dag-row"
+    if status_info['state'] == 'success':
+        row_class += " row-success"
+    elif status_info['state'] == 'failed':
+        row_class += " row-failed"
+    
+    onclick = f"onclick=\"fetchRuns({html.escape(json.dumps(dag_id))}, '{row_id}-detail')\""
+    
+    return f"""
+    <tr class="{row_class}" {onclick}>
+        <td>{html.escape(dag_id)}</td>
+        <td>{html.escape(str(status_info['state']))}</td>
+        <td>{html.escape(str(status_info['execution_date']))}</td>
+    </tr>
+    <tr id="{row_id}-detail" class="detail-row">
+        <td colspan="3">
+            <div id="{row_id}-detail-content"></div>
+        </td>
+    </tr>
+    """
+
+DAG_STATES = ("success", "failed", "running", "queued", "N/A")
+
+def render_dag_controls(list_name, params, total):
+    # List picker, filter form and pager for the visible window of the index
+    def page_link(offset):
+        query = {
+            "list": list_name if list_name != DAG_LIST_DEFAULT else None,
+            "prefix": params["prefix"],
+            "state": params["state"],
+            "sort": params["sort"],
+            "order": "desc" if params["descending"] else None,
+            "limit": params["limit"] if params["limit"] != DAGS_PAGE_LIMIT else None,
+            "offset": offset or None
+        }
+        return "?" + urllib.parse.urlencode({k: v for k, v in query.items() if v is not None})
+
+    def options(choices, selected):
+        return "".join(f'<option value="{html.escape(value)}"{" selected" if value == selected else ""}>{html.escape(label)}</option>'
+                       for value, label in choices)
+
+    offset, limit = params["offset"], params["limit"]
+    lists = options([(name, f"{name} ({count})") for name, count in dag_lists.names().items()], list_name)
+    states = options([("", "any")] + [(state, state) for state in DAG_STATES], params["state"] or "")
+    sorts = options([("", "list order"), ("dag_id", "DAG ID"), ("state", "state"), ("execution_date", "execution date")],
+                    params["sort"] or "")
+    pager = f"Showing {min(offset + 1, total)}-{min(offset + limit, total)} of {total}"
+    if offset > 0:
+        pager += f' <a href="{html.escape(page_link(max(0, offset - limit)))}">&laquo; Prev</a>'
+    if offset + limit < total:
+        pager += f' <a href="{html.escape(page_link(offset + limit))}">Next &raquo;</a>'
+    hidden_limit = f'<input type="hidden" name="limit" value="{limit}">' if limit != DAGS_PAGE_LIMIT else ""
+    if serving_stale():
+        pager = f"<strong>Airflow is not answering; showing last known data.</strong> {pager}"
+
+    return f"""
+    <form class="controls" method="get">
+        <label>List <select name="list" onchange="this.form.submit()">{lists}</select></label>
+        <label>DAG ID prefix <input name="prefix" value="{html.escape(params['prefix'] or '')}"></label>
+        <label>State <select name="state">{states}</select></label>
+        <label>Sort by <select name="sort">{sorts}</select></label>
+        <label><input type="checkbox" name="order" value="desc"{" checked" if params["descending"] else ""}> Descending</label>
+        {hidden_limit}
+        <button type="submit">Apply</button>
+        <span>{pager}</span>
+    </form>
+    """
+
+def parse_byte_range(header):
+    # Single "bytes=A-B", "bytes=A-" or "bytes=-N" range -> (start, end) or
+    # (None, N); anything else means "whole log"
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[len("bytes="):].strip().partition("-")
+    try:
+        if not start:
+            return (None, int(end)) if end and int(end) > 0 else None
+        start = int(start)
+        end = int(end) if end else None
+    except ValueError:
+        return None
+    if end is not None and end < start:
+        return None
+    return (start, end)
+
+# Values that live elsewhere, read when /metrics is scraped
+metrics.collect("monitor_http_connections_active", "gauge", "Open client connections, event streams included",
+                lambda: ThreadPoolTCPServer.open_connections + len(event_stream.clients))
+metrics.collect("monitor_cache_lookups_total", "counter", "Response cache lookups by result",
+                lambda: {(k,): v for k, v in api_cache.stats().items() if k in ("hits", "stale_hits", "last_known_hits", "misses")},
+                ("result",))
+metrics.collect("monitor_cache_entries", "gauge", "Entries in the response cache", lambda: len(api_cache.entries))
+metrics.collect("monitor_cache_shared_hits_total", "counter", "Cache entries taken from another worker process",
+                lambda: api_cache.shared_hits)
+metrics.collect("monitor_upstream_coalesced_total", "counter", "Airflow calls answered by an identical in-flight call",
+                lambda: inflight.shared)
+metrics.collect("monitor_upstream_concurrency_limit", "gauge", "Current adaptive limit on concurrent Airflow calls",
+                lambda: round(airflow_limit.limit, 2))
+metrics.collect("monitor_upstream_in_flight", "gauge", "Airflow calls in flight", lambda: airflow_limit.in_flight)
+metrics.collect("monitor_upstream_circuit_state", "gauge", "1 for the circuit breaker's current state",
+                lambda: {(state,): int(airflow_breaker.state == state) for state in ("closed", "open", "half_open")},
+                ("state",))
+
+class CountingWriter:
+    # wfile wrapper that counts what was written, for the bytes-sent metric
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        with timed("write"):
+            return self.raw.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+def metrics_route(method, path):
+    path = urllib.parse.urlsplit(path).path
+    if path in METRICS_ROUTES:
+        return path
+    return "/" if method == "GET" else "other"
 
 class MyHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = REQUEST_TIMEOUT
+    # Headers and body leave in separate writes; with Nagle on, a kept-alive
+    # connection stalls each response on the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+    headers_sent = False
+    chunked = False
+    compressor = None
+    keep_alive = False  # park the connection with the server when done
+    status_code = None
+
+    def setup(self):
+        super().setup()
+        self.wfile = CountingWriter(self.wfile)
+
+    def handle(self):
+        # One request per turn on a worker. Between requests an idle
+        # keep-alive connection is parked with the server instead of holding
+        # a worker thread while it waits.
+        self.requests_served = self.server.requests_served(self.request)
+        while True:
+            self.headers_sent = False
+            self.chunked = False
+            self.compressor = None
+            self.command = None
+            self.status_code = None
+            self.handle_one_request_measured()
+            self.requests_served += 1
+            if self.close_connection:
+                return
+            if not self.has_buffered_request():
+                self.keep_alive = True
+                return
+
+    def handle_one_request_measured(self):
+        timing = current_timing.value = RequestTiming()
+        bytes_before = self.wfile.bytes_written
+        metrics.inc("monitor_http_requests_in_flight")
+        try:
+            self.handle_one_request()
+        finally:
+            current_timing.value = None
+            metrics.inc("monitor_http_requests_in_flight", amount=-1)
+            if self.command:  # not just an idle connection closing
+                total = timing.elapsed()
+                route = metrics_route(self.command, self.path)
+                metrics.inc("monitor_http_requests_total", (route, self.command, str(self.status_code or 0)))
+                metrics.observe("monitor_http_request_duration_seconds", total, (route,))
+                metrics.inc("monitor_http_response_bytes_total", (route,), self.wfile.bytes_written - bytes_before)
+                if SLOW_REQUEST_THRESHOLD is not None and total > SLOW_REQUEST_THRESHOLD and route != "/debug/profile":
+                    log_slow_request(self, timing, total)
+
+    def end_headers(self):
+        # Phases up to now; streamed responses repeat it as a trailer at the end
+        timing = getattr(current_timing, "value", None)
+        if timing is not None:
+            self.send_header("Server-Timing", timing.header())
+        super().end_headers()
+
+    def has_buffered_request(self):
+        # A pipelined request may already sit in rfile's buffer, which would
+        # be lost if the socket were parked
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def send_response(self, code, message=None):
+        self.status_code = code
+        super().send_response(code, message)
+        if self.requests_served + 1 >= KEEPALIVE_MAX_REQUESTS:
+            self.send_header("Connection", "close")
+
     def do_GET(self):
-        token = get_airflow_token(AIRFLOW_USER, AIRFLOW_PASS)
+        token = airflow_auth.authorization()
         parsed_path = urllib.parse.urlparse(self.path)
         path = parsed_path.path
         query = urllib.parse.parse_qs(parsed_path.query)
         
+        if path == "/api/status":
+            dag_id = query.get("dag_id", [None])[0]
+            if dag_id:
+                self.send_versioned_json(lambda: status_version(dag_id),
+                                         lambda: mark_stale(get_latest_dag_status(dag_id, token)))
+            else:
+                self.send_error(400, "Missing dag_id")
+            return
+
+        if path == "/api/stream":
+            dag_ids = set(filter(None, query.get("dag_ids", [""])[0].split(",")))
+            if not dag_ids:
+                self.send_error(400, "Missing dag_ids")
+                return
+            if len(dag_ids) > STREAM_MAX_DAGS:
+                self.send_error(400, f"More than {STREAM_MAX_DAGS} dag_ids")
+                return
+            invalid = next((dag_id for dag_id in dag_ids if not SAFE_ID.fullmatch(dag_id)), None)
+            if invalid is not None:
+                self.send_error(400, f"Invalid dag_id: {invalid[:100]!r}")
+                return
+            dag_poller.ensure_started()
+            dag_poller.track(dag_ids)
+
+            self.send_response(200)
+            self.send_header("Content-type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(b"retry: 5000\n\n")
+            # The socket outlives this handler; event_stream owns it from here
+            self.close_connection = True
+            self.server.detach(self.request)
+            event_stream.subscribe(self.request, dag_ids)
+            return
+
+        if path == "/api/dags":
+            try:
+                params = parse_dag_list_params({k: v[0] for k, v in query.items()})
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            dag_ids = dag_lists.get(query.get("list", [DAG_LIST_DEFAULT])[0])
+            if dag_ids is None:
+                self.send_error(404, "Unknown DAG list")
+                return
+            self.send_versioned_json(lambda: dags_version(dag_ids, token, params),
+                                     lambda: list_dags(dag_ids, token, params))
+            return
+
+        if path == "/api/lists":
+            self.send_json(dag_lists.names())
+            return
+
+        if path == "/debug/profile":
+            self.send_profile(query)
+            return
+
+        if path == "/metrics":
+            self.send_body(metrics.render().encode('utf-8'), "text/plain; version=0.0.4; charset=utf-8")
+            return
+
+        if path == "/api/cache":
+            self.send_json(dict(api_cache.stats(), inflight=inflight.stats(), shared=shared_store.stats(),
+                                history=run_history.stats(),
+                                circuit=airflow_breaker.stats(), concurrency=airflow_limit.stats(),
+                                auth=airflow_auth.stats(), log_index=log_index.stats()))
+            return
+
         if path == "/api/runs":
             dag_id = query.get("dag_id", [None])[0]
             if dag_id:
-                runs = get_recent_dag_runs(dag_id, token)
-                response_data = []
-                for r in runs:
-                    response_data.append({
-                        "dag_run_id": r.get("dag_run_id"),
-                        "state": r.get("state"),
-                        "execution_date": r.get("execution_date")
-                    })
-                self.send_json(response_data)
+                try:
+                    params = parse_history_params(query, RUNS_DEFAULT_LIMIT)
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+                self.send_versioned_json(lambda: runs_version(dag_id, *params),
+                                         lambda: get_dag_runs(dag_id, token, *params))
             else:
                 self.send_error(400, "Missing dag_id")
             return
@@ -287,87 +3162,813 @@ class MyHandler(http.server.BaseHTTPRequestHandler):
         if path == "/api/tasks":
             dag_id = query.get("dag_id", [None])[0]
             dag_run_id = query.get("dag_run_id", [None])[0]
-            if dag_id and dag_run_id:
-                tasks = get_dag_tasks(dag_id, dag_run_id, token)
-                response_data = []
-                for t in tasks:
-                    response_data.append({
-                        "task_id": t.get("task_id"),
-                        "state": t.get("state"),
-                        "try_number": t.get("try_number")
-                    })
-                self.send_json(response_data)
+            if dag_id and not dag_run_id:
+                # A DAG's (or one task's, with ?task_id=) task instances across runs
+                if not run_history.covers(dag_id):
+                    self.send_error(400, "Missing dag_run_id; task history across runs needs the run history store")
+                    return
+                try:
+                    params = parse_history_params(query, TASK_PAGE_LIMIT)
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+                task_id = query.get("task_id", [None])[0]
+                self.send_versioned_json(lambda: run_history.version(dag_id),
+                                         lambda: run_history.task_history(dag_id, task_id, *params))
+            elif dag_id and dag_run_id:
+                if run_history.enabled and run_history.finished_run_tasks(dag_id, dag_run_id) is not None:
+                    self.send_versioned_json(lambda: run_history.version(dag_id),
+                                             lambda: run_history.finished_run_tasks(dag_id, dag_run_id))
+                elif api_cache.contains(task_instances_url(dag_id, dag_run_id)):
+                    self.send_versioned_json(lambda: tasks_version(dag_id, dag_run_id),
+                                             lambda: get_dag_tasks(dag_id, dag_run_id, token))
+                else:
+                    self.send_tasks_stream(dag_id, dag_run_id, token)
             else:
                 self.send_error(400, "Missing dag_id or dag_run_id")
             return
 
+        if path == "/api/logs/search":
+            dag_id = query.get("dag_id", [None])[0]
+            pattern = query.get("pattern", [""])[0]
+            if not dag_id or not pattern:
+                self.send_error(400, "Missing dag_id or pattern")
+                return
+            if "regex" in query:
+                self.send_error(400, "Only literal patterns are supported")
+                return
+            try:
+                params = parse_history_params(query, LOG_SEARCH_RUNS)
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            pattern = LogPattern(pattern)
+            self.send_log_search(dag_id, params, pattern, query.get("task_id", [None])[0],
+                                 query.get("state", [None])[0], token)
+            return
+
         if path == "/api/logs":
             dag_id = query.get("dag_id", [None])[0]
             dag_run_id = query.get("dag_run_id", [None])[0]
             task_id = query.get("task_id", [None])[0]
             try_number = query.get("try_number", [None])[0]
+            try:
+                map_index = parse_map_index(query.get("map_index", [None])[0])
+            except ValueError:
+                self.send_error(400, "map_index must be an integer")
+                return
             
             if dag_id and dag_run_id and task_id:
-                content = get_task_log(dag_id, dag_run_id, task_id, try_number, token)
-                self.send_json({"content": content})
+                if query.get("paged", [None])[0]:
+                    url = task_log_url(dag_id, dag_run_id, task_id, try_number, map_index)
+                    self.send_log_page(url, query.get("token", [None])[0], token)
+                else:
+                    self.send_log(dag_id, dag_run_id, task_id, try_number, token, map_index)
             else:
                 self.send_error(400, "Missing parameters")
             return
 
         # Default: Render HTML Table
-        rows_html = ""
-        try:
-            with open('dags.csv', mode='r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for i, row in enumerate(reader):
-                    dag_id = row.get('dag_id')
-                    if dag_id:
-                        status_info = get_latest_dag_status(dag_id, token)
-                        row_id = f"row-{i}"
-                        dag_run_id = status_info['dag_run_id']
-                        
-                        row_class = "dag-row"
-                        if status_info['state'] == 'success':
-                            row_class += " row-success"
-                        elif status_info['state'] == 'failed':
-                            row_class += " row-failed"
-                        
-                        onclick = ""
-                        onclick = f"onclick=\"fetchRuns('{dag_id}', '{row_id}-detail')\""
-                        
-                        rows_html += f"""
-                        <tr class="{row_class}" {onclick}>
-                            <td>{status_info['dag_id']}</td>
-                            <td>{status_info['state']}</td>
-                            <td>{status_info['execution_date']}</td>
-                        </tr>
-                        <tr id="{row_id}-detail" class="detail-row">
-                            <td colspan="3">
-                                <div id="{row_id}-detail-content"></div>
-                            </td>
-                        </tr>
-                        """
+        self.send_index(token)
+
+    def do_POST(self):
+        token = airflow_auth.authorization()
+        parsed_path = urllib.parse.urlparse(self.path)
+        path = parsed_path.path
+        query = urllib.parse.parse_qs(parsed_path.query)
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True  # can't tell where the body ends
+            self.send_error(400, "Bad Content-Length")
+            return
+
+        # Bulk status: {"dag_ids": [...]} -> [status, ...] in the same order
+        if path == "/api/status":
+            if length > DAG_LIST_UPLOAD_MAX:
+                self.close_connection = True  # rather than reading it all
+                self.send_error(413, "Request body too large")
+                return
+            try:
+                dag_ids = json.loads(self.rfile.read(length)).get("dag_ids")
+            except (ValueError, AttributeError):
+                dag_ids = None
+            if isinstance(dag_ids, list) and len(dag_ids) > DAG_LIST_MAX_DAGS:
+                self.send_error(400, f"More than {DAG_LIST_MAX_DAGS} dag_ids")
+            elif isinstance(dag_ids, list) and all(isinstance(d, str) for d in dag_ids):
+                self.send_json([mark_stale(status) for status in get_latest_dag_statuses_bulk(dag_ids, token)],
+                               stale=serving_stale())
+            else:
+                self.send_error(400, "Expected JSON body with a dag_ids list")
+            return
+
+        # Listing of a client-managed DAG list: {"dag_ids": [...], "offset": 0, "limit": 100, ...}
+        if path == "/api/dags":
+            if length > DAG_LIST_UPLOAD_MAX:
+                self.close_connection = True  # rather than reading it all
+                self.send_error(413, "Request body too large")
+                return
+            try:
+                body = json.loads(self.rfile.read(length))
+                dag_ids = body.get("dag_ids")
+                params = parse_dag_list_params(body)
+            except (ValueError, AttributeError, TypeError) as e:
+                self.send_error(400, f"Bad listing request: {e}")
+                return
+            if isinstance(dag_ids, list) and len(dag_ids) > DAG_LIST_MAX_DAGS:
+                self.send_error(400, f"More than {DAG_LIST_MAX_DAGS} dag_ids")
+            elif isinstance(dag_ids, list) and all(isinstance(d, str) for d in dag_ids):
+                listing = list_dags(dag_ids, token, params)
+                self.send_json(listing, stale=listing["stale"])
+            else:
+                self.send_error(400, "Expected JSON body with a dag_ids list")
+            return
+
+        # Shared DAG list upload: CSV body, ?name=<list name>
+        if path == "/api/lists":
+            name = query.get("name", [None])[0]
+            try:
+                allowed = verify_caller(self.headers.get("Authorization"))
+            except Exception as e:
+                self.close_connection = True
+                self.send_error(503, f"Can't check credentials with Airflow: {e}")
+                return
+            if not allowed:
+                self.close_connection = True  # the body is left unread
+                self.send_response(401)
+                self.send_header("WWW-Authenticate", 'Basic realm="Airflow"')
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if length > DAG_LIST_UPLOAD_MAX:
+                self.close_connection = True  # rather than reading it all
+                self.send_error(413, "DAG list too large")
+                return
+            try:
+                dag_ids = dag_lists.upload(name, self.rfile.read(length).decode('utf-8-sig'))
+            except (ValueError, UnicodeDecodeError, csv.Error) as e:
+                self.send_error(400, str(e))
+                return
+            self.send_json({"name": name, "count": len(dag_ids)})
+            return
+
+        self.rfile.read(length)  # keep the connection in sync for the next request
+        self.send_error(404)
+
+    def send_index(self, token):
+        # Head and table header go out right away; rows of the visible window
+        # follow as their statuses resolve
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        try:
+            params = parse_dag_list_params({k: v[0] for k, v in query.items()})
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        list_name = query.get("list", [DAG_LIST_DEFAULT])[0]
+        dag_ids = dag_lists.get(list_name)
+        if dag_ids is None:
+            self.send_error(404, "Unknown DAG list")
+            return
+
+        self.start_stream(200, "text/html; charset=utf-8")
+        try:
+            self.write_chunk(page_head)
+            try:
+                total, window = dag_index.page(dag_ids, token, **params)
+                with timed("render"):
+                    controls = render_dag_controls(list_name, params, total)
+            except Exception as e:
+                window, controls = [], f"<p>Error: {html.escape(str(e))}</p>"
+            self.write_chunk(controls.encode('utf-8'))
+            self.write_chunk(page_middle)
+            try:
+                i = params["offset"]
+                for batch in iter_latest_dag_statuses(window, token):
+                    with timed("render"):
+                        rows = []
+                        for status_info in batch:
+                            rows.append(render_dag_row(i, status_info))
+                            i += 1
+                        chunk = "".join(rows).encode('utf-8')
+                    self.write_chunk(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except Exception as e:
+                self.write_chunk(f"<tr><td colspan='3'>Error: {html.escape(str(e))}</td></tr>".encode('utf-8'))
+            self.write_chunk(page_tail)
+            self.end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # browser went away mid-page
+
+    def send_profile(self, query):
+        # Hot stacks of every thread over a few seconds, in collapsed
+        # "stack count" form (flamegraph.pl reads it as is)
+        try:
+            seconds = min(float(query.get("seconds", ["5"])[0]), PROFILE_MAX_SECONDS)
+            interval = max(float(query.get("interval", ["0.01"])[0]), 0.001)
+            limit = int(query.get("limit", ["100"])[0])
+        except ValueError:
+            self.send_error(400, "seconds, interval and limit must be numbers")
+            return
+        if not profile_lock.acquire(blocking=False):
+            self.send_error(409, "A profile is already running")
+            return
+        try:
+            samples = sample_stacks(seconds, interval)
+        finally:
+            profile_lock.release()
+        hottest = sorted(samples.items(), key=lambda item: item[1], reverse=True)[:limit]
+        body = "".join(f"{stack} {count}\n" for stack, count in hottest)
+        self.send_body(body.encode('utf-8'), "text/plain; charset=utf-8")
+
+    def send_tasks_stream(self, dag_id, dag_run_id, token):
+        # First look at a run: each page goes out as soon as it arrives, and
+        # the complete list is cached for the requests after this one
+        pages = iter_task_instance_pages(dag_id, dag_run_id, token)
+        try:
+            first = next(pages)
         except Exception as e:
-            rows_html = f"<tr><td colspan='3'>Error: {str(e)}</td></tr>"
-        
-        t = Template(html_layout)
-        display_html = t.substitute(table_rows=rows_html)
+            print(f"Error fetching tasks for {dag_id}: {e}")
+            self.send_json([])
+            return
 
+        tasks = []
+        self.start_stream(200, "application/json")
+        try:
+            for page in itertools.chain([first], pages):
+                if page:
+                    self.write_chunk((", " if tasks else "[").encode() + dump_json(page)[1:-1].encode('utf-8'))
+                    tasks.extend(page)
+            self.write_chunk(b"]" if tasks else b"[]")
+            self.end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            return
+        except Exception as e:
+            # Leave the response unterminated so the client sees a failure,
+            # not a silently shorter list
+            print(f"Error fetching tasks for {dag_id}: {e}")
+            self.close_connection = True
+            return
+        finally:
+            pages.close()
+        data = {"task_instances": tasks, "total_entries": len(tasks)}
+        api_cache.put(task_instances_url(dag_id, dag_run_id), data, tasks_ttl(data))
+
+    def send_log_search(self, dag_id, params, pattern, task_id, state, token):
+        # Every try of every task (or only `task_id`'s, or those in `state`)
+        # in the DAG's runs selected by `params`, searched LOG_SEARCH_FANOUT
+        # logs at a time. Matches go out as NDJSON lines as each log is done,
+        # and a last line sums the search up: a run whose task list couldn't
+        # be fetched counts as an error and is named in incomplete_runs.
+        try:
+            runs = load_dag_runs(dag_id, token, *params)
+        except Exception as e:
+            print(f"Error fetching runs of {dag_id} to search: {e}")
+            self.send_error(502, f"Error fetching runs: {e}")
+            return
+        task_lists = [log_search_pool.submit(carry_timing(load_dag_tasks), dag_id, run.dag_run_id, token) for run in runs]
+        logs = {}
+        incomplete = []
+        for run, tasks in zip(runs, task_lists):
+            try:
+                tasks = tasks.result()
+            except Exception as e:
+                print(f"Error fetching tasks of {dag_id} {run.dag_run_id} to search: {e}")
+                incomplete.append(run.dag_run_id)
+                continue
+            for task in tasks:
+                if (task_id and task.task_id != task_id) or (state and task.state != state):
+                    continue
+                for try_number in range(1, (task.try_number or 0) + 1):
+                    key = (run.dag_run_id, task.task_id, parse_map_index(task.map_index), try_number)
+                    logs[key] = log_search_pool.submit(carry_timing(search_log), dag_id, *key, pattern, token)
+
+        matched, errors = 0, len(incomplete)
+        self.start_stream(200, "application/x-ndjson")
+        try:
+            searches = {future: key for key, future in logs.items()}
+            for future in as_completed(searches):
+                dag_run_id, task, map_index, try_number = searches[future]
+                try:
+                    matches = future.result()
+                except Exception as e:
+                    print(f"Error searching the log of {dag_id} {dag_run_id} {task}[{map_index}] try {try_number}: {e}")
+                    errors += 1
+                    continue
+                matches = matches[:LOG_SEARCH_MAX_MATCHES - matched]
+                if matches:
+                    self.write_chunk("".join(json.dumps({"dag_run_id": dag_run_id, "task_id": task, "map_index": map_index,
+                                                         "try_number": try_number, "line_number": number, "line": line}) + "\n"
+                                             for number, line in matches).encode('utf-8'))
+                    matched += len(matches)
+                if matched >= LOG_SEARCH_MAX_MATCHES:
+                    break
+            truncated = matched >= LOG_SEARCH_MAX_MATCHES
+            self.write_chunk((json.dumps({"runs": len(runs), "logs": len(logs), "matches": matched, "errors": errors,
+                                          "incomplete_runs": incomplete, "truncated": truncated}) + "\n").encode('utf-8'))
+            self.end_stream()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            for future in logs.values():
+                future.cancel()
+
+    def send_log_page(self, url, continuation_token, token):
+        # Airflow's own paging: one bounded chunk plus a token for the next
+        url += ("&" if "?" in url else "?") + "full_content=false"
+        if continuation_token:
+            url += f"&token={urllib.parse.quote(continuation_token)}"
+        try:
+            data = fetch_json(url, token)
+        except Exception as e:
+            print(f"Error fetching log: {e}")
+            self.send_error(502, f"Error fetching log: {e}")
+            return
+        body = str(data.get("content", "")).encode('utf-8')
         self.send_response(200)
-        self.send_header("Content-type", "text/html; charset=utf-8")
+        self.send_header("Content-type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if data.get("continuation_token"):
+            self.send_header("X-Continuation-Token", data["continuation_token"])
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_log(self, dag_id, dag_run_id, task_id, try_number, token, map_index=-1):
+        byte_range = parse_byte_range(self.headers.get("Range"))
+        try:
+            log_file = open_cached_log(dag_id, dag_run_id, task_id, try_number, token, map_index)
+        except Exception as e:
+            print(f"Error caching log: {e}")
+            log_file = None
+        if log_file:
+            with log_file:
+                self.send_log_file(log_file, byte_range)
+            return
+
+        # Streams the log through in LOG_CHUNK pieces, so memory per request
+        # stays bounded by LOG_RANGE_MAX however large the log is
+        url = task_log_url(dag_id, dag_run_id, task_id, try_number, map_index)
+        try:
+            with airflow_stream(url, token) as response:
+                if byte_range is None:
+                    self.start_stream(200, "text/plain; charset=utf-8")
+                    while chunk := response.read(LOG_CHUNK):
+                        self.write_chunk(chunk)
+                    self.end_stream()
+                elif byte_range[0] is None:
+                    self.send_log_tail(response, byte_range[1])
+                else:
+                    self.send_log_range(response, *byte_range)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # browser went away mid-stream
+        except Exception as e:
+            print(f"Error fetching log: {e}")
+            if not self.headers_sent:
+                self.send_error(502, f"Error fetching log: {e}")
+            else:
+                self.close_connection = True
+
+    def send_log_file(self, log_file, byte_range):
+        # Cached logs go from the page cache to the socket with sendfile
+        st = os.fstat(log_file.fileno())
+        size = st.st_size
+        version = (os.path.basename(log_file.name)[:16], st.st_mtime)
+        if self.not_modified(version):
+            return
+        if byte_range is None:
+            start, count = 0, size
+        elif byte_range[0] is None:
+            count = min(byte_range[1], size)
+            start = size - count
+        else:
+            start = byte_range[0]
+            end = size - 1 if byte_range[1] is None else min(byte_range[1], size - 1)
+            count = end - start + 1
+        if byte_range is not None and (start >= size or count <= 0):
+            # Past the end, or any range of an empty log: nothing to send as a 206
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200 if byte_range is None else 206)
+        self.send_header("Content-type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(count))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_validators(version)
+        if byte_range is not None:
+            self.send_header("Content-Range", f"bytes {start}-{start + count - 1}/{size}")
+        self.end_headers()
+        try:
+            if count:
+                self.wfile.bytes_written += self.connection.sendfile(log_file, start, count)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def send_log_tail(self, response, length):
+        # bytes=-N: keep only the last N bytes while reading to the end
+        length = min(length, LOG_RANGE_MAX)
+        tail = bytearray()
+        total = 0
+        while chunk := response.read(LOG_CHUNK):
+            total += len(chunk)
+            tail += chunk
+            if len(tail) > length:
+                del tail[:len(tail) - length]
+        self.send_response(206)
+        self.send_header("Content-type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(tail)))
+        self.send_header("Content-Range", f"bytes {total - len(tail)}-{total - 1}/{total}" if tail else f"bytes */{total}")
+        self.end_headers()
+        self.wfile.write(tail)
+
+    def send_log_range(self, response, start, end):
+        # bytes=A-B: skip to A, stop reading upstream once past B
+        end = min(end if end is not None else start + LOG_RANGE_MAX - 1, start + LOG_RANGE_MAX - 1)
+        body = bytearray()
+        position = 0
+        while position <= end and (chunk := response.read(LOG_CHUNK)):
+            chunk_start, position = position, position + len(chunk)
+            if position > start:
+                body += chunk[max(start - chunk_start, 0):end + 1 - chunk_start]
+        if not body:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{position}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(206)
+        self.send_header("Content-type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Content-Range", f"bytes {start}-{start + len(body) - 1}/*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_stream(self, code, content_type):
+        # Chunked framing needs HTTP/1.1 on both ends; otherwise the body is
+        # delimited by closing the connection
+        self.chunked = self.request_version == "HTTP/1.1" and self.protocol_version == "HTTP/1.1"
+        # gzip with a sync flush per chunk, so the browser can render each
+        # piece as it arrives
+        self.compressor = None
+        if self.accepted_encoding(offered=("gzip",)):
+            self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        self.send_response(code)
+        self.send_header("Content-type", content_type)
+        self.send_header("Vary", "Accept-Encoding")
+        if self.compressor:
+            self.send_header("Content-Encoding", "gzip")
+        if self.chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("Trailer", "Server-Timing")
+        else:
+            self.close_connection = True
         self.end_headers()
-        self.wfile.write(display_html.encode('utf-8'))
+        self.headers_sent = True
+
+    def write_chunk(self, data):
+        if self.compressor and data:
+            data = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        if not data:
+            return
+        if self.chunked:
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        else:
+            self.wfile.write(data)
+
+    def end_stream(self):
+        if self.compressor:
+            data = self.compressor.flush()
+            self.compressor = None
+            self.write_chunk(data)
+        if self.chunked:
+            timing = getattr(current_timing, "value", None)
+            trailer = f"Server-Timing: {timing.header()}\r\n" if timing is not None else ""
+            self.wfile.write(f"0\r\n{trailer}\r\n".encode())
+
+    def send_json(self, data, stale=False):
+        with timed("render"):
+            body = dump_json(data).encode('utf-8')
+        self.send_body(body, "application/json", stale=stale)
+
+    def send_versioned_json(self, get_version, build):
+        # The ETag comes from the version of the data behind the response, so
+        # a poll for unchanged data costs a 304 with no rebuild or serialization
+        if serving_stale():
+            # No validators on last known data, so it never revalidates as
+            # current; a probe inside build() may have closed the circuit
+            data = build()
+            self.send_json(data, stale=serving_stale())
+            return
+        version = get_version()
+        if version:
+            if self.not_modified(version):
+                return
+            encoded = encoded_responses.get(self.path, version)
+            if encoded:
+                self.send_body(encoded[1], "application/json", version, encoded[2])
+                return
+
+        data = build()
+        with timed("render"):
+            body = dump_json(data).encode('utf-8')
+        # Only a version seen both before and after the build is known to be
+        # the one the body came from; without one before (cold, or a stale
+        # entry refreshed mid-build) the response goes out without validators
+        if version is not None and get_version() == version:
+            self.send_body(body, "application/json", version, encoded_responses.put(self.path, version, body))
+        else:
+            self.send_body(body, "application/json")
+
+    def send_body(self, body, content_type, version=None, compressed=None, stale=False):
+        encoding = self.accepted_encoding() if len(body) >= COMPRESS_MIN_BYTES else None
+        if encoding:
+            if compressed is None:
+                compressed = {}
+            if encoding not in compressed:
+                with timed("compress"):
+                    compressed[encoding] = compress(body, encoding)
+            body = compressed[encoding]
 
-    def send_json(self, data):
         self.send_response(200)
-        self.send_header("Content-type", "application/json")
+        self.send_header("Content-type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if version:
+            self.send_validators(version)
+        if stale:
+            self.send_header("Warning", '110 - "Response is Stale"')
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
+        self.wfile.write(body)
 
-# 5. 서버 실행 (포트 8000)
-PORT = 8000
-socketserver.TCPServer.allow_reuse_address = True
-with socketserver.TCPServer(("", PORT), MyHandler) as httpd:
-    print(f"Serving at port {PORT}")
+    def accepted_encoding(self, offered=("br", "gzip")):
+        accepted = {}
+        for part in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = part.partition(";")
+            q = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    q = float(params[2:])
+                except ValueError:
+                    q = 0.0
+            accepted[name.strip().lower()] = q
+        for encoding in offered:
+            if accepted.get(encoding, 0) > 0 and (encoding != "br" or brotli):
+                return encoding
+        return None
+
+    def send_validators(self, version):
+        self.send_header("ETag", make_etag(version))
+        if version[1] is not None:
+            self.send_header("Last-Modified", email.utils.formatdate(version[1], usegmt=True))
+
+    def not_modified(self, version):
+        # Answers a matching If-None-Match / If-Modified-Since with a 304
+        etag = make_etag(version)
+        if_none_match = self.headers.get("If-None-Match")
+        if_modified_since = self.headers.get("If-Modified-Since")
+        matched = False
+        if if_none_match:
+            tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+            matched = etag in tags or "*" in tags
+        elif if_modified_since and version[1] is not None:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+                matched = int(version[1]) <= since
+            except (TypeError, ValueError):
+                pass
+        if matched:
+            self.send_response(304)
+            self.send_validators(version)
+            self.end_headers()
+        return matched
+
+class ThreadPoolTCPServer(socketserver.TCPServer):
+    # Hands each accepted connection to a bounded worker pool so one slow
+    # Airflow call doesn't block every other browser.
+    allow_reuse_address = True
+    daemon_threads = True
+    open_connections = 0  # accepted and not yet closed or handed off; across instances, for /metrics
+
+    def __init__(self, server_address, RequestHandlerClass, max_workers=WORKER_THREADS, listener=None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="handler")
+        self.detached = set()  # sockets handed off by their handler, e.g. event streams
+        self.detached_lock = threading.Lock()
+        # Idle keep-alive connections wait here, not on a worker thread
+        self.parked = selectors.DefaultSelector()
+        self.parked_lock = threading.Lock()
+        self.served = {}  # socket -> requests served so far, while parked
+        self.draining = False
+        super().__init__(server_address, RequestHandlerClass, bind_and_activate=listener is None)
+        if listener is not None:
+            # Bound and listening already, by the supervisor. Every worker
+            # wakes up for a new connection and only one gets it, so accept
+            # must not block the others.
+            self.socket.close()
+            self.socket = listener
+            self.socket.setblocking(False)
+            self.server_address = listener.getsockname()
+        threading.Thread(target=self.run_keepalive, name="keepalive", daemon=True).start()
+
+    def park(self, request, client_address, served):
+        with self.parked_lock:
+            self.served[request] = served
+            self.parked.register(request, selectors.EVENT_READ, (client_address, time.monotonic()))
+
+    def requests_served(self, request):
+        with self.parked_lock:
+            return self.served.pop(request, 0)
+
+    def run_keepalive(self):
+        while True:
+            events = self.parked.select(timeout=1)
+            now = time.monotonic()
+            with self.parked_lock:
+                # Next request arrived: back onto a worker
+                for key, _ in events:
+                    self.parked.unregister(key.fileobj)
+                    self.submit(key.fileobj, key.data[0])
+                expired = [key.fileobj for key in self.parked.get_map().values()
+                           if now - key.data[1] > KEEPALIVE_TIMEOUT]
+                for request in expired:
+                    self.parked.unregister(request)
+                    self.served.pop(request, None)
+            for request in expired:
+                self.shutdown_request(request)
+
+    def detach(self, request):
+        with self.detached_lock:
+            self.detached.add(request)
+            ThreadPoolTCPServer.open_connections -= 1
+
+    def shutdown_request(self, request):
+        with self.detached_lock:
+            if request in self.detached:
+                self.detached.discard(request)
+                return
+            ThreadPoolTCPServer.open_connections -= 1
+        super().shutdown_request(request)
+
+    def process_request(self, request, client_address):
+        with self.detached_lock:
+            ThreadPoolTCPServer.open_connections += 1
+        self.submit(request, client_address)
 
-    httpd.serve_forever()
\ No newline at end of file
+    def submit(self, request, client_address):
+        try:
+            self.executor.submit(self.process_request_thread, request, client_address)
+        except RuntimeError:
+            self.shutdown_request(request)  # draining; the client reconnects to another worker
+
+    def finish_request(self, request, client_address):
+        return self.RequestHandlerClass(request, client_address, self)
+
+    def process_request_thread(self, request, client_address):
+        handler = None
+        try:
+            handler = self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        if handler is not None and handler.keep_alive and not self.draining:
+            self.park(request, client_address, handler.requests_served)
+        else:
+            self.shutdown_request(request)
+
+    def drain(self, grace):
+        # Graceful stop, after serve_forever returned: idle keep-alive
+        # connections are closed, requests in progress get `grace` seconds
+        self.draining = True
+        with self.parked_lock:
+            idle = [key.fileobj for key in self.parked.get_map().values()]
+            for request in idle:
+                self.parked.unregister(request)
+                self.served.pop(request, None)
+        for request in idle:
+            self.shutdown_request(request)
+        watchdog = threading.Timer(grace, os._exit, (0,))
+        watchdog.daemon = True
+        watchdog.start()
+        self.executor.shutdown(wait=True)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self.parked_lock:
+            for key in list(self.parked.get_map().values()):
+                self.parked.unregister(key.fileobj)
+                key.fileobj.close()
+        airflow_pool.close()
+        airflow_log_pool.close()
+
+def run_worker(fd, boot_id, handler=MyHandler):
+    # One of the supervisor's processes: serves the inherited listening
+    # socket until SIGTERM, then drains
+    global BOOT_ID, version_counter
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the whole group; the supervisor handles it
+    BOOT_ID = boot_id
+    # Versions end up in the shared store, so they must not collide across workers
+    version_counter = itertools.count((os.getpid() << 32) + 1)
+    airflow_auth.start()
+    shared_store.open()
+    threading.Thread(target=relay_shared_state, name="shared-relay", daemon=True).start()
+    if POLLER_ENABLED:
+        dag_poller.ensure_started()
+    if HISTORY_ENABLED:
+        run_history.open()
+    with ThreadPoolTCPServer(("", PORT), handler, listener=socket.socket(fileno=fd)) as httpd:
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=httpd.shutdown).start())
+        httpd.serve_forever()
+        httpd.drain(WORKER_RESTART_GRACE)
+
+class Supervisor:
+    # Pre-fork mode: binds PORT once and keeps `size` worker processes
+    # (the script that was started, with --worker) accepting on it, replacing any that exit.
+    # SIGHUP replaces them one at a time, starting the new worker before the
+    # old one drains, so a code change goes live without refusing a
+    # connection. SIGTERM or Ctrl-C drains them all and exits.
+    def __init__(self, size=WORKER_PROCESSES):
+        self.size = size
+        self.listener = socket.create_server(("", PORT), backlog=128)
+        self.listener.set_inheritable(True)
+        self.boot_id = BOOT_ID
+        self.workers = []
+        self.retiring = []  # asked to stop, still finishing requests
+        self.restarts = []  # workers still to replace after SIGHUP
+        self.stopping = False
+
+    def spawn(self):
+        fd = self.listener.fileno()
+        worker = subprocess.Popen([sys.executable, os.path.abspath(sys.argv[0]), "--worker", str(fd), self.boot_id],
+                                  pass_fds=(fd,))
+        self.workers.append(worker)
+
+    def restart(self, signum, frame):
+        self.boot_id = os.urandom(4).hex()  # new code may render differently; drop old ETags
+        self.restarts = list(self.workers)
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGHUP, self.restart)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        shared_store.open()
+        shared_store.reset()
+        for _ in range(self.size):
+            self.spawn()
+        print(f"Serving at port {PORT} with {self.size} processes of {WORKER_THREADS} workers")
+        next_prune = time.monotonic() + SHARED_PRUNE_INTERVAL
+        while not self.stopping:
+            for worker in [w for w in self.workers if w.poll() is not None]:
+                print(f"Worker {worker.pid} exited with status {worker.returncode}; starting another")
+                self.workers.remove(worker)
+                self.spawn()
+            self.retiring = [w for w in self.retiring if w.poll() is None]
+            if self.restarts and not self.retiring:
+                old = self.restarts.pop()
+                if old in self.workers:
+                    self.workers.remove(old)
+                    self.spawn()
+                    old.terminate()
+                    self.retiring.append(old)
+            if time.monotonic() > next_prune:
+                try:
+                    shared_store.prune()
+                except sqlite3.Error as e:
+                    print(f"Error pruning the shared store: {e}")
+                next_prune = time.monotonic() + SHARED_PRUNE_INTERVAL
+            time.sleep(0.2)
+        for worker in self.workers + self.retiring:
+            worker.terminate()
+        for worker in self.workers + self.retiring:
+            worker.wait()
+        self.listener.close()
+
+def main(handler=MyHandler):
+    # Startup for server.py and for scripts serving their own handler
+    # (server_remote.py); worker processes re-run the same script
+    if sys.argv[1:2] == ["--worker"]:
+        run_worker(int(sys.argv[2]), sys.argv[3], handler)
+    elif WORKER_PROCESSES > 1:
+        Supervisor().run()
+    else:
+        airflow_auth.start()
+        if POLLER_ENABLED:
+            dag_poller.ensure_started()
+        if HISTORY_ENABLED:
+            run_history.open()
+        with ThreadPoolTCPServer(("", PORT), handler) as httpd:
+            print(f"Serving at port {PORT} with {WORKER_THREADS} workers")
+            httpd.serve_forever()
+
+# 5. 서버 실행 (포트 8000)
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,8 @@
-import http.server
-import socketserver
+import hashlib
+import os
+
+import server
 # from string import Template # Not really needed anymore as we don't do server-side template substitution
-import urllib.request
-import urllib.error
-import urllib.parse
-import json
-import base64
-from datetime import datetime
-
-# Airflow Configuration
-AIRFLOW_API_URL = "http://localhost:8080/api/v1"
-AIRFLOW_USER = "airflow"
-AIRFLOW_PASS = "airflow"
 
 # HTML Template with Client-Side Logic
 html_layout = """
@@ -43,9 +34,62 @@ html_layout = """
         const STORE_KEY = 'my_dags';
 
         window.onload = function() {
+            loadLists();
             loadDags();
         };
 
+        // Shared lists live on the server; '' means the list kept in this browser
+        async function loadLists(selected) {
+            const select = document.getElementById('listSelect');
+            try {
+                const response = await fetch('/api/lists');
+                const lists = await response.json();
+                select.innerHTML = '<option value="">My DAGs (this browser)</option>';
+                Object.entries(lists).forEach(([name, count]) => {
+                    const option = document.createElement('option');
+                    option.value = name;
+                    option.textContent = `${name} (${count})`;
+                    select.appendChild(option);
+                });
+                select.value = selected !== undefined ? selected : view.list;
+            } catch (e) {
+                console.error(`Failed to load shared lists`, e);
+            }
+        }
+
+        function selectList() {
+            view.list = document.getElementById('listSelect').value;
+            view.offset = 0;
+            loadDags();
+        }
+
+        async function uploadCsv() {
+            const file = document.getElementById('csvInput').files[0];
+            if (!file) {
+                alert("Please select a CSV file to share.");
+                return;
+            }
+            const defaultName = file.name.endsWith('.csv') ? file.name.slice(0, -4) : file.name;
+            const name = prompt("Name of the shared list:", defaultName);
+            if (!name) return;
+            try {
+                const response = await fetch(`/api/lists?name=${encodeURIComponent(name)}`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'text/csv' },
+                    body: await file.text()
+                });
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                const result = await response.json();
+                alert(`Shared ${result.count} DAGs as "${result.name}".`);
+                view.list = result.name;
+                view.offset = 0;
+                await loadLists(result.name);
+                loadDags();
+            } catch (e) {
+                alert(`Upload failed: ${e}`);
+            }
+        }
+
         function importCsv() {
             const fileInput = document.getElementById('csvInput');
             const file = fileInput.files[0];
@@ -73,6 +117,9 @@ html_layout = """
                 if (dags.length > 0) {
                     localStorage.setItem(STORE_KEY, JSON.stringify(dags));
                     alert(`Imported ${dags.length} DAGs.`);
+                    view.list = '';
+                    document.getElementById('listSelect').value = '';
+                    view.offset = 0;
                     loadDags();
                 } else {
                     alert("No valid DAG IDs found in file.");
@@ -84,67 +131,148 @@ html_layout = """
         function clearDags() {
             if (confirm("Clear all tracked DAGs?")) {
                 localStorage.removeItem(STORE_KEY);
+                if (stream) stream.close();
                 loadDags();
             }
         }
 
+        // Only the visible window is rendered; the server filters, sorts and pages
+        const PAGE_SIZE = 100;
+        const view = { list: '', offset: 0, prefix: '', state: '', sort: '', order: 'asc' };
+        let loadSeq = 0;
+
+        function applyFilters() {
+            view.prefix = document.getElementById('prefixInput').value.trim();
+            view.state = document.getElementById('stateSelect').value;
+            view.sort = document.getElementById('sortSelect').value;
+            view.order = document.getElementById('descInput').checked ? 'desc' : 'asc';
+            view.offset = 0;
+            loadDags();
+        }
+
+        function changePage(direction) {
+            view.offset = Math.max(0, view.offset + direction * PAGE_SIZE);
+            loadDags();
+        }
+
         async function loadDags() {
             const stored = localStorage.getItem(STORE_KEY);
             const tableBody = document.getElementById('dagTableBody');
-            tableBody.innerHTML = ''; // Clear table
+            const seq = ++loadSeq;
 
-            if (!stored) {
+            if (!view.list && !stored) {
                 tableBody.innerHTML = '<tr><td colspan="3">No DAGs tracked. Import CSV to start.</td></tr>';
+                updatePager(null);
                 return;
             }
 
-            const dags = JSON.parse(stored);
-            
-            // Render rows first (loading state)
-            dags.forEach((dagId, index) => {
-                const rowId = `row-${index}`;
-                const html = `
-                    <tr id="${rowId}" class="dag-row">
-                        <td>${dagId}</td>
-                        <td id="${rowId}-state">Loading...</td>
-                        <td id="${rowId}-date">-</td>
-                    </tr>
-                    <tr id="${rowId}-detail" class="detail-row">
-                        <td colspan="3"><div id="${rowId}-detail-content"></div></td>
-                    </tr>
-                `;
-                tableBody.insertAdjacentHTML('beforeend', html);
-                
-                // Fetch status individually (could be optimized to bulk if needed)
-                fetchStatus(dagId, rowId);
-            });
-        }
+            tableBody.innerHTML = '<tr><td colspan="3">Loading...</td></tr>';
 
-        async function fetchStatus(dagId, rowId) {
+            const params = { offset: view.offset, limit: PAGE_SIZE, prefix: view.prefix,
+                             state: view.state, sort: view.sort, order: view.order };
+            let page;
             try {
-                const response = await fetch(`/api/status?dag_id=${encodeURIComponent(dagId)}`);
-                const data = await response.json();
-                
-                const row = document.getElementById(rowId);
-                const stateCell = document.getElementById(`${rowId}-state`);
-                const dateCell = document.getElementById(`${rowId}-date`);
-                
-                stateCell.textContent = data.state;
-                dateCell.textContent = data.execution_date;
-                
-                // Color coding
-                row.classList.remove('row-success', 'row-failed');
-                if (data.state === 'success') row.classList.add('row-success');
-                else if (data.state === 'failed') row.classList.add('row-failed');
-
-                // Add click handler for details
-                if (data.dag_run_id) {
-                    row.onclick = function() { fetchRuns(dagId, `${rowId}-detail`); };
-                }
-                
+                const response = view.list
+                    ? await fetch('/api/dags?' + new URLSearchParams({ list: view.list, ...params }))
+                    : await fetch('/api/dags', {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ dag_ids: JSON.parse(stored), ...params })
+                    });
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                page = await response.json();
             } catch (e) {
-                console.error(`Failed to fetch status for ${dagId}`, e);
-                document.getElementById(`${rowId}-state`).textContent = "Error";
+                console.error(`Failed to load DAGs`, e);
+                if (seq === loadSeq) tableBody.innerHTML = `<tr><td colspan="3">Error loading DAGs: ${e}</td></tr>`;
+                return;
+            }
+            if (seq !== loadSeq) return; // a newer page was requested meanwhile
+
+            tableBody.innerHTML = page.dags.length ? '' : '<tr><td colspan="3">No matching DAGs.</td></tr>';
+            page.dags.forEach((data, i) => {
+                const rowId = `row-${page.offset + i}`;
+                // dag_ids come from shared lists; they only ever go in as text
+                const row = tableBody.insertRow();
+                row.id = rowId;
+                row.className = 'dag-row';
+                row.insertCell().textContent = data.dag_id;
+                row.insertCell().id = `${rowId}-state`;
+                row.insertCell().id = `${rowId}-date`;
+                const detailRow = tableBody.insertRow();
+                detailRow.id = `${rowId}-detail`;
+                detailRow.className = 'detail-row';
+                const detailCell = detailRow.insertCell();
+                detailCell.colSpan = 3;
+                const content = document.createElement('div');
+                content.id = `${rowId}-detail-content`;
+                detailCell.appendChild(content);
+                applyStatus(data.dag_id, rowId, data);
+            });
+
+            updatePager(page);
+            subscribeStream(page.dags.map(data => data.dag_id), page.offset);
+        }
+
+        function updatePager(page) {
+            const info = document.getElementById('pagerInfo');
+            if (!page) {
+                info.textContent = '';
+                document.getElementById('prevPage').disabled = true;
+                document.getElementById('nextPage').disabled = true;
+                if (stream) stream.close();
+                return;
+            }
+            const first = Math.min(page.offset + 1, page.total);
+            info.textContent = `Showing ${first}-${Math.min(page.offset + page.limit, page.total)} of ${page.total}`;
+            if (page.stale) info.textContent = `Airflow is not answering; showing last known data. ${info.textContent}`;
+            document.getElementById('prevPage').disabled = page.offset === 0;
+            document.getElementById('nextPage').disabled = page.offset + page.limit >= page.total;
+        }
+
+        // --- Live updates pushed by the server (no polling) ---
+        let stream = null;
+
+        function subscribeStream(dags, offset) {
+            if (stream) stream.close();
+            stream = null;
+            if (!dags.length) return;  // nothing to watch; the server refuses an empty subscription
+            const rowIds = {};
+            dags.forEach((dagId, index) => { rowIds[dagId] = `row-${offset + index}`; });
+
+            stream = new EventSource(`/api/stream?dag_ids=${encodeURIComponent(dags.join(','))}`);
+            stream.addEventListener('status', (e) => {
+                const data = JSON.parse(e.data);
+                if (rowIds[data.dag_id]) applyStatus(data.dag_id, rowIds[data.dag_id], data);
+            });
+            stream.addEventListener('task', (e) => {
+                const data = JSON.parse(e.data);
+                const key = CSS.escape(`${data.dag_id}|${data.dag_run_id}|${data.task_id}|${data.map_index}`);
+                document.querySelectorAll(`tr[data-task="${key}"]`).forEach(row => {
+                    row.cells[1].textContent = data.state;
+                    row.cells[2].textContent = data.try_number;
+                    row.classList.remove('row-success', 'row-failed');
+                    if (data.state === 'success') row.classList.add('row-success');
+                    else if (data.state === 'failed') row.classList.add('row-failed');
+                });
+            });
+        }
+
+        function applyStatus(dagId, rowId, data) {
+            const row = document.getElementById(rowId);
+            const stateCell = document.getElementById(`${rowId}-state`);
+            const dateCell = document.getElementById(`${rowId}-date`);
+            
+            stateCell.textContent = data.state;
+            dateCell.textContent = data.execution_date;
+            
+            // Color coding
+            row.classList.remove('row-success', 'row-failed');
+            if (data.state === 'success') row.classList.add('row-success');
+            else if (data.state === 'failed') row.classList.add('row-failed');
+
+            // Add click handler for details
+            if (data.dag_run_id) {
+                row.onclick = function() { fetchRuns(dagId, `${rowId}-detail`); };
             }
         }
 
@@ -166,7 +294,9 @@ html_layout = """
                 const response = await fetch(`/api/runs?dag_id=${encodeURIComponent(dagId)}`);
                 const runs = await response.json();
                 
-                let html = '<table class="run-table" style="width:90%; margin:auto;"><thead><tr><th>Run ID</th><th>State</th><th>Execution Date</th></tr></thead><tbody>';
+                const searchId = rowId + '-search';
+                let html = `<div style="width:90%; margin:auto;"><input id="${searchId}" placeholder="Text to find in these runs' logs" onkeydown="if (event.key === 'Enter') searchLogs('${dagId}', '${searchId}')"> <button onclick="searchLogs('${dagId}', '${searchId}')">Search logs</button></div>`;
+                html += '<table class="run-table" style="width:90%; margin:auto;"><thead><tr><th>Run ID</th><th>State</th><th>Execution Date</th></tr></thead><tbody>';
                 if (runs.length === 0) {
                      html += '<tr><td colspan="3">No runs found</td></tr>';
                 } else {
@@ -230,11 +360,11 @@ html_layout = """
                         } else if (task.state === "failed") {
                             rowClass = "row-failed";
                         }
-                        html += `<tr class="${rowClass}">
-                            <td>${task.task_id}</td>
+                        html += `<tr class="${rowClass}" data-task="${dagId}|${dagRunId}|${task.task_id}|${task.map_index}">
+                            <td>${task.task_id}${task.map_index >= 0 ? '[' + task.map_index + ']' : ''}</td>
                             <td>${task.state}</td>
                             <td>${task.try_number}</td>
-                            <td><button onclick="event.stopPropagation(); fetchLog('${dagId}', '${dagRunId}', '${task.task_id}', ${task.try_number})">View Log</button></td>
+                            <td><button onclick="event.stopPropagation(); fetchLog('${dagId}', '${dagRunId}', '${task.task_id}', ${task.try_number}, ${task.map_index ?? -1})">View Log</button></td>
                         </tr>`;
                     });
                 }
@@ -246,29 +376,100 @@ html_layout = """
             }
         }
 
-        async function fetchLog(dagId, dagRunId, taskId, tryNumber) {
+        // Logs load tail-first; "Load earlier" pages backwards by byte range
+        const LOG_PAGE_BYTES = 64 * 1024;
+        let logState = null;
+
+        async function fetchLog(dagId, dagRunId, taskId, tryNumber, mapIndex) {
             const modal = document.getElementById('logModal');
             const logContent = document.getElementById('logContent');
             
             modal.style.display = "block";
             logContent.textContent = "Loading logs...";
+            document.getElementById('logMore').style.display = "none";
             
+            logState = {
+                url: `/api/logs?dag_id=${encodeURIComponent(dagId)}&dag_run_id=${encodeURIComponent(dagRunId)}&task_id=${encodeURIComponent(taskId)}&try_number=${encodeURIComponent(tryNumber)}&map_index=${encodeURIComponent(mapIndex ?? -1)}`,
+                bytes: new Uint8Array(0),
+                start: 0
+            };
+            await loadLogRange(`bytes=-${LOG_PAGE_BYTES}`);
+        }
+
+        async function loadEarlierLog() {
+            if (!logState || logState.start === 0) return;
+            const from = Math.max(0, logState.start - LOG_PAGE_BYTES);
+            await loadLogRange(`bytes=${from}-${logState.start - 1}`);
+        }
+
+        async function loadLogRange(range) {
+            const state = logState;
+            const logContent = document.getElementById('logContent');
             try {
-                const response = await fetch(`/api/logs?dag_id=${encodeURIComponent(dagId)}&dag_run_id=${encodeURIComponent(dagRunId)}&task_id=${encodeURIComponent(taskId)}&try_number=${encodeURIComponent(tryNumber)}`);
-                const data = await response.json();
-                
-                let cleanContent = data.content;
-                if (typeof cleanContent === 'string') {
-                    // Replace literal \\n with actual newline
-                    cleanContent = cleanContent.replace(/\\\\n/g, '\\n');
-                }
+                const response = await fetch(state.url, { headers: { 'Range': range } });
+                if (!response.ok && response.status !== 416) throw new Error(`HTTP ${response.status}`);
+                const chunk = new Uint8Array(await response.arrayBuffer());
+                if (state !== logState) return; // another log was opened meanwhile
+
+                // "bytes 100-199/500" or "bytes 100-199/*"; plain 200 means the whole log
+                const match = /bytes (\\d+)-/.exec(response.headers.get('Content-Range') || '');
+                const start = match ? parseInt(match[1]) : 0;
+                const merged = new Uint8Array(chunk.length + state.bytes.length);
+                merged.set(chunk);
+                merged.set(state.bytes, chunk.length);
+                state.bytes = merged;
+                state.start = start;
+
+                let cleanContent = new TextDecoder().decode(state.bytes);
+                // Replace literal \\n with actual newline
+                cleanContent = cleanContent.replace(/\\\\n/g, '\\n');
                 logContent.textContent = cleanContent;
+                document.getElementById('logMore').style.display = start > 0 ? "inline" : "none";
             } catch (error) {
                 console.error(error);
                 logContent.textContent = 'Error loading logs: ' + error;
             }
         }
 
+        // Matches arrive as NDJSON lines while the server is still searching
+        async function searchLogs(dagId, inputId) {
+            const pattern = document.getElementById(inputId).value.trim();
+            if (!pattern) return;
+            const logContent = document.getElementById('logContent');
+            document.getElementById('logModal').style.display = "block";
+            document.getElementById('logMore').style.display = "none";
+            const state = logState = { search: pattern, start: 0 };
+            logContent.textContent = `Searching the logs of ${dagId} for "${pattern}"...\\n\\n`;
+            try {
+                const response = await fetch(`/api/logs/search?dag_id=${encodeURIComponent(dagId)}&pattern=${encodeURIComponent(pattern)}`);
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let pending = '';
+                while (true) {
+                    const { done, value } = await reader.read();
+                    if (state !== logState) { reader.cancel(); return; } // another log or search was opened
+                    if (done) break;
+                    pending += decoder.decode(value, { stream: true });
+                    const lines = pending.split('\\n');
+                    pending = lines.pop();
+                    for (const line of lines.filter(Boolean)) {
+                        const item = JSON.parse(line);
+                        if (item.line !== undefined) {
+                            logContent.textContent += `${item.dag_run_id}  ${item.task_id}${item.map_index >= 0 ? '[' + item.map_index + ']' : ''}  try ${item.try_number}  line ${item.line_number}:\\n    ${item.line}\\n`;
+                        } else {
+                            logContent.textContent += `\\n${item.matches} matching lines in ${item.logs} logs of ${item.runs} runs`
+                                + (item.truncated ? ' (stopped at the limit)' : '')
+                                + (item.errors ? `; ${item.errors} logs could not be read` : '');
+                        }
+                    }
+                }
+            } catch (error) {
+                console.error(error);
+                logContent.textContent += '\\nError searching logs: ' + error;
+            }
+        }
+
         function closeModal() {
             document.getElementById('logModal').style.display = "none";
         }
@@ -285,10 +486,33 @@ html_layout = """
     <h1>Airflow On-prem Status (Client Managed)</h1>
     
     <div class="controls">
+        <label>List <select id="listSelect" onchange="selectList()"><option value="">My DAGs (this browser)</option></select></label>
         <label>Import dags.csv: <input type="file" id="csvInput" accept=".csv" onchange="importCsv()"></label>
+        <button onclick="uploadCsv()">Share on Server</button>
         <button onclick="clearDags()">Clear List</button>
     </div>
 
+    <div class="controls">
+        <label>DAG ID prefix <input id="prefixInput"></label>
+        <label>State
+            <select id="stateSelect">
+                <option value="">any</option><option>success</option><option>failed</option>
+                <option>running</option><option>queued</option><option>N/A</option>
+            </select>
+        </label>
+        <label>Sort by
+            <select id="sortSelect">
+                <option value="">list order</option><option value="dag_id">DAG ID</option>
+                <option value="state">state</option><option value="execution_date">execution date</option>
+            </select>
+        </label>
+        <label><input type="checkbox" id="descInput"> Descending</label>
+        <button onclick="applyFilters()">Apply</button>
+        <span id="pagerInfo"></span>
+        <button id="prevPage" onclick="changePage(-1)" disabled>&laquo; Prev</button>
+        <button id="nextPage" onclick="changePage(1)" disabled>Next &raquo;</button>
+    </div>
+
     <table border="1">
         <thead>
             <tr><th>DAG ID</th><th>State</th><th>Execution Date</th></tr>
@@ -303,6 +527,7 @@ html_layout = """
         <div class="modal-content">
             <span class="close" onclick="closeModal()">&times;</span>
             <h2>Task Log</h2>
+            <button id="logMore" onclick="loadEarlierLog()" style="display:none">Load earlier</button>
             <pre id="logContent"></pre>
         </div>
     </div>
@@ -310,166 +535,19 @@ html_layout = """
 </html>
 """
 
-def get_airflow_token(username, password):
-    try:
-        credentials = f"{username}:{password}"
-        encoded_credentials = base64.b64encode(credentials.encode()).decode()
-        return encoded_credentials
-    except Exception as e:
-        print(f"Error fetching token: {e}")
-        return None
-
-def get_latest_dag_status(dag_id, token):
-    try:
-        url = f"{AIRFLOW_API_URL}/dags/{dag_id}/dagRuns?limit=1&order_by=-execution_date"
-        headers = { "Authorization": f"Basic {token}", "Content-Type": "application/json" }
-        req = urllib.request.Request(url, headers=headers)
-        
-        with urllib.request.urlopen(req, timeout=5) as response:
-            if response.status == 200:
-                raw_data = response.read().decode()
-                try:
-                    data = json.loads(raw_data)
-                    dag_runs = data.get("dag_runs", [])
-                    if dag_runs:
-                        latest_run = dag_runs[0]
-                        return {
-                            "dag_id": dag_id,
-                            "dag_run_id": latest_run.get("dag_run_id"),
-                            "state": latest_run.get("state"),
-                            "execution_date": latest_run.get("execution_date")
-                        }
-                except json.JSONDecodeError:
-                    print(f"Error: Expected JSON but got something else from {url}")
-                    print(f"First 500 chars: {raw_data[:500]}")
-    except Exception as e:
-        print(f"Error fetching dag status for {dag_id}: {e}")
-    
-    return {"dag_id": dag_id, "state": "N/A", "execution_date": "N/A", "dag_run_id": None}
-
-def get_recent_dag_runs(dag_id, token, limit=5):
-    try:
-        url = f"{AIRFLOW_API_URL}/dags/{dag_id}/dagRuns?limit={limit}&order_by=-execution_date"
-        headers = { "Authorization": f"Basic {token}", "Content-Type": "application/json" }
-        req = urllib.request.Request(url, headers=headers)
-        
-        with urllib.request.urlopen(req, timeout=5) as response:
-            if response.status == 200:
-                data = json.loads(response.read().decode())
-                return data.get("dag_runs", [])
-    except Exception as e:
-        print(f"Error fetching recent runs for {dag_id}: {e}")
-    return []
-
-def get_dag_tasks(dag_id, dag_run_id, token):
-    try:
-        # URL parsing to handle special chars in dag_run_id if necessary
-        safe_dag_run_id = urllib.parse.quote(dag_run_id)
-        url = f"{AIRFLOW_API_URL}/dags/{dag_id}/dagRuns/{safe_dag_run_id}/taskInstances"
-        headers = { "Authorization": f"Basic {token}", "Content-Type": "application/json" }
-        req = urllib.request.Request(url, headers=headers)
-        
-        with urllib.request.urlopen(req, timeout=5) as response:
-            if response.status == 200:
-                data = json.loads(response.read().decode())
-                return data.get("task_instances", [])
-    except Exception as e:
-        print(f"Error fetching tasks for {dag_id}: {e}")
-    return []
-
-def get_task_log(dag_id, dag_run_id, task_id, try_number, token):
-    try:
-        safe_dag_run_id = urllib.parse.quote(dag_run_id)
-        url = f"{AIRFLOW_API_URL}/dags/{dag_id}/dagRuns/{safe_dag_run_id}/taskInstances/{task_id}/logs/{try_number}"
-        headers = { "Authorization": f"Basic {token}", "Content-Type": "application/json" }
-        req = urllib.request.Request(url, headers=headers)
-        
-        with urllib.request.urlopen(req, timeout=5) as response:
-            if response.status == 200:
-                data = json.loads(response.read().decode())
-                return data.get("content", str(data))
-    except Exception as e:
-        print(f"Error fetching log: {e}")
-        return str(e)
-
-class MyHandler(http.server.BaseHTTPRequestHandler):
-    def do_GET(self):
-        token = get_airflow_token(AIRFLOW_USER, AIRFLOW_PASS)
-        parsed_path = urllib.parse.urlparse(self.path)
-        path = parsed_path.path
-        query = urllib.parse.parse_qs(parsed_path.query)
-        
-        # New Endpoint: /api/status?dag_id=...
-        if path == "/api/status":
-            dag_id = query.get("dag_id", [None])[0]
-            if dag_id:
-                status = get_latest_dag_status(dag_id, token)
-                self.send_json(status)
-            else:
-                self.send_error(400, "Missing dag_id")
-            return
-
-        if path == "/api/runs":
-            dag_id = query.get("dag_id", [None])[0]
-            if dag_id:
-                runs = get_recent_dag_runs(dag_id, token)
-                response_data = []
-                for r in runs:
-                    response_data.append({
-                        "dag_run_id": r.get("dag_run_id"),
-                        "state": r.get("state"),
-                        "execution_date": r.get("execution_date")
-                    })
-                self.send_json(response_data)
-            else:
-                self.send_error(400, "Missing dag_id")
-            return
-
-        if path == "/api/tasks":
-            dag_id = query.get("dag_id", [None])[0]
-            dag_run_id = query.get("dag_run_id", [None])[0]
-            if dag_id and dag_run_id:
-                tasks = get_dag_tasks(dag_id, dag_run_id, token)
-                response_data = []
-                for t in tasks:
-                    response_data.append({
-                        "task_id": t.get("task_id"),
-                        "state": t.get("state"),
-                        "try_number": t.get("try_number")
-                    })
-                self.send_json(response_data)
-            else:
-                self.send_error(400, "Missing dag_id or dag_run_id")
-            return
+# The page never changes while the server runs: encode and compress it once
+index_body = html_layout.encode('utf-8')
+index_version = (hashlib.sha1(index_body).hexdigest()[:16], os.path.getmtime(__file__))
+index_compressed = server.precompress(index_body)
 
-        if path == "/api/logs":
-            dag_id = query.get("dag_id", [None])[0]
-            dag_run_id = query.get("dag_run_id", [None])[0]
-            task_id = query.get("task_id", [None])[0]
-            try_number = query.get("try_number", [None])[0]
-            
-            if dag_id and dag_run_id and task_id:
-                content = get_task_log(dag_id, dag_run_id, task_id, try_number, token)
-                self.send_json({"content": content})
-            else:
-                self.send_error(400, "Missing parameters")
+# Airflow helpers, /api/* routes and the Airflow configuration are shared with server.py
+class MyHandler(server.MyHandler):
+    # Default: Render Client-Side HTML (No CSV reading)
+    def send_index(self, token):
+        if self.not_modified(index_version):
             return
+        self.send_body(index_body, "text/html; charset=utf-8", index_version, index_compressed)
 
-        # Default: Render Client-Side HTML (No CSV reading)
-        self.send_response(200)
-        self.send_header("Content-type", "text/html; charset=utf-8")
-        self.end_headers()
-        self.wfile.write(html_layout.encode('utf-8'))
-
-    def send_json(self, data):
-        self.send_response(200)
-        self.send_header("Content-type", "application/json")
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
-
-# 5. Server Start
-PORT = 8000
-socketserver.TCPServer.allow_reuse_address = True
-with socketserver.TCPServer(("", PORT), MyHandler) as httpd:
-    print(f"Serving at port {PORT}")
-    httpd.serve_forever()
+# 5. Server Start: same port, workers, poller and run history as server.py
+if __name__ == "__main__":
+    server.main(MyHandler)
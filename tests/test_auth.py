@@ -0,0 +1,152 @@
+import base64
+import io
+import json
+import unittest
+import urllib.error
+from unittest import mock
+
+import server
+from server import BasicAuth, TokenAuth
+
+
+def basic(credentials):
+    return "Basic " + base64.b64encode(credentials.encode()).decode()
+
+
+class FakeResponse(io.BytesIO):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def token_endpoint(accepted=("alice", "secret"), expires_in=600):
+    # A urlopen stand-in that issues tokens for `accepted` and remembers every body it was sent
+    bodies = []
+
+    def urlopen(request, timeout=None):
+        body = json.loads(request.data)
+        bodies.append(body)
+        if (body["username"], body["password"]) != accepted:
+            raise urllib.error.HTTPError(request.full_url, 401, "Unauthorized", {}, None)
+        return FakeResponse(json.dumps({"access_token": "t-" + body["username"], "expires_in": expires_in}).encode())
+    return urlopen, bodies
+
+
+class TokenAuthVerifyTest(unittest.TestCase):
+    def setUp(self):
+        self.auth = TokenAuth("http://airflow/auth/token", "airflow", "airflow")
+        self.urlopen, self.bodies = token_endpoint(accepted=("airflow", "airflow"))
+        patcher = mock.patch.object(server.urllib.request, "urlopen", self.urlopen)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_empty_credentials_are_rejected_without_a_request(self):
+        for credentials in (":", "airflow:", ":airflow", ""):
+            with self.subTest(credentials=credentials):
+                self.assertFalse(self.auth.verify(basic(credentials)))
+        self.assertEqual(self.bodies, [])
+
+    def test_caller_credentials_are_sent_as_given(self):
+        self.assertFalse(self.auth.verify(basic("mallory:guess")))
+        self.assertEqual(self.bodies, [{"username": "mallory", "password": "guess"}])
+
+    def test_server_credentials_are_not_filled_in(self):
+        self.assertFalse(self.auth.verify(basic("airflow:")))
+        self.assertFalse(self.auth.verify(basic(":airflow")))
+        self.assertTrue(self.auth.verify(basic("airflow:airflow")))
+        self.assertEqual(self.bodies, [{"username": "airflow", "password": "airflow"}])
+
+    def test_malformed_basic_header_is_rejected(self):
+        self.assertFalse(self.auth.verify("Basic not*base64"))
+        self.assertEqual(self.bodies, [])
+
+    def test_bearer_header_is_checked_against_airflow(self):
+        with mock.patch.object(server, "airflow_accepts", return_value=True) as accepts:
+            self.assertTrue(self.auth.verify("Bearer abc"))
+        accepts.assert_called_once_with("Bearer abc")
+
+    def test_server_errors_propagate(self):
+        def urlopen(request, timeout=None):
+            raise urllib.error.HTTPError(request.full_url, 503, "Unavailable", {}, None)
+        with mock.patch.object(server.urllib.request, "urlopen", urlopen):
+            with self.assertRaises(urllib.error.HTTPError):
+                self.auth.verify(basic("alice:secret"))
+
+
+class TokenAuthRefreshTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch("sys.stdout", new_callable=io.StringIO)  # refresh failures are printed
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fetch_uses_the_configured_credentials(self):
+        urlopen, bodies = token_endpoint()
+        auth = TokenAuth("http://airflow/auth/token", "alice", "secret", margin=60)
+        with mock.patch.object(server.urllib.request, "urlopen", urlopen), \
+                mock.patch.object(server.time, "monotonic", return_value=1000.0):
+            self.assertEqual(auth.refresh(None), "Bearer t-alice")
+        self.assertEqual(bodies, [{"username": "alice", "password": "secret"}])
+        self.assertEqual((auth.expires_at, auth.renew_at), (1600.0, 1540.0))
+
+    def test_failed_refresh_keeps_the_old_header_and_backs_off(self):
+        urlopen, bodies = token_endpoint(accepted=("someone", "else"))
+        auth = TokenAuth("http://airflow/auth/token", "alice", "secret", retry=30)
+        auth.header = "Bearer old"
+        with mock.patch.object(server.urllib.request, "urlopen", urlopen), \
+                mock.patch.object(server.time, "monotonic", return_value=1000.0):
+            self.assertEqual(auth.refresh("Bearer old"), "Bearer old")
+            self.assertEqual(auth.refresh("Bearer old"), "Bearer old")  # inside the retry window
+        self.assertEqual(len(bodies), 1)
+        self.assertEqual(auth.failures, 1)
+
+    def test_rejected_returns_none_without_a_new_token(self):
+        urlopen, _ = token_endpoint(accepted=("someone", "else"))
+        auth = TokenAuth("http://airflow/auth/token", "alice", "secret")
+        with mock.patch.object(server.urllib.request, "urlopen", urlopen):
+            self.assertIsNone(auth.rejected(None))
+
+
+class BasicAuthTest(unittest.TestCase):
+    def test_header_is_built_once(self):
+        auth = BasicAuth("alice", "secret")
+        self.assertEqual(auth.authorization(), basic("alice:secret"))
+        self.assertIsNone(auth.rejected(auth.authorization()))
+
+    def test_verify_asks_airflow_with_the_callers_header(self):
+        auth = BasicAuth("alice", "secret")
+        with mock.patch.object(server, "airflow_accepts", return_value=False) as accepts:
+            self.assertFalse(auth.verify(basic("mallory:guess")))
+        accepts.assert_called_once_with(basic("mallory:guess"))
+
+
+class VerifyCallerTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(server.verified_callers, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_missing_header_is_rejected(self):
+        self.assertFalse(server.verify_caller(None))
+        self.assertFalse(server.verify_caller(""))
+
+    def test_empty_basic_credentials_are_rejected_in_token_mode(self):
+        auth = TokenAuth("http://airflow/auth/token", "airflow", "airflow")
+        urlopen, bodies = token_endpoint(accepted=("airflow", "airflow"))
+        with mock.patch.object(server, "airflow_auth", auth), \
+                mock.patch.object(server.urllib.request, "urlopen", urlopen):
+            self.assertFalse(server.verify_caller("Basic Og=="))
+        self.assertEqual(bodies, [])
+
+    def test_accepted_callers_are_remembered(self):
+        auth = mock.Mock()
+        auth.verify.return_value = True
+        with mock.patch.object(server, "airflow_auth", auth):
+            self.assertTrue(server.verify_caller(basic("alice:secret")))
+            self.assertTrue(server.verify_caller(basic("alice:secret")))
+        auth.verify.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
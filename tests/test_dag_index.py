@@ -0,0 +1,108 @@
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+
+import server
+from server import DagIndex, parse_dag_list_params
+
+STATUSES = {
+    "etl_daily": {"dag_id": "etl_daily", "state": "success", "execution_date": "2026-01-03T00:00:00+00:00"},
+    "train_model": {"dag_id": "train_model", "state": "failed", "execution_date": "2026-01-01T00:00:00+00:00"},
+    "etl_hourly": {"dag_id": "etl_hourly", "state": "failed", "execution_date": "2026-01-02T00:00:00+00:00"},
+    "new_dag": {"dag_id": "new_dag", "state": "N/A", "execution_date": "N/A"},
+}
+DAG_IDS = ("train_model", "etl_daily", "new_dag", "etl_hourly")  # list order
+
+
+class DagIndexPageTest(unittest.TestCase):
+    def setUp(self):
+        self.lookups = []
+
+        def statuses(dag_ids, token):
+            self.lookups.append(list(dag_ids))
+            return [dict(STATUSES[dag_id]) for dag_id in dag_ids]
+
+        patcher = mock.patch.object(server, "get_latest_dag_statuses_bulk", side_effect=statuses)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index = DagIndex(ttl=60)
+
+    def page(self, **params):
+        return self.index.page(DAG_IDS, "token", **params)
+
+    def test_list_order_needs_no_lookups(self):
+        self.assertEqual(self.page(), (4, ["train_model", "etl_daily", "new_dag", "etl_hourly"]))
+        self.assertEqual(self.page(sort="dag_id", prefix="etl"), (2, ["etl_daily", "etl_hourly"]))
+        self.assertEqual(self.page(sort="dag_id", descending=True, limit=2), (4, ["train_model", "new_dag"]))
+        self.assertEqual(self.lookups, [])
+
+    def test_window(self):
+        self.assertEqual(self.page(offset=1, limit=2), (4, ["etl_daily", "new_dag"]))
+        self.assertEqual(self.page(offset=10), (4, []))
+
+    def test_state_filter(self):
+        self.assertEqual(self.page(state="failed"), (2, ["train_model", "etl_hourly"]))
+        self.assertEqual(self.page(state="failed", prefix="etl"), (1, ["etl_hourly"]))
+
+    def test_sort_by_status(self):
+        self.assertEqual(self.page(sort="state"), (4, ["new_dag", "etl_hourly", "train_model", "etl_daily"]))
+        self.assertEqual(self.page(sort="execution_date", descending=True, limit=2), (4, ["etl_daily", "etl_hourly"]))
+
+    def test_one_snapshot_serves_every_page(self):
+        for offset in range(4):
+            self.page(sort="state", offset=offset, limit=1)
+        self.page(state="success")
+        self.assertEqual(len(self.lookups), 1)
+
+    def test_snapshot_version_survives_an_unchanged_rebuild(self):
+        self.page(state="failed")
+        version = self.index.version(DAG_IDS)
+        self.assertIsNotNone(version)
+        self.index.build(tuple(DAG_IDS), "token")
+        self.assertEqual(self.index.version(DAG_IDS), version)
+        with mock.patch.dict(STATUSES, etl_daily=dict(STATUSES["etl_daily"], state="running")):
+            self.index.build(tuple(DAG_IDS), "token")
+        self.assertNotEqual(self.index.version(DAG_IDS), version)
+
+    def test_keeps_at_most_max_lists(self):
+        index = DagIndex(ttl=60, max_lists=1)
+        index.page(DAG_IDS, "token", state="failed")
+        index.page(DAG_IDS[:2], "token", state="failed")
+        self.assertIsNone(index.version(DAG_IDS))
+        self.assertIsNotNone(index.version(DAG_IDS[:2]))
+
+
+class ParseDagListParamsTest(unittest.TestCase):
+    def test_defaults(self):
+        self.assertEqual(parse_dag_list_params({}), {"state": None, "prefix": None, "sort": None, "descending": False,
+                                                     "offset": 0, "limit": server.DAGS_PAGE_LIMIT})
+
+    def test_rejects_bad_values(self):
+        for params in ({"offset": "-1"}, {"limit": "0"}, {"limit": str(server.DAGS_MAX_LIMIT + 1)},
+                       {"limit": "ten"}, {"sort": "owner"}, {"order": "up"}):
+            with self.subTest(params=params), self.assertRaises(ValueError):
+                parse_dag_list_params(params)
+
+    def test_rejects_wrongly_typed_json_fields(self):
+        for params in ({"prefix": ["x"]}, {"state": {"a": 1}}, {"sort": ["state"]}, {"order": 1},
+                       {"offset": [1]}, {"limit": 2.5}, {"limit": True}):
+            with self.subTest(params=params), self.assertRaises(ValueError):
+                parse_dag_list_params(params)
+
+    def test_accepts_json_integers(self):
+        params = parse_dag_list_params({"offset": 20, "limit": 10, "prefix": "etl_"})
+        self.assertEqual((params["offset"], params["limit"], params["prefix"]), (20, 10, "etl_"))
+
+
+class IterLatestDagStatusesTest(unittest.TestCase):
+    def test_statuses_past_the_deadline_are_pending(self):
+        done, never = Future(), Future()
+        done.set_result({"dag_id": "a", "state": "success", "execution_date": "2026-01-01", "dag_run_id": "r1"})
+        with mock.patch.object(server.status_pool, "submit", side_effect=[done, never]):
+            batches = list(server.iter_latest_dag_statuses(["a", "b"], "token", deadline=0))
+        self.assertEqual([[s["state"] for s in batch] for batch in batches], [["success"], ["pending"]])
+        self.assertTrue(never.cancelled())
+
+
+if __name__ == "__main__":
+    unittest.main()
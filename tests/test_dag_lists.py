@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import server
+from server import DagListRegistry, parse_dag_csv
+
+
+class ParseDagCsvTest(unittest.TestCase):
+    def test_dag_id_column_under_a_header(self):
+        lines = ["owner,dag_id,schedule", "data,etl_daily,@daily", "ml, train_model ,@weekly"]
+        self.assertEqual(parse_dag_csv(lines), ("etl_daily", "train_model"))
+
+    def test_one_dag_id_per_line_without_a_header(self):
+        self.assertEqual(parse_dag_csv(["etl_daily", "train_model"]), ("etl_daily", "train_model"))
+
+    def test_skips_blanks_comments_and_short_rows(self):
+        lines = ["team,dag_id", "data,etl_daily", "", "ml,", "ops,#disabled_dag", "ops"]
+        self.assertEqual(parse_dag_csv(lines), ("etl_daily",))
+
+    def test_duplicates_keep_their_first_position(self):
+        self.assertEqual(parse_dag_csv(["b", "a", "b", "c", "a"]), ("b", "a", "c"))
+
+    def test_quoted_cells(self):
+        self.assertEqual(parse_dag_csv(['dag_id,note', 'etl_daily,"runs, daily"']), ("etl_daily",))
+
+
+class UploadTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.shipped = os.path.join(self.directory.name, "shipped")
+        self.uploads = os.path.join(self.directory.name, "uploads")
+        os.makedirs(self.shipped)
+        with open(os.path.join(self.shipped, "main.csv"), "w") as f:
+            f.write("dag_id\netl_daily\n")
+        self.registry = DagListRegistry(directories=(self.shipped, self.uploads), check_interval=0)
+
+    def test_upload_is_saved_and_listed(self):
+        self.assertEqual(self.registry.upload("team-a", "dag_id\netl_daily\ntrain_model\n"), ("etl_daily", "train_model"))
+        self.assertEqual(self.registry.names(), {"main": 1, "team-a": 2})
+        self.assertTrue(os.path.exists(os.path.join(self.uploads, "team-a.csv")))
+        self.assertEqual(DagListRegistry(directories=(self.shipped, self.uploads)).get("team-a"),
+                         ("etl_daily", "train_model"))
+
+    def test_rejects_unsafe_names_and_dag_ids(self):
+        for name in ("", "../main", ".hidden", "<b>", "a b", "x" * 101):
+            with self.subTest(name=name), self.assertRaises(ValueError):
+                self.registry.upload(name, "etl_daily\n")
+        for dag_id in ("<img src=x onerror=alert(1)>", "etl daily", "etl/daily", "etl\"daily"):
+            with self.subTest(dag_id=dag_id), self.assertRaises(ValueError):
+                self.registry.upload("team-a", f"dag_id\netl_daily\n{dag_id}\n")
+        self.assertNotIn("team-a", self.registry.names())
+
+    def test_rejects_an_empty_list(self):
+        with self.assertRaises(ValueError):
+            self.registry.upload("team-a", "dag_id\n\n")
+
+    def test_shipped_lists_cant_be_replaced(self):
+        with self.assertRaises(ValueError):
+            self.registry.upload("main", "etl_daily\n")
+
+    def test_limits(self):
+        with mock.patch.object(server, "DAG_LIST_MAX_DAGS", 2), self.assertRaises(ValueError):
+            self.registry.upload("team-a", "a\nb\nc\n")
+        with mock.patch.object(server, "DAG_LIST_MAX_UPLOADED", 2):
+            self.registry.upload("team-a", "a\n")
+            self.registry.upload("team-b", "b\n")
+            self.registry.upload("team-a", "a\nc\n")  # replacing one is fine
+            with self.assertRaises(ValueError):
+                self.registry.upload("team-c", "c\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+import io
+import json
+import unittest
+from unittest import mock
+
+import server
+from server import DagRun, TaskInstance
+
+
+def request(raw):
+    # Runs one raw HTTP request through MyHandler; returns (status, headers, body)
+    handler = server.MyHandler.__new__(server.MyHandler)
+    handler.rfile = io.BytesIO(raw)
+    handler.wfile = server.CountingWriter(io.BytesIO())
+    handler.client_address = ("127.0.0.1", 0)
+    handler.server = mock.Mock()
+    handler.requests_served = 0
+    handler.close_connection = True
+    with mock.patch.object(handler, "log_message"):
+        handler.handle_one_request_measured()
+    head, _, body = handler.wfile.raw.getvalue().partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in header_lines)
+    return int(status_line.split()[1]), headers, body
+
+
+def get(path):
+    # HTTP/1.0, so streamed answers come unchunked and uncompressed
+    return request(f"GET {path} HTTP/1.0\r\n\r\n".encode())
+
+
+class ContentLengthTest(unittest.TestCase):
+    def test_non_numeric_or_negative_length_is_a_400(self):
+        for length in ("abc", "-5", "1.5"):
+            with self.subTest(length=length):
+                status, headers, _ = request(f"POST /api/status HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+                self.assertEqual(status, 400)
+                self.assertEqual(headers.get("Connection"), "close")
+
+    def test_missing_length_reads_no_body(self):
+        status, _, _ = request(b"POST /api/status HTTP/1.1\r\n\r\n")
+        self.assertEqual(status, 400)
+
+
+def post_json(path, body):
+    payload = json.dumps(body).encode()
+    return request(f"POST {path} HTTP/1.1\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload)
+
+
+class BulkStatusTest(unittest.TestCase):
+    def test_oversized_body_is_a_413_without_reading_it(self):
+        length = server.DAG_LIST_UPLOAD_MAX + 1
+        status, headers, _ = request(f"POST /api/status HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+        self.assertEqual(status, 413)
+        self.assertEqual(headers.get("Connection"), "close")
+
+    def test_too_many_dag_ids_is_a_400(self):
+        dag_ids = [f"dag_{i}" for i in range(server.DAG_LIST_MAX_DAGS + 1)]
+        with mock.patch.object(server, "get_latest_dag_statuses_bulk") as bulk:
+            self.assertEqual(post_json("/api/status", {"dag_ids": dag_ids})[0], 400)
+        bulk.assert_not_called()
+
+    def test_statuses_come_back_in_order(self):
+        statuses = [{"dag_id": "b", "state": "success"}, {"dag_id": "a", "state": "failed"}]
+        with mock.patch.object(server, "get_latest_dag_statuses_bulk", return_value=statuses):
+            status, _, body = post_json("/api/status", {"dag_ids": ["b", "a"]})
+        self.assertEqual(status, 200)
+        self.assertEqual([s["dag_id"] for s in json.loads(body)], ["b", "a"])
+
+
+class EventStreamTest(unittest.TestCase):
+    def test_bad_subscriptions_are_a_400(self):
+        too_many = ",".join(f"dag_{i}" for i in range(server.STREAM_MAX_DAGS + 1))
+        with mock.patch.object(server.dag_poller, "track") as track, \
+                mock.patch.object(server.event_stream, "subscribe") as subscribe:
+            for query in ("", "?dag_ids=", "?dag_ids=,", "?dag_ids=etl,../x", f"?dag_ids={too_many}"):
+                with self.subTest(query=query[:40]):
+                    self.assertEqual(get(f"/api/stream{query}")[0], 400)
+        track.assert_not_called()
+        subscribe.assert_not_called()
+
+
+class ListDagsTest(unittest.TestCase):
+    def test_wrongly_typed_body_fields_are_a_400(self):
+        for body in ({"dag_ids": ["a"], "prefix": ["x"]}, {"dag_ids": ["a"], "sort": ["state"]},
+                     {"dag_ids": ["a"], "offset": "x"}, {"dag_ids": ["a"], "limit": [1]}):
+            with self.subTest(body=body):
+                self.assertEqual(post_json("/api/dags", body)[0], 400)
+
+    def test_oversized_body_is_a_413_without_reading_it(self):
+        length = server.DAG_LIST_UPLOAD_MAX + 1
+        status, headers, _ = request(f"POST /api/dags HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+        self.assertEqual(status, 413)
+        self.assertEqual(headers.get("Connection"), "close")
+
+    def test_too_many_dag_ids_is_a_400(self):
+        dag_ids = [f"dag_{i}" for i in range(server.DAG_LIST_MAX_DAGS + 1)]
+        with mock.patch.object(server, "list_dags") as list_dags:
+            self.assertEqual(post_json("/api/dags", {"dag_ids": dag_ids, "sort": "state"})[0], 400)
+        list_dags.assert_not_called()
+
+
+class IndexTest(unittest.TestCase):
+    def test_row_errors_are_escaped(self):
+        with mock.patch.object(server.dag_lists, "get", return_value=["etl"]), \
+                mock.patch.object(server.dag_index, "page", return_value=(1, ["etl"])), \
+                mock.patch.object(server, "iter_latest_dag_statuses", side_effect=RuntimeError("<b>down</b>")):
+            status, _, body = get("/")
+        self.assertEqual(status, 200)
+        self.assertIn(b"Error: &lt;b&gt;down&lt;/b&gt;", body)
+        self.assertNotIn(b"<b>down", body)
+
+
+V1 = ("v1", 1700000000.0)  # (tag, last modified)
+
+
+class VersionedJsonTest(unittest.TestCase):
+    def setUp(self):
+        for patcher in (mock.patch.object(server, "get_latest_dag_status", return_value={"dag_id": "etl"}),
+                        mock.patch.object(server, "encoded_responses", server.EncodedResponses())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_version_appearing_mid_build_is_not_attached(self):
+        with mock.patch.object(server, "status_version", side_effect=[None, V1]):
+            status, headers, _ = get("/api/status?dag_id=etl")
+        self.assertEqual(status, 200)
+        self.assertNotIn("ETag", headers)
+        self.assertIsNone(server.encoded_responses.get("/api/status?dag_id=etl", V1))
+
+    def test_version_changing_mid_build_is_not_attached(self):
+        with mock.patch.object(server, "status_version", side_effect=[V1, ("v2", None)]):
+            _, headers, _ = get("/api/status?dag_id=etl")
+        self.assertNotIn("ETag", headers)
+
+    def test_unchanged_version_is_attached_and_cached(self):
+        with mock.patch.object(server, "status_version", return_value=V1):
+            _, headers, _ = get("/api/status?dag_id=etl")
+        self.assertIn("ETag", headers)
+        self.assertIsNotNone(server.encoded_responses.get("/api/status?dag_id=etl", V1))
+
+
+class LogSearchTest(unittest.TestCase):
+    def setUp(self):
+        for patcher in (mock.patch("sys.stdout", new_callable=io.StringIO),  # fetch errors are printed
+                        mock.patch.object(server.airflow_auth, "authorization", return_value="Basic x")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_regex_is_rejected(self):
+        self.assertEqual(get("/api/logs/search?dag_id=etl&pattern=a.*b&regex=1")[0], 400)
+
+    def test_failed_task_list_is_reported_as_an_error(self):
+        runs = [DagRun("etl", "r1", "success", None), DagRun("etl", "r2", "success", None)]
+
+        def load_dag_tasks(dag_id, dag_run_id, token):
+            if dag_run_id == "r2":
+                raise OSError("breaker open")
+            return [TaskInstance.from_api({"task_id": "extract", "try_number": 1, "state": "success"})]
+
+        with mock.patch.object(server, "load_dag_runs", return_value=runs), \
+                mock.patch.object(server, "load_dag_tasks", load_dag_tasks), \
+                mock.patch.object(server, "search_log", return_value=[(3, "boom")]):
+            status, _, body = get("/api/logs/search?dag_id=etl&pattern=boom")
+        self.assertEqual(status, 200)
+        *matches, summary = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(m["dag_run_id"], m["line"]) for m in matches], [("r1", "boom")])
+        self.assertEqual((summary["runs"], summary["logs"], summary["errors"], summary["incomplete_runs"]),
+                         (2, 1, 1, ["r2"]))
+
+    def test_failed_run_list_is_a_502(self):
+        with mock.patch.object(server, "load_dag_runs", side_effect=OSError("breaker open")):
+            self.assertEqual(get("/api/logs/search?dag_id=etl&pattern=boom")[0], 502)
+
+
+if __name__ == "__main__":
+    unittest.main()
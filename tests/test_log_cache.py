@@ -0,0 +1,32 @@
+import io
+import os
+import tempfile
+import unittest
+
+from server import LogCache
+
+
+class LogCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = os.path.join(directory.name, "logs")
+
+    def test_directory_is_made_on_first_fill(self):
+        cache = LogCache(directory=self.directory)
+        self.assertIsNone(cache.open(("etl", "r1", "extract", 1)))
+        self.assertFalse(os.path.exists(self.directory))
+        cache.fill(("etl", "r1", "extract", 1), io.BytesIO(b"log text"))
+        with cache.open(("etl", "r1", "extract", 1)) as log_file:
+            self.assertEqual(log_file.read(), b"log text")
+
+    def test_logs_on_disk_are_picked_up_and_evicted_for_space(self):
+        LogCache(directory=self.directory).fill(("etl", "r1", "extract", 1), io.BytesIO(b"x" * 6))
+        cache = LogCache(directory=self.directory, max_bytes=10)
+        cache.fill(("etl", "r1", "load", 1), io.BytesIO(b"y" * 6))
+        self.assertIsNone(cache.open(("etl", "r1", "extract", 1)))
+        self.assertEqual(cache.total, 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import server
+from server import parse_byte_range
+
+
+class ParseByteRangeTest(unittest.TestCase):
+    def test_closed_range(self):
+        self.assertEqual(parse_byte_range("bytes=0-99"), (0, 99))
+        self.assertEqual(parse_byte_range("bytes=100-100"), (100, 100))
+
+    def test_open_ended_range(self):
+        self.assertEqual(parse_byte_range("bytes=500-"), (500, None))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_byte_range("bytes=-65536"), (None, 65536))
+
+    def test_whitespace_after_unit(self):
+        self.assertEqual(parse_byte_range("bytes= 10-20"), (10, 20))
+
+    def test_no_header_means_whole_log(self):
+        self.assertIsNone(parse_byte_range(None))
+        self.assertIsNone(parse_byte_range(""))
+
+    def test_unsupported_ranges_mean_whole_log(self):
+        for header in ("items=0-10",   # other unit
+                       "bytes=0-10,20-30",  # multiple ranges
+                       "bytes=-0",  # empty suffix
+                       "bytes=-",
+                       "bytes=20-10",  # end before start
+                       "bytes=a-10",
+                       "bytes=0-b"):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_byte_range(header))
+
+
+class SendLogFileTest(unittest.TestCase):
+    def send(self, content, byte_range):
+        # (status, headers, body) of send_log_file for a cached log holding `content`
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "0123456789abcdef.log")
+        with open(path, "wb") as f:
+            f.write(content)
+        handler = server.MyHandler.__new__(server.MyHandler)
+        handler.wfile = server.CountingWriter(io.BytesIO())
+        handler.headers = {}
+        handler.request_version = "HTTP/1.1"
+        handler.requestline = "GET /api/logs HTTP/1.1"
+        handler.requests_served = 0
+        handler.connection = mock.Mock()
+        handler.connection.sendfile.side_effect = lambda f, start, count: handler.wfile.raw.write(
+            content[start:start + count]) and count
+        with open(path, "rb") as log_file, mock.patch.object(handler, "log_message"):
+            handler.send_log_file(log_file, byte_range)
+        head, _, body = handler.wfile.raw.getvalue().partition(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        return int(status_line.split()[1]), dict(line.split(": ", 1) for line in header_lines), body
+
+    def test_suffix_range(self):
+        status, headers, body = self.send(b"0123456789", (None, 4))
+        self.assertEqual((status, headers["Content-Range"], body), (206, "bytes 6-9/10", b"6789"))
+
+    def test_range_past_the_end_is_a_416(self):
+        status, headers, _ = self.send(b"0123456789", (10, None))
+        self.assertEqual((status, headers["Content-Range"]), (416, "bytes */10"))
+
+    def test_suffix_range_of_an_empty_log_is_a_416(self):
+        status, headers, body = self.send(b"", (None, 100))
+        self.assertEqual((status, headers["Content-Range"], headers["Content-Length"], body),
+                         (416, "bytes */0", "0", b""))
+
+    def test_no_range_of_an_empty_log_is_an_empty_200(self):
+        status, headers, body = self.send(b"", None)
+        self.assertEqual((status, headers["Content-Length"], body), (200, "0", b""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import tracemalloc
+import unittest
+
+from server import LogPattern, scan_log
+
+
+class LogPatternTest(unittest.TestCase):
+    def test_matches_literals_ignoring_ascii_case(self):
+        pattern = LogPattern("Connection refused")
+        self.assertTrue(pattern.matches(b"[2026-01-01] ERROR connection REFUSED by host\n"))
+        self.assertFalse(pattern.matches(b"connection reset\n"))
+
+    def test_regex_syntax_is_matched_literally(self):
+        pattern = LogPattern("(.*.*)*Q")
+        self.assertFalse(pattern.matches(b"a" * 10000 + b"Q"))
+        self.assertTrue(pattern.matches(b"saw (.*.*)*q here"))
+
+    def test_may_match_rules_out_logs_without_its_trigrams(self):
+        _, bitmap = scan_log([b"task started\n", b"task finished\n"], LogPattern("started"), index=True)
+        self.assertTrue(LogPattern("STARTED").may_match(bitmap))
+        self.assertFalse(LogPattern("refused").may_match(bitmap))
+
+
+class ScanLogTest(unittest.TestCase):
+    def test_reports_line_numbers_and_stripped_text(self):
+        matches, bitmap = scan_log([b"one\n", b"two error\r\n", b"three\n"], LogPattern("error"))
+        self.assertEqual(matches, [(2, "two error")])
+        self.assertIsNone(bitmap)
+
+    def test_indexing_memory_does_not_grow_with_the_log(self):
+        def log(lines):
+            for i in range(lines):
+                yield f"row {i} key {i * 2654435761:x}{i:08x} done\n".encode()  # every key a new word
+
+        def peak(lines):
+            tracemalloc.start()
+            try:
+                scan_log(log(lines), LogPattern("absent"), index=True)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        self.assertLess(peak(20000), 2 * peak(2000) + 64 * 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,20 @@
+import unittest
+from unittest import mock
+
+import server
+from server import DagRunPoller
+
+
+class PollerPoolTest(unittest.TestCase):
+    def test_upstream_fetches_stay_off_the_status_pool(self):
+        # The index's in-memory lookups run in status_pool; the poller must not queue there
+        poller = DagRunPoller()
+        runs = {"dag_runs": [{"dag_id": "etl", "dag_run_id": "r1", "state": "success", "execution_date": None}]}
+        with mock.patch.object(server.status_pool, "submit", side_effect=AssertionError("status_pool used")), \
+                mock.patch.object(server, "fetch_json", return_value=runs):
+            recent = poller.fetch_recent(["etl"], "token")
+        self.assertEqual([run.dag_run_id for run in recent["etl"]], ["r1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+import urllib.parse
+from unittest import mock
+
+import server
+from server import RunHistory, TaskInstance
+
+
+def run(dag_run_id, execution_date, state="success", dag_id="etl_daily"):
+    return {"dag_id": dag_id, "dag_run_id": dag_run_id, "execution_date": execution_date, "state": state,
+            "start_date": execution_date, "end_date": None}
+
+
+def task(task_id, state="success", try_number=1, map_index=None, dag_run_id="r1", execution_date=None):
+    return {"dag_id": "etl_daily", "dag_run_id": dag_run_id, "task_id": task_id, "map_index": map_index,
+            "state": state, "try_number": try_number, "execution_date": execution_date}
+
+
+class RunHistoryTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.history = RunHistory(path=os.path.join(directory.name, "history.sqlite3"))
+        with mock.patch.object(RunHistory, "run"):  # no background syncs against Airflow
+            self.history.open()
+        self.dags = {"etl_daily"}
+
+    def test_store_runs_upserts_and_reports_changes(self):
+        runs = [run("r1", "2026-01-01T00:00:00+00:00"), run("r2", "2026-01-02T00:00:00Z", state="running")]
+        self.assertEqual(self.history.store_runs(runs, self.dags), {("etl_daily", "r1"), ("etl_daily", "r2")})
+        self.assertEqual(self.history.store_runs(runs, self.dags), set())  # nothing new
+        runs[1]["state"] = "failed"
+        self.assertEqual(self.history.store_runs(runs, self.dags), {("etl_daily", "r2")})
+        self.assertEqual([(r.dag_run_id, r.state, r.execution_date) for r in self.history.dag_runs("etl_daily", 10)],
+                         [("r2", "failed", "2026-01-02T00:00:00+00:00"), ("r1", "success", "2026-01-01T00:00:00+00:00")])
+
+    def test_store_runs_skips_other_dags_and_undated_runs(self):
+        runs = [run("r1", "2026-01-01T00:00:00+00:00", dag_id="other"), run("r2", None)]
+        self.assertEqual(self.history.store_runs(runs, self.dags), set())
+        self.assertEqual(self.history.dag_runs("etl_daily", 10), [])
+
+    def test_store_tasks_keys_unmapped_tasks_by_map_index_minus_one(self):
+        self.history.store_runs([run("r1", "2026-01-01T00:00:00+00:00")], self.dags)
+        tasks = [task("extract"), task("load", map_index=0), task("load", map_index=1)]
+        self.assertEqual(self.history.store_tasks(tasks, self.dags), {"etl_daily"})
+        self.assertEqual(self.history.store_tasks(tasks, self.dags), set())  # an upsert, not a second row
+        self.assertEqual(self.history.store_tasks([dict(tasks[0], map_index=-1)], self.dags), set())
+        stored = self.history.finished_run_tasks("etl_daily", "r1")
+        self.assertEqual([(t.task_id, t.map_index) for t in stored], [("extract", -1), ("load", 0), ("load", 1)])
+
+    def test_store_tasks_records_new_tries(self):
+        self.history.store_runs([run("r1", "2026-01-01T00:00:00+00:00")], self.dags)
+        self.history.store_tasks([task("extract", state="failed")], self.dags)
+        self.assertEqual(self.history.store_tasks([task("extract", state="success", try_number=2)], self.dags),
+                         {"etl_daily"})
+        [stored] = self.history.task_history("etl_daily", "extract", 10)
+        self.assertEqual((stored["state"], stored["try_number"], stored["execution_date"]),
+                         ("success", 2, "2026-01-01T00:00:00+00:00"))
+
+    def test_store_tasks_needs_a_date(self):
+        # Without its own execution_date a task takes its run's; without a stored run it is skipped
+        self.assertEqual(self.history.store_tasks([task("extract", dag_run_id="unknown")], self.dags), set())
+        self.assertEqual(self.history.store_tasks([task("extract", dag_run_id="unknown",
+                                                        execution_date="2026-01-05T00:00:00Z")], self.dags),
+                         {"etl_daily"})
+
+    def test_finished_run_tasks_only_for_finished_runs(self):
+        self.history.store_runs([run("r1", "2026-01-01T00:00:00+00:00", state="running")], self.dags)
+        self.history.store_tasks([task("extract")], self.dags)
+        self.assertIsNone(self.history.finished_run_tasks("etl_daily", "r1"))
+        self.assertIsNone(self.history.finished_run_tasks("etl_daily", "missing"))
+
+    def test_sync_backfills_then_follows_the_watermark(self):
+        backfill_runs = [run("r1", "2026-01-01T00:00:00+00:00")]
+        backfill_tasks = [task("extract", map_index=-1, execution_date="2026-01-01T00:00:00+00:00")]
+        updated_runs = [run("r2", "2026-01-02T00:00:00+00:00")]
+        fetched = []
+
+        def post_json(url, body, token):
+            items = backfill_runs if url.endswith("/dagRuns/list") else backfill_tasks
+            return {"dag_runs" if url.endswith("/dagRuns/list") else "task_instances": items,
+                    "total_entries": len(items)}
+
+        def fetch_json(url, token):
+            fetched.append(url)
+            return {"dag_runs": updated_runs, "total_entries": len(updated_runs)}
+
+        def fetch_task_instances(dag_id, dag_run_id, token):
+            return {"task_instances": [TaskInstance("extract", None, "success", 1)]}
+
+        with mock.patch.object(server.dag_lists, "all_dag_ids", return_value={"etl_daily"}), \
+             mock.patch.object(server, "post_json", side_effect=post_json), \
+             mock.patch.object(server, "fetch_json", side_effect=fetch_json), \
+             mock.patch.object(server, "fetch_task_instances", side_effect=fetch_task_instances):
+            self.history.sync("token")
+            self.assertEqual(fetched, [])  # a new DAG is backfilled, not followed incrementally
+            first = self.history.stats()
+            self.assertEqual((first["dags"], first["runs"], first["task_instances"]), (1, 1, 1))
+            self.assertIsNotNone(first["synced_since"])
+            version = self.history.version("etl_daily")
+
+            self.history.sync("token")
+            [url] = fetched
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+            self.assertEqual(query["updated_at_gte"], [first["synced_since"]])
+            self.assertEqual([r.dag_run_id for r in self.history.dag_runs("etl_daily", 10)], ["r2", "r1"])
+            self.assertEqual(self.history.stats()["task_instances"], 2)  # r2's tasks, unmapped at -1
+            self.assertNotEqual(self.history.version("etl_daily"), version)
+            self.assertGreaterEqual(self.history.stats()["synced_since"], first["synced_since"])
+
+    def test_sync_drops_dags_that_left_the_lists(self):
+        self.history.store_runs([run("r1", "2026-01-01T00:00:00+00:00")], self.dags)
+        with self.history.transaction() as conn:
+            conn.execute("INSERT INTO dags VALUES ('etl_daily', 1, 0)")
+        with mock.patch.object(server.dag_lists, "all_dag_ids", return_value=set()):
+            self.history.sync("token")
+        self.assertFalse(self.history.covers("etl_daily"))
+        self.assertEqual(self.history.dag_runs("etl_daily", 10), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
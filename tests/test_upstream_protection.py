@@ -0,0 +1,157 @@
+import io
+import unittest
+from unittest import mock
+
+import server
+from server import AdaptiveLimit, CircuitBreaker
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        # The breaker prints when it opens and closes
+        patcher = mock.patch("sys.stdout", new_callable=io.StringIO)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failures=3, cooldown=60)
+        for _ in range(2):
+            breaker.record(False)
+        self.assertTrue(breaker.allow())
+        breaker.record(False)
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.stats()["rejected"], 1)
+
+    def test_success_resets_the_count(self):
+        breaker = CircuitBreaker(failures=3, cooldown=60)
+        breaker.record(False)
+        breaker.record(False)
+        breaker.record(True)
+        breaker.record(False)
+        breaker.record(False)
+        self.assertTrue(breaker.is_closed())
+
+    def test_half_open_lets_one_probe_through(self):
+        breaker = CircuitBreaker(failures=1, cooldown=10)
+        with mock.patch.object(server.time, "monotonic", return_value=100.0):
+            breaker.record(False)
+        with mock.patch.object(server.time, "monotonic", return_value=105.0):
+            self.assertFalse(breaker.allow())  # still cooling down
+        with mock.patch.object(server.time, "monotonic", return_value=110.0):
+            self.assertTrue(breaker.allow())
+            self.assertEqual(breaker.state, "half_open")
+            self.assertFalse(breaker.allow())  # only one probe at a time
+
+    def test_probe_outcome_closes_or_reopens(self):
+        breaker = CircuitBreaker(failures=1, cooldown=0)
+        breaker.record(False)
+        self.assertTrue(breaker.allow())
+        breaker.record(True)
+        self.assertTrue(breaker.is_closed())
+
+        breaker.record(False)
+        self.assertTrue(breaker.allow())
+        breaker.record(False)
+        self.assertEqual(breaker.state, "open")
+
+
+class AdaptiveLimitTest(unittest.TestCase):
+    def test_sheds_calls_over_the_limit(self):
+        limit = AdaptiveLimit(minimum=1, maximum=2, wait=0.01)
+        limit.acquire()
+        limit.acquire()
+        with self.assertRaises(TimeoutError):
+            limit.acquire()
+        self.assertEqual(limit.stats(), {"limit": 2, "in_flight": 2, "shed": 1})
+        limit.release()
+        limit.acquire()  # a released slot is usable again
+
+    def test_failure_backs_off_once_per_latency_target(self):
+        limit = AdaptiveLimit(minimum=1, maximum=10, latency_target=1.0, backoff=0.5)
+        with mock.patch.object(server.time, "monotonic", return_value=100.0):
+            for _ in range(2):
+                limit.acquire()
+                limit.release(latency=0.1, ok=False)
+        self.assertEqual(limit.limit, 5)
+        with mock.patch.object(server.time, "monotonic", return_value=101.0):
+            limit.acquire()
+            limit.release(latency=0.1, ok=False)
+        self.assertEqual(limit.limit, 2.5)
+
+    def test_slow_answers_count_as_congestion(self):
+        limit = AdaptiveLimit(minimum=1, maximum=10, latency_target=1.0, backoff=0.5)
+        limit.acquire()
+        limit.release(latency=2.0, ok=True)
+        self.assertEqual(limit.limit, 5)
+
+    def test_never_below_minimum(self):
+        limit = AdaptiveLimit(minimum=2, maximum=4, latency_target=0.0, backoff=0.1)
+        for _ in range(3):
+            limit.acquire()
+            limit.release(latency=0.5, ok=False)
+        self.assertEqual(limit.limit, 2)
+
+    def test_good_calls_grow_it_back_up_to_maximum(self):
+        limit = AdaptiveLimit(minimum=1, maximum=4, latency_target=1.0, backoff=0.5)
+        limit.limit = 2.0
+        limit.acquire()
+        limit.release(latency=0.1, ok=True)
+        self.assertEqual(limit.limit, 2.5)
+        for _ in range(20):
+            limit.acquire()
+            limit.release(latency=0.1, ok=True)
+        self.assertEqual(limit.limit, 4)
+
+    def test_call_that_never_went_out_leaves_the_limit(self):
+        limit = AdaptiveLimit(minimum=1, maximum=4)
+        limit.acquire()
+        limit.release()
+        self.assertEqual(limit.stats(), {"limit": 4, "in_flight": 0, "shed": 0})
+
+
+class ReserveUpstreamTest(unittest.TestCase):
+    def test_pool_timeout_is_not_held_against_airflow(self):
+        pool = server.AirflowConnectionPool("http://localhost:1", size=1, timeout=0.01)
+        pool.reserve()
+        breaker, limit = server.airflow_breaker.stats(), server.airflow_limit.stats()
+        for _ in range(server.BREAKER_FAILURES + 1):
+            with self.assertRaises(TimeoutError):
+                server.reserve_upstream(pool)
+        self.assertEqual(server.airflow_breaker.stats(), breaker)
+        self.assertEqual(server.airflow_limit.stats(), limit)
+
+    def test_open_circuit_gives_the_connection_back(self):
+        pool = server.AirflowConnectionPool("http://localhost:1", size=1, timeout=0.01)
+        with mock.patch.object(server.airflow_breaker, "allow", return_value=False):
+            with self.assertRaises(server.CircuitOpenError):
+                server.reserve_upstream(pool)
+        pool.reserve()  # the slot was released
+        pool.unreserve()
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def test_checkout_closes_every_expired_idle_connection(self):
+        pool = server.AirflowConnectionPool("http://localhost:1", size=3, idle_timeout=10)
+        old, older, fresh = mock.Mock(), mock.Mock(), mock.Mock()
+        pool.idle = [(older, 100.0), (old, 105.0), (fresh, 118.0)]
+        with mock.patch.object(server.time, "monotonic", return_value=120.0):
+            self.assertEqual(pool.checkout(), (fresh, True))
+        older.close.assert_called_once_with()
+        old.close.assert_called_once_with()
+        fresh.close.assert_not_called()
+        self.assertEqual(pool.idle, [])
+
+    def test_checkout_opens_a_new_connection_when_all_idle_ones_expired(self):
+        pool = server.AirflowConnectionPool("http://localhost:1", size=2, idle_timeout=10)
+        stale = mock.Mock()
+        pool.idle = [(stale, 100.0)]
+        with mock.patch.object(server.time, "monotonic", return_value=120.0):
+            conn, reused = pool.checkout()
+        self.assertFalse(reused)
+        self.assertIsNot(conn, stale)
+        stale.close.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()